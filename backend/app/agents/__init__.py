@@ -1,4 +1,4 @@
 # Agents module
-from app.agents.triage_agent import TriageAgent, AgentAnalytics
+from app.agents.triage_agent import TriageAgent, AgentResult, AgentAnalytics
 
-__all__ = ["TriageAgent", "AgentAnalytics"]
+__all__ = ["TriageAgent", "AgentResult", "AgentAnalytics"]
@@ -0,0 +1,24 @@
+"""Demo issue scenarios used by /api/demo/simulate-issue and the agent benchmark."""
+
+DEMO_SCENARIOS = {
+    "washing_machine": {
+        "title": "Washing machine won't start",
+        "description": "My washing machine won't turn on. I pressed the power button but nothing happens. The display is completely blank.",
+        "category": "appliance",
+    },
+    "emergency": {
+        "title": "Smell gas in kitchen",
+        "description": "I can smell gas near the cooker in my kitchen. It started about 10 minutes ago. Should I be worried?",
+        "category": "heating",
+    },
+    "heating": {
+        "title": "No hot water this morning",
+        "description": "Woke up to find we have no hot water. The boiler is showing an error code E119. Radiators are working fine though.",
+        "category": "heating",
+    },
+    "plumbing": {
+        "title": "Kitchen sink draining slowly",
+        "description": "The kitchen sink is draining really slowly. It takes about 5 minutes for the water to go down. Getting worse over the past week.",
+        "category": "plumbing",
+    },
+}
@@ -0,0 +1,174 @@
+"""Per-issue agent actor with message coalescing.
+
+Tenants often send a thought in several quick WhatsApp messages ("boiler
+broken", then "error E119"). Each issue gets a single in-flight agent run;
+messages that arrive during the debounce window or while a run is in
+progress are recorded in order and answered together in the next turn.
+
+Runs for the same issue are serialised across workers with a Postgres
+advisory lock, and routing for a contact is serialised the same way (behind
+a FIFO in-process lock) so messages are always handled in the order they
+arrived.
+"""
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+from app.config import AGENT_DEBOUNCE_SECONDS
+from app.db import messages, activity
+from app.db.database import advisory_lock
+
+# First key of the two-int advisory lock, so issue locks can't collide
+# with other users of pg_advisory_lock
+ISSUE_LOCK_NAMESPACE = 72001
+CONTACT_LOCK_NAMESPACE = 72003
+
+AfterRun = Callable[[int, Any], Awaitable[Any]]
+OnError = Callable[[int, Exception], Awaitable[Any]]
+
+
+def contact_lock_key(contact_id: str) -> int:
+    """Stable signed 32-bit advisory lock key for a contact."""
+    return int.from_bytes(hashlib.sha256(contact_id.encode()).digest()[:4], "big", signed=True)
+
+
+class IssueActor:
+    """Mailbox and run loop for a single issue."""
+
+    def __init__(self, issue_id: int, run_agent: Callable[..., Awaitable[str]]):
+        self.issue_id = issue_id
+        self.run_agent = run_agent
+        self.pending: List[str] = []
+        self.waiters: List[asyncio.Future] = []
+        self.after_run: Optional[AfterRun] = None
+        self.on_error: Optional[OnError] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def is_running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    async def _loop(self, debounce: float):
+        """Drain the mailbox, one agent turn per batch."""
+        while self.pending:
+            # Give the tenant a moment to finish typing
+            await asyncio.sleep(debounce)
+
+            batch, self.pending = self.pending, []
+            waiters, self.waiters = self.waiters, []
+            after_run, on_error = self.after_run, self.on_error
+
+            try:
+                async with advisory_lock(ISSUE_LOCK_NAMESPACE, self.issue_id):
+                    if len(batch) > 1:
+                        await activity.log_activity(
+                            self.issue_id,
+                            "messages_coalesced",
+                            {"count": len(batch)}
+                        )
+                    # Messages were already recorded on arrival
+                    result = await self.run_agent(
+                        self.issue_id, "\n".join(batch), record_message=False
+                    )
+                    if after_run:
+                        await after_run(self.issue_id, result)
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(result)
+            except Exception as e:
+                if on_error:
+                    await on_error(self.issue_id, e)
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+
+
+class IssueActors:
+    """Registry of per-issue actors and per-contact ordering locks."""
+
+    def __init__(self, debounce: float = AGENT_DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self._actors: Dict[int, IssueActor] = {}
+        self._contact_locks: Dict[str, asyncio.Lock] = {}
+        # Holders plus waiters per contact lock; it is dropped at zero
+        self._contact_users: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def contact_order(self, contact_id: str):
+        """
+        Serialise routing for one contact in arrival order.
+
+        Callers in this process queue on a FIFO asyncio.Lock; the holder then
+        takes the contact's advisory lock, so other workers and instances
+        wait their turn too.
+        """
+        lock = self._contact_locks.setdefault(contact_id, asyncio.Lock())
+        self._contact_users[contact_id] = self._contact_users.get(contact_id, 0) + 1
+        try:
+            async with lock:
+                async with advisory_lock(CONTACT_LOCK_NAMESPACE, contact_lock_key(contact_id)):
+                    yield
+        finally:
+            self._contact_users[contact_id] -= 1
+            if not self._contact_users[contact_id]:
+                del self._contact_users[contact_id]
+                del self._contact_locks[contact_id]
+
+    async def submit(
+        self,
+        issue_id: int,
+        tenant_message: str,
+        run_agent: Callable[..., Awaitable[str]],
+        after_run: Optional[AfterRun] = None,
+        on_error: Optional[OnError] = None,
+        record_message: bool = True,
+        provider_message_id: Optional[str] = None,
+    ) -> asyncio.Future:
+        """
+        Queue a tenant message for the issue's next agent turn.
+
+        The message is recorded immediately so the thread keeps arrival
+        order. Returns a future resolved with the result of the run that
+        answered it; callers may await it or fire and forget. A redelivered
+        provider message is not queued and resolves to None.
+        """
+        if record_message:
+            recorded = await messages.add_message(
+                issue_id, "tenant", tenant_message, provider_message_id=provider_message_id
+            )
+            if recorded is None:
+                duplicate = asyncio.get_running_loop().create_future()
+                duplicate.set_result(None)
+                return duplicate
+
+        actor = self._actors.get(issue_id)
+        if actor is None:
+            actor = self._actors[issue_id] = IssueActor(issue_id, run_agent)
+
+        waiter = asyncio.get_running_loop().create_future()
+        actor.pending.append(tenant_message)
+        actor.waiters.append(waiter)
+        actor.after_run = after_run
+        actor.on_error = on_error
+
+        if not actor.is_running():
+            actor.task = asyncio.create_task(actor._loop(self.debounce))
+            actor.task.add_done_callback(lambda _: self._reap(issue_id))
+        return waiter
+
+    def _reap(self, issue_id: int):
+        """Drop an idle actor once its loop has finished."""
+        actor = self._actors.get(issue_id)
+        if actor and not actor.is_running() and not actor.pending:
+            del self._actors[issue_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current in-flight actors and queued messages."""
+        return {
+            "active_issues": sum(1 for a in self._actors.values() if a.is_running()),
+            "queued_messages": sum(len(a.pending) for a in self._actors.values()),
+        }
+
+
+# Singleton instance
+issue_actors = IssueActors()
@@ -0,0 +1,137 @@
+"""Record/replay layer for the Anthropic messages API.
+
+Lets the triage agent run offline: RecordingClient wraps a real client and
+saves every request/response pair to a JSON fixture, ReplayClient serves
+those responses back from the fixture with optional injected latency.
+Both expose the same `client.messages.create(...)` surface TriageAgent uses.
+
+Requests are matched on a fingerprint of the request body with digit runs
+normalised, so issue IDs and timestamps that differ between the recording
+and the replay database don't cause misses.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+from typing import Dict, Any, List
+
+
+class ReplayMiss(Exception):
+    """Raised when a replayed request has no recorded response."""
+
+
+def to_jsonable(value: Any) -> Any:
+    """Convert SDK objects (pydantic models or namespaces) to plain JSON types."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, SimpleNamespace):
+        return {k: to_jsonable(v) for k, v in vars(value).items()}
+    if isinstance(value, dict):
+        return {k: to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    return value
+
+
+def request_fingerprint(request: Dict[str, Any]) -> str:
+    """Stable hash of a messages.create request, ignoring numbers."""
+    canonical = json.dumps(to_jsonable(request), sort_keys=True, default=str)
+    canonical = re.sub(r"\d+", "0", canonical)
+    # tool_use ids are random per run
+    canonical = re.sub(r"toolu_[A-Za-z0-9]+", "toolu_x", canonical)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def to_namespace(value: Any) -> Any:
+    """Turn a recorded JSON response back into attribute-style objects."""
+    if isinstance(value, dict):
+        # Tool inputs stay dicts - the agent indexes them like the SDK's
+        return SimpleNamespace(**{
+            k: v if k == "input" else to_namespace(v) for k, v in value.items()
+        })
+    if isinstance(value, list):
+        return [to_namespace(v) for v in value]
+    return value
+
+
+def build_response(recorded: Dict[str, Any]) -> SimpleNamespace:
+    """Rebuild a response with the attributes TriageAgent reads."""
+    response = to_namespace(recorded)
+    usage = getattr(response, "usage", None) or SimpleNamespace()
+    for field in ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"):
+        if not hasattr(usage, field):
+            setattr(usage, field, 0)
+    response.usage = usage
+    return response
+
+
+class _Messages:
+    """The `.messages` namespace of a client."""
+
+    def __init__(self, create):
+        self.create = create
+
+
+class RecordingClient:
+    """Wraps a real Anthropic client and appends every exchange to a fixture file."""
+
+    def __init__(self, client, fixture_path: str):
+        self.client = client
+        self.fixture_path = fixture_path
+        self.exchanges: List[Dict[str, Any]] = []
+        self.messages = _Messages(self._create)
+
+    def _create(self, **request):
+        response = self.client.messages.create(**request)
+        self.exchanges.append({
+            "fingerprint": request_fingerprint(request),
+            "model": request.get("model"),
+            "response": to_jsonable(response),
+        })
+        return response
+
+    def save(self):
+        """Write the recorded exchanges to the fixture file."""
+        os.makedirs(os.path.dirname(self.fixture_path) or ".", exist_ok=True)
+        with open(self.fixture_path, "w") as f:
+            json.dump({"exchanges": self.exchanges}, f, indent=2, default=str)
+
+
+class ReplayClient:
+    """Serves recorded responses in place of the Anthropic API."""
+
+    def __init__(self, fixture_path: str, latency_ms: int = 0, strict: bool = True):
+        with open(fixture_path) as f:
+            exchanges = json.load(f)["exchanges"]
+        self.latency_ms = latency_ms
+        self.strict = strict
+        self._by_fingerprint: Dict[str, deque] = defaultdict(deque)
+        self._in_order = deque(exchanges)
+        for exchange in exchanges:
+            self._by_fingerprint[exchange["fingerprint"]].append(exchange)
+        self.calls = 0
+        self.misses = 0
+        self.messages = _Messages(self._create)
+
+    def _create(self, **request):
+        # Simulate API latency; the real SDK call is also blocking
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        self.calls += 1
+
+        queue = self._by_fingerprint.get(request_fingerprint(request))
+        if queue:
+            exchange = queue.popleft()
+            self._in_order.remove(exchange)
+        elif not self.strict and self._in_order:
+            # Prompt drifted since recording - fall back to recorded order
+            self.misses += 1
+            exchange = self._in_order.popleft()
+            self._by_fingerprint[exchange["fingerprint"]].remove(exchange)
+        else:
+            self.misses += 1
+            raise ReplayMiss(f"No recorded response for request (model={request.get('model')})")
+        return build_response(exchange["response"])
@@ -0,0 +1,131 @@
+"""Tiered model routing for triage turns.
+
+Most turns are routine: a first classification, an acknowledgement, a log
+entry. Those go to the small model. The large model is used when there is a
+safety risk, when troubleshooting keeps failing, or when the small model's
+answer is ambiguous (see TriageAgent._run_agent). The policy is configurable
+per org, and every decision is recorded on the agent_usage row of the call it
+routed so the thresholds can be tuned against latency, cost and outcome.
+"""
+import json
+import re
+import time
+from typing import Optional, Dict, Any, List
+
+from app.config import (
+    AGENT_MODEL,
+    AGENT_SMALL_MODEL,
+    AGENT_BUDGET_MODEL,
+    AGENT_ROUTING_MODE,
+    AGENT_MAX_FAILED_ATTEMPTS,
+)
+from app.db.database import fetch_one
+
+# Tenant replies that mean the last troubleshooting step didn't work
+FAILED_ATTEMPT_PATTERN = re.compile(
+    r"\b(still (not|doesn't|does not|won't|isn't|showing|broken|leaking)|didn't work|did not work|"
+    r"doesn't work|no (luck|change|difference)|same problem|tried that|not working)\b"
+)
+
+POLICY_CACHE_SECONDS = 60
+
+
+def count_failed_attempts(tenant_messages: List[str]) -> int:
+    """Number of tenant messages reporting that a suggested fix didn't work."""
+    return sum(1 for text in tenant_messages if FAILED_ATTEMPT_PATTERN.search(text.lower()))
+
+
+class ModelRouter:
+    """Chooses the model for each agent run."""
+
+    def __init__(self):
+        # org_id -> (expires_at, policy)
+        self._policies: Dict[int, tuple] = {}
+
+    def default_policy(self) -> Dict[str, Any]:
+        return {
+            "mode": AGENT_ROUTING_MODE,
+            "small_model": AGENT_SMALL_MODEL,
+            "large_model": AGENT_MODEL,
+            "max_failed_attempts": AGENT_MAX_FAILED_ATTEMPTS,
+        }
+
+    async def get_policy(self, org_id: Optional[int]) -> Dict[str, Any]:
+        """Org routing policy merged over the defaults (cached briefly)."""
+        policy = self.default_policy()
+        if not org_id:
+            return policy
+
+        cached = self._policies.get(org_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        try:
+            row = await fetch_one(
+                "SELECT agent_model_policy FROM organizations WHERE id = $1", org_id
+            )
+            if row and row["agent_model_policy"]:
+                overrides = row["agent_model_policy"]
+                if isinstance(overrides, str):
+                    overrides = json.loads(overrides)
+                policy.update({k: v for k, v in overrides.items() if k in policy})
+        except Exception:
+            # Column might not exist yet - use defaults
+            pass
+
+        self._policies[org_id] = (time.monotonic() + POLICY_CACHE_SECONDS, policy)
+        return policy
+
+    def invalidate(self, org_id: int):
+        """Drop a cached org policy after it changes."""
+        self._policies.pop(org_id, None)
+
+    async def route(
+        self,
+        issue: Dict[str, Any],
+        text: str,
+        tenant_messages: Optional[List[str]] = None,
+        over_budget: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Pick a model for this run.
+
+        Returns {"model", "tier", "reason", "escalation_model"}; when the small
+        model is chosen, escalation_model is what an ambiguous answer retries on.
+        """
+        from app.agents.triage_agent import is_emergency
+
+        policy = await self.get_policy(issue.get("org_id") or issue.get("property_org_id"))
+        small, large = policy["small_model"], policy["large_model"]
+
+        def small_tier(reason: str) -> Dict[str, Any]:
+            return {"model": small, "tier": "small", "reason": reason, "escalation_model": large}
+
+        def large_tier(reason: str) -> Dict[str, Any]:
+            return {"model": large, "tier": "large", "reason": reason, "escalation_model": None}
+
+        # Safety comes before budget and org policy: an emergency is always
+        # triaged by the large model. The issue itself is checked too, since a
+        # follow-up ("still there, what now?") rarely repeats the hazard.
+        issue_text = f"{issue.get('title', '')} {issue.get('description', '')}"
+        if is_emergency(text) or is_emergency(issue_text):
+            return large_tier("safety_keywords")
+        if issue.get("priority") == "urgent":
+            return large_tier("urgent_priority")
+
+        if over_budget:
+            return {"model": AGENT_BUDGET_MODEL, "tier": "small", "reason": "over_budget", "escalation_model": None}
+        if policy["mode"] == "large_only":
+            return large_tier("policy_large_only")
+        if policy["mode"] == "small_only":
+            return {**small_tier("policy_small_only"), "escalation_model": None}
+
+        if count_failed_attempts(tenant_messages or []) >= policy["max_failed_attempts"]:
+            return large_tier("repeated_failed_troubleshooting")
+        if not tenant_messages:
+            return small_tier("first_turn")
+        return small_tier("simple_follow_up")
+
+
+# Singleton instance
+model_router = ModelRouter()
@@ -0,0 +1,272 @@
+"""Local similarity index for reusing proven troubleshooting replies.
+
+Tenants describe the same handful of problems over and over. This keeps a
+TF-IDF index (pure Python, no network) of issues the agent resolved on its
+own, partitioned by organisation, category and property type, so a new
+issue that closely matches one of them can start from the reply that
+already worked. Replies are written to a particular tenant, so the greeting
+and the source property's details are swapped for the new issue's before a
+reply is reused.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Optional, Dict, Any, List, Tuple
+
+from app.config import SIMILAR_REPLY_THRESHOLD
+from app.db.database import fetch_one, fetch_all
+from app.db.scoped import ISSUE_ORG
+
+# The confirmation sent by resolve_with_troubleshooting is not a troubleshooting reply
+RESOLVED_CONFIRMATION_PREFIX = "Great news - we've resolved this!"
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has",
+    "have", "i", "in", "is", "it", "its", "it's", "me", "my", "of", "on", "or",
+    "so", "that", "the", "this", "to", "was", "we", "with", "you", "your",
+    "issue", "reported", "whatsapp", "via",
+}
+
+RESOLVED_ISSUES_QUERY = f"""
+    SELECT i.id, i.title, i.description,
+           {ISSUE_ORG} as org_id,
+           COALESCE(i.category, 'uncategorized') as category,
+           {{property_type}} as property_type,
+           t.name as tenant_name,
+           p.name as property_name,
+           p.address as property_address,
+           (
+               SELECT m.content FROM issue_messages m
+               WHERE m.issue_id = i.id AND m.role = 'agent'
+               AND m.content NOT LIKE $1
+               ORDER BY m.id ASC
+               LIMIT 1
+           ) as first_reply
+    FROM issues i
+    LEFT JOIN tenants t ON t.id = i.tenant_id
+    LEFT JOIN properties p ON p.id = i.property_id
+    WHERE i.status = 'resolved_by_agent'
+"""
+
+ISSUE_PARTITION_QUERY = f"""
+    SELECT {ISSUE_ORG} as org_id, {{property_type}} as property_type
+    FROM issues i
+    LEFT JOIN tenants t ON t.id = i.tenant_id
+    LEFT JOIN properties p ON p.id = i.property_id
+    WHERE i.id = $1
+"""
+
+PartitionKey = Tuple[Optional[int], str, str]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase word tokens with stopwords removed."""
+    if not text:
+        return []
+    words = re.findall(r"[a-z0-9]+(?:'[a-z]+)?", text.lower())
+    return [w for w in words if w not in STOPWORDS and len(w) > 1]
+
+
+def partition_key(org_id: Optional[int], category: Optional[str], property_type: Optional[str]) -> PartitionKey:
+    """Partition key for an issue; replies are never shared across organisations."""
+    return (org_id, category or "uncategorized", property_type or "unknown")
+
+
+# Salutation at the start of a reply, e.g. "Hi Alex," or "Good morning Alex!"
+GREETING_PATTERN = r"^(\s*(?:hi|hello|hey|dear|good (?:morning|afternoon|evening))\s+)({names})(?!\w)"
+
+
+def _replace_phrase(text: str, old: Optional[str], new: str) -> str:
+    """Exact (case-sensitive) whole-phrase replacement."""
+    if not old or not old.strip():
+        return text
+    return re.sub(rf"(?<!\w){re.escape(old.strip())}(?!\w)", lambda _: new, text)
+
+
+def _readdress_greeting(text: str, source_name: Optional[str], target_name: str) -> str:
+    """Swap the source tenant's name in a leading greeting for the target's first name."""
+    parts = (source_name or "").split()
+    if not parts:
+        return text
+    # Full name first so "Hi Alex Morgan" is not left as "Hi Sam Morgan"
+    names = "|".join(re.escape(name) for name in dict.fromkeys([" ".join(parts), parts[0]]))
+    target_parts = target_name.split()
+    replacement = target_parts[0] if target_parts else "there"
+    pattern = GREETING_PATTERN.format(names=names)
+    return re.sub(pattern, lambda m: m.group(1) + replacement, text, count=1, flags=re.IGNORECASE)
+
+
+def personalise_reply(match: Dict[str, Any], issue: Dict[str, Any]) -> str:
+    """
+    Rewrite a matched reply for the new issue's tenant.
+
+    Only the greeting is readdressed: tenant names are often ordinary words
+    ("Will", "May", "Say"), so they are never replaced in the body. The
+    source property's exact name and address are swapped for the new
+    issue's, or for neutral wording where the new issue has none.
+    """
+    reply = match["reply"]
+    reply = _replace_phrase(reply, match.get("property_address"), issue.get("property_address") or "your property")
+    reply = _replace_phrase(reply, match.get("property_name"), issue.get("property_name") or "your property")
+    return _readdress_greeting(reply, match.get("tenant_name"), (issue.get("tenant_name") or "").strip())
+
+
+class SimilarIssueIndex:
+    """In-process TF-IDF index over issues resolved by the agent."""
+
+    def __init__(self, threshold: float = SIMILAR_REPLY_THRESHOLD):
+        self.threshold = threshold
+        # partition -> issue_id -> {"tf": Counter, "reply": str}
+        self._docs: Dict[PartitionKey, Dict[int, Dict[str, Any]]] = defaultdict(dict)
+        # partition -> term -> issue ids containing it
+        self._postings: Dict[PartitionKey, Dict[str, set]] = defaultdict(lambda: defaultdict(set))
+        self._loaded = False
+        self.lookups = 0
+        self.hits = 0
+
+    async def _fetch_resolved(self, where: str = "", *args) -> List[Dict[str, Any]]:
+        """Fetch resolved issues with their first troubleshooting reply."""
+        like = RESOLVED_CONFIRMATION_PREFIX + "%"
+        try:
+            query = RESOLVED_ISSUES_QUERY.format(property_type="p.property_type::text") + where
+            rows = await fetch_all(query, like, *args)
+        except Exception:
+            # property_type column might not exist (pre-HMO schema)
+            query = RESOLVED_ISSUES_QUERY.format(property_type="NULL") + where
+            rows = await fetch_all(query, like, *args)
+        return [dict(row) for row in rows]
+
+    async def ensure_loaded(self):
+        """Build the index from the database on first use."""
+        if self._loaded:
+            return
+        for row in await self._fetch_resolved():
+            self._add(row)
+        self._loaded = True
+
+    async def add_resolved_issue(self, issue_id: int):
+        """Incrementally index an issue that was just resolved by the agent."""
+        if not self._loaded:
+            # The full load will pick it up
+            return
+        rows = await self._fetch_resolved(" AND i.id = $2", issue_id)
+        for row in rows:
+            self._add(row)
+
+    def _add(self, row: Dict[str, Any]):
+        """Add (or replace) a resolved issue in its partition."""
+        if not row.get("first_reply"):
+            return
+        key = partition_key(row.get("org_id"), row.get("category"), row.get("property_type"))
+        self._remove(key, row["id"])
+        tf = Counter(tokenize(f"{row.get('title', '')} {row.get('description', '')}"))
+        if not tf:
+            return
+        self._docs[key][row["id"]] = {
+            "tf": tf,
+            "reply": row["first_reply"],
+            "tenant_name": row.get("tenant_name"),
+            "property_name": row.get("property_name"),
+            "property_address": row.get("property_address"),
+        }
+        for term in tf:
+            self._postings[key][term].add(row["id"])
+
+    def _remove(self, key: PartitionKey, issue_id: int):
+        """Drop an issue from a partition if present."""
+        doc = self._docs[key].pop(issue_id, None)
+        if not doc:
+            return
+        for term in doc["tf"]:
+            self._postings[key][term].discard(issue_id)
+
+    def _idf(self, key: PartitionKey, term: str) -> float:
+        """Smoothed inverse document frequency within a partition."""
+        n = len(self._docs[key])
+        df = len(self._postings[key].get(term, ()))
+        return math.log((1 + n) / (1 + df)) + 1
+
+    def _weights(self, key: PartitionKey, tf: Counter) -> Dict[str, float]:
+        """L2-normalised TF-IDF weights for a term-frequency vector."""
+        weights = {term: (1 + math.log(count)) * self._idf(key, term) for term, count in tf.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return {term: w / norm for term, w in weights.items()} if norm else {}
+
+    def search(
+        self,
+        text: str,
+        org_id: Optional[int],
+        category: Optional[str],
+        property_type: Optional[str],
+        exclude_issue_id: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Return the best match in the partition as {issue_id, score, reply, <source details>}."""
+        key = partition_key(org_id, category, property_type)
+        query_tf = Counter(tokenize(text))
+        if not query_tf or not self._docs.get(key):
+            return None
+
+        query_weights = self._weights(key, query_tf)
+        candidates = set()
+        for term in query_tf:
+            candidates |= self._postings[key].get(term, set())
+        candidates.discard(exclude_issue_id)
+
+        best = None
+        for issue_id in candidates:
+            doc = self._docs[key][issue_id]
+            doc_weights = self._weights(key, doc["tf"])
+            score = sum(w * doc_weights.get(term, 0.0) for term, w in query_weights.items())
+            if not best or score > best["score"]:
+                best = {
+                    "issue_id": issue_id,
+                    "score": round(score, 4),
+                    "reply": doc["reply"],
+                    "tenant_name": doc["tenant_name"],
+                    "property_name": doc["property_name"],
+                    "property_address": doc["property_address"],
+                }
+        return best
+
+    async def find_match(self, issue: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Find a resolved issue similar enough to reuse its reply."""
+        await self.ensure_loaded()
+        org_id, property_type = await self._get_partition(issue["id"])
+        match = self.search(
+            f"{issue.get('title', '')} {issue.get('description', '')}",
+            org_id,
+            issue.get("category"),
+            property_type,
+            exclude_issue_id=issue.get("id"),
+        )
+        self.lookups += 1
+        if match and match["score"] >= self.threshold:
+            self.hits += 1
+            return match
+        return None
+
+    async def _get_partition(self, issue_id: int) -> Tuple[Optional[int], Optional[str]]:
+        """Look up the organisation and property type used for partitioning."""
+        try:
+            row = await fetch_one(ISSUE_PARTITION_QUERY.format(property_type="p.property_type::text"), issue_id)
+        except Exception:
+            # property_type column might not exist (pre-HMO schema)
+            row = await fetch_one(ISSUE_PARTITION_QUERY.format(property_type="NULL"), issue_id)
+        if not row:
+            return None, None
+        return row["org_id"], row["property_type"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit-rate and size statistics since process start."""
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups * 100, 1) if self.lookups else 0,
+            "threshold": self.threshold,
+            "indexed_issues": sum(len(docs) for docs in self._docs.values()),
+            "partitions": len([docs for docs in self._docs.values() if docs]),
+        }
+
+
+# Singleton instance
+similar_issues = SimilarIssueIndex()
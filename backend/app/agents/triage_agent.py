@@ -1,8 +1,16 @@
 """Issue Triage Agent - helps tenants troubleshoot before escalating."""
+import asyncio
 import os
+import re
+import time
 import anthropic
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from app.db import issues, messages, activity
+from typing import Optional, List
+from app.db import issues, messages, activity, usage
+from app.config import SIMILAR_REPLY_MODE, AGENT_MODEL
+from app.agents.similar_issues import similar_issues, personalise_reply
+from app.agents.model_router import model_router
 
 TRIAGE_SYSTEM_PROMPT = """You are FixMate, a helpful property maintenance assistant. Your goal is to help tenants resolve issues themselves when possible, avoiding unnecessary tradesperson callouts.
 
@@ -46,6 +54,24 @@ TRIAGE_SYSTEM_PROMPT = """You are FixMate, a helpful property maintenance assist
 
 IMPORTANT: Always use your tools to interact with the system. Use send_message to communicate with the tenant."""
 
+# Phrases that always mean a safety risk - these jump the agent queue
+EMERGENCY_KEYWORDS = [
+    "gas", "smell of burning", "burning smell", "smoke", "fire", "sparks", "sparking",
+    "exposed wire", "carbon monoxide", "co alarm", "flood", "flooding", "water pouring",
+    "ceiling collapse", "electric shock",
+]
+
+
+EMERGENCY_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(keyword) for keyword in EMERGENCY_KEYWORDS) + r")\b"
+)
+
+
+def is_emergency(text: str) -> bool:
+    """Check whether a tenant message mentions an obvious safety risk."""
+    return bool(EMERGENCY_PATTERN.search((text or "").lower()))
+
+
 # Define tools for the agent
 TOOLS = [
     {
@@ -112,16 +138,28 @@ TOOLS = [
 ]
 
 
+@dataclass
+class AgentResult:
+    """Outcome of one agent run: the final text plus every message it sent to the tenant, in order."""
+    text: str
+    outbound_messages: List[str] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return self.text
+
+
 class TriageAgent:
     """Agent that triages maintenance issues."""
 
-    def __init__(self):
-        self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    def __init__(self, client=None):
+        # Pass a client to run against a recording or replay stub (see llm_replay)
+        self.client = client or anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
-    async def _execute_tool(self, issue_id: int, tool_name: str, tool_input: dict) -> str:
-        """Execute a tool and return the result."""
+    async def _execute_tool(self, issue_id: int, tool_name: str, tool_input: dict, outbound: List[str]) -> str:
+        """Execute a tool and return the result; tenant-facing messages are appended to outbound."""
         if tool_name == "send_message":
             await messages.add_message(issue_id, "agent", tool_input["message"])
+            outbound.append(tool_input["message"])
             await activity.log_activity(
                 issue_id,
                 "sent_message",
@@ -140,6 +178,8 @@ class TriageAgent:
 
         elif tool_name == "escalate_to_property_manager":
             await issues.update_issue_status(issue_id, "escalated")
+            # The priority sets the SLA clock the escalation just started
+            await issues.update_issue_priority(issue_id, tool_input["priority"])
             await messages.add_message(
                 issue_id,
                 "system",
@@ -162,6 +202,7 @@ class TriageAgent:
             # Send confirmation message to tenant
             confirmation = f"Great news - we've resolved this! {tool_input['solution']} If you have any other issues, just message me anytime."
             await messages.add_message(issue_id, "agent", confirmation)
+            outbound.append(confirmation)
             await messages.add_message(
                 issue_id,
                 "system",
@@ -173,16 +214,18 @@ class TriageAgent:
                 {"solution": tool_input["solution"]},
                 would_notify="property_manager"
             )
+            # Make the proven reply available to future similar issues
+            await similar_issues.add_resolved_issue(issue_id)
             return f"Issue resolved! Solution: {tool_input['solution']}"
 
         return "Unknown tool"
 
-    async def handle_new_issue(self, issue_id: int) -> str:
+    async def handle_new_issue(self, issue_id: int) -> AgentResult:
         """Handle a new issue submission."""
         # Get the issue details
         issue = await issues.get_issue(issue_id)
         if not issue:
-            return "Issue not found"
+            return AgentResult("Issue not found")
 
         # Check if agent is muted for this issue
         if await issues.is_agent_muted(issue_id):
@@ -192,14 +235,43 @@ class TriageAgent:
                 {"reason": "Agent is muted for this issue"},
                 would_notify=None
             )
-            return "Agent is muted for this issue - skipping response"
+            return AgentResult("Agent is muted for this issue - skipping response")
 
         # Update status to triaging
         await issues.update_issue_status(issue_id, "triaging")
 
+        # Look for a near-duplicate issue the agent already resolved
+        similar = None
+        if SIMILAR_REPLY_MODE != "off":
+            similar = await similar_issues.find_match(issue)
+        if similar:
+            # Written to another tenant; swap in this tenant's details
+            similar["reply"] = personalise_reply(similar, issue)
+            await activity.log_activity(
+                issue_id,
+                "similar_issue_matched",
+                {"source_issue_id": similar["issue_id"], "score": similar["score"], "mode": SIMILAR_REPLY_MODE}
+            )
+            if SIMILAR_REPLY_MODE == "reuse":
+                # Skip the model entirely and send the reply that worked before,
+                # addressed to this tenant
+                outbound: List[str] = []
+                await self._execute_tool(issue_id, "send_message", {"message": similar["reply"]}, outbound)
+                return AgentResult(similar["reply"], outbound)
+
         # Get conversation history
         conversation = await messages.get_conversation_context(issue_id)
 
+        similar_section = ""
+        if similar:
+            similar_section = f"""
+## Proven Reply From a Similar Resolved Issue
+A near-identical issue (#{similar['issue_id']}) was resolved without a callout after this reply:
+{similar['reply']}
+
+Use it as your starting point unless the details above suggest something different.
+"""
+
         # Build the prompt
         prompt = f"""A tenant has reported a maintenance issue. Please analyze it and help them.
 
@@ -211,7 +283,7 @@ class TriageAgent:
 
 ## Previous Conversation
 {conversation if conversation else "(No previous messages)"}
-
+{similar_section}
 ## Your Task
 1. First, log your initial assessment using log_reasoning
 2. Then send a helpful message to the tenant asking clarifying questions or providing troubleshooting steps
@@ -219,17 +291,28 @@ class TriageAgent:
 
 Remember: Your goal is to help resolve issues without unnecessary callouts when possible. Start by analyzing what's described and suggest the most likely troubleshooting steps."""
 
-        return await self._run_agent(issue_id, prompt)
+        route = await self._route(issue, f"{issue['title']} {issue['description']}")
+        return await self._run_agent(issue_id, prompt, route)
+
+    async def handle_tenant_response(
+        self,
+        issue_id: int,
+        tenant_message: str,
+        record_message: bool = True,
+    ) -> AgentResult:
+        """Handle a tenant's response in an ongoing conversation.
 
-    async def handle_tenant_response(self, issue_id: int, tenant_message: str) -> str:
-        """Handle a tenant's response in an ongoing conversation."""
+        Pass record_message=False when the message (or a coalesced batch of
+        messages) has already been added to the thread.
+        """
         # Record the tenant message
-        await messages.add_message(issue_id, "tenant", tenant_message)
+        if record_message:
+            await messages.add_message(issue_id, "tenant", tenant_message)
 
         # Get the issue and full conversation
         issue = await issues.get_issue(issue_id)
         if not issue:
-            return "Issue not found"
+            return AgentResult("Issue not found")
 
         # Check if agent is muted for this issue
         if await issues.is_agent_muted(issue_id):
@@ -239,9 +322,11 @@ Remember: Your goal is to help resolve issues without unnecessary callouts when
                 {"reason": "Agent is muted - message recorded but not responded to"},
                 would_notify=None
             )
-            return "Agent is muted for this issue - message recorded but not responded to"
+            return AgentResult("Agent is muted for this issue - message recorded but not responded to")
 
-        conversation = await messages.get_conversation_context(issue_id)
+        # Load the thread once - it feeds both the prompt and model routing
+        thread = await messages.get_messages(issue_id)
+        conversation = messages.format_conversation(thread)
 
         tenant_name = issue.get('tenant_name') or 'the tenant'
         first_name = tenant_name.split()[0] if tenant_name and tenant_name.strip() else 'there'
@@ -267,35 +352,128 @@ Address {first_name} by name. Based on their response:
 2. If troubleshooting failed, try alternative approaches or escalate
 3. If they provided new information, incorporate it into your assessment"""
 
-        return await self._run_agent(issue_id, prompt)
+        tenant_messages = [msg["content"] for msg in thread if msg["role"] == "tenant"]
+        route = await self._route(issue, tenant_message, tenant_messages)
+        return await self._run_agent(issue_id, prompt, route)
+
+    async def handle_follow_up(self, issue_id: int) -> AgentResult:
+        """Check in with the tenant when a scheduled follow-up comes due."""
+        issue = await issues.get_issue(issue_id)
+        if not issue:
+            return AgentResult("Issue not found")
 
-    async def _run_agent(self, issue_id: int, prompt: str) -> str:
+        if await issues.is_agent_muted(issue_id):
+            await activity.log_activity(
+                issue_id,
+                "agent_skipped",
+                {"reason": "Agent is muted - follow-up not sent"},
+                would_notify=None
+            )
+            return AgentResult("Agent is muted for this issue - follow-up not sent")
+
+        thread = await messages.get_messages(issue_id)
+        conversation = messages.format_conversation(thread)
+
+        prompt = f"""A follow-up you scheduled for this issue is now due. Check in with the tenant.
+
+## Issue Details
+- **Title**: {issue['title']}
+- **Description**: {issue['description']}
+- **Status**: {issue['status']}
+
+## Conversation So Far
+{conversation if conversation else "(No previous messages)"}
+
+## Your Task
+1. Send the tenant a short message asking whether the problem is fixed
+2. If the conversation already shows it is fixed, mark it as resolved instead
+3. Do not repeat troubleshooting steps they have already tried"""
+
+        route = await self._route(issue, f"{issue['title']} {issue['description']}")
+        return await self._run_agent(issue_id, prompt, route)
+
+    async def _route(self, issue: dict, text: str, tenant_messages: Optional[list] = None) -> dict:
+        """Pick the model for this run; orgs over budget get the cheap one unless it is urgent or unsafe."""
+        over_budget = await usage.is_over_budget(issue["id"])
+        return await model_router.route(issue, text, tenant_messages, over_budget=over_budget)
+
+    async def _record_usage(
+        self,
+        issue_id: int,
+        model: str,
+        turn_index: int,
+        response,
+        latency_ms: int,
+        route: dict,
+    ):
+        """Record token usage for one model call without ever failing the run."""
+        try:
+            response_usage = response.usage
+            await usage.record_usage(
+                issue_id,
+                model,
+                turn_index,
+                response_usage.input_tokens or 0,
+                response_usage.output_tokens or 0,
+                getattr(response_usage, "cache_creation_input_tokens", 0) or 0,
+                getattr(response_usage, "cache_read_input_tokens", 0) or 0,
+                latency_ms,
+                response.stop_reason,
+                tier=route["tier"],
+                route_reason=route["reason"],
+            )
+        except Exception as e:
+            print(f"[USAGE] Failed to record usage for issue {issue_id}: {e}", flush=True)
+
+    async def _run_agent(self, issue_id: int, prompt: str, route: Optional[dict] = None) -> AgentResult:
         """Run the agent with tool use loop."""
         messages_list = [{"role": "user", "content": prompt}]
+        outbound: List[str] = []
+
+        route = dict(route or {"model": AGENT_MODEL, "tier": "large", "reason": "default", "escalation_model": None})
+        model = route["model"]
+        # Orgs over their monthly budget also get shorter replies
+        max_tokens = 512 if route["reason"] == "over_budget" else 1024
 
         # Agent loop - max 5 turns
-        for _ in range(5):
-            response = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=1024,
+        for turn_index in range(5):
+            started = time.perf_counter()
+            # The SDK call blocks; run it off the event loop so concurrent
+            # agent runs (and the web server) keep going meanwhile
+            response = await asyncio.to_thread(
+                self.client.messages.create,
+                model=model,
+                max_tokens=max_tokens,
                 system=TRIAGE_SYSTEM_PROMPT,
                 tools=TOOLS,
                 messages=messages_list
             )
+            latency_ms = int((time.perf_counter() - started) * 1000)
+            await self._record_usage(issue_id, model, turn_index, response, latency_ms, route)
+
+            # An ambiguous small-model answer (truncated, or no action on the
+            # first turn) is retried once on the large model
+            if route.get("escalation_model") and (
+                response.stop_reason == "max_tokens"
+                or (turn_index == 0 and not any(block.type == "tool_use" for block in response.content))
+            ):
+                model = route["escalation_model"]
+                route.update({"model": model, "tier": "large", "reason": "ambiguous_escalation", "escalation_model": None})
+                continue
 
             # Check if we're done (no more tool use)
             if response.stop_reason == "end_turn":
                 # Extract any final text
                 for block in response.content:
                     if hasattr(block, "text"):
-                        return block.text
-                return "Agent completed"
+                        return AgentResult(block.text, outbound)
+                return AgentResult("Agent completed", outbound)
 
             # Process tool calls
             tool_results = []
             for block in response.content:
                 if block.type == "tool_use":
-                    result = await self._execute_tool(issue_id, block.name, block.input)
+                    result = await self._execute_tool(issue_id, block.name, block.input, outbound)
                     tool_results.append({
                         "type": "tool_result",
                         "tool_use_id": block.id,
@@ -309,7 +487,7 @@ Address {first_name} by name. Based on their response:
             messages_list.append({"role": "assistant", "content": response.content})
             messages_list.append({"role": "user", "content": tool_results})
 
-        return "Agent loop completed"
+        return AgentResult("Agent loop completed", outbound)
 
 
 # ============================================================================
@@ -341,6 +519,9 @@ class AgentAnalytics:
         callout_cost = 150
         savings = (resolved_by_agent['count'] if resolved_by_agent else 0) * callout_cost
 
+        # LLM spend, so savings can be read net of what the agent costs
+        cost_summary = await usage.get_cost_summary()
+
         return {
             "total_issues": total['count'] if total else 0,
             "resolved_by_agent": resolved_by_agent['count'] if resolved_by_agent else 0,
@@ -351,6 +532,8 @@ class AgentAnalytics:
             ),
             "estimated_savings": savings,
             "avg_callout_cost": callout_cost,
+            "llm_cost_usd": cost_summary["llm_cost_usd"],
+            "cost_per_resolved_issue_usd": cost_summary["cost_per_resolved_issue_usd"],
         }
 
     @staticmethod
@@ -371,6 +554,11 @@ class AgentAnalytics:
 
         return [dict(row) for row in rows] if rows else []
 
+    @staticmethod
+    async def get_usage_breakdown(org_id: Optional[int] = None, days: int = 30):
+        """Get token usage and cost per org, model and day."""
+        return await usage.get_daily_usage(org_id, days)
+
     @staticmethod
     async def get_response_time_stats():
         """Get agent response time statistics."""
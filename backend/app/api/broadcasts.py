@@ -0,0 +1,124 @@
+"""API routes for bulk announcements to tenants."""
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel
+from typing import Optional
+
+from app.config import BROADCAST_PROVIDER
+from app.db.broadcasts import broadcasts
+from app.db.properties import properties
+from app.api.dependencies import get_org_id, owned
+from app.workers.broadcast_worker import broadcast_worker
+
+router = APIRouter(prefix="/api/broadcasts", tags=["broadcasts"])
+
+RECIPIENT_STATUSES = {"pending", "sending", "sent", "failed", "cancelled"}
+
+
+class CreateBroadcastRequest(BaseModel):
+    message: Optional[str] = None
+    # Messages outside a tenant's 24h window need an approved template
+    template_sid: Optional[str] = None
+    variables: Optional[dict] = None
+    property_id: Optional[int] = None  # omit to message every tenant in the org
+    created_by: Optional[str] = None
+
+
+@router.post("")
+async def create_broadcast(
+    request: CreateBroadcastRequest,
+    org_id: int = Depends(get_org_id),
+):
+    """
+    Announce something to every active tenant of the org (or one property).
+
+    Recipients are resolved immediately; messages go out in the background
+    under the broadcast rate limit. Poll GET /api/broadcasts/{id} for progress.
+    """
+    if request.template_sid:
+        if BROADCAST_PROVIDER != "twilio":
+            raise HTTPException(status_code=400, detail="Templates are only supported via Twilio")
+        payload = {"template_sid": request.template_sid, "variables": request.variables or {}}
+    elif request.message and request.message.strip():
+        payload = {"body": request.message.strip()}
+    else:
+        raise HTTPException(status_code=400, detail="A message or template_sid is required")
+
+    if request.property_id is not None:
+        owned(await properties.get_for_org(request.property_id, org_id), "Property")
+
+    return await broadcasts.create(
+        org_id,
+        BROADCAST_PROVIDER,
+        payload,
+        property_id=request.property_id,
+        created_by=request.created_by,
+    )
+
+
+@router.get("")
+async def list_broadcasts(
+    limit: int = 50,
+    org_id: int = Depends(get_org_id),
+):
+    """Recent broadcasts with delivery progress."""
+    return await broadcasts.get_by_org(org_id, min(max(limit, 1), 200))
+
+
+@router.get("/metrics")
+async def get_broadcast_metrics():
+    """Fan-out worker counters for this process."""
+    return broadcast_worker.get_metrics()
+
+
+@router.get("/{broadcast_id}")
+async def get_broadcast(
+    broadcast_id: int,
+    org_id: int = Depends(get_org_id),
+):
+    """A broadcast with its progress (pending, sending, sent, failed, cancelled)."""
+    broadcast = await broadcasts.get(broadcast_id, org_id)
+    if not broadcast:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return broadcast
+
+
+@router.get("/{broadcast_id}/recipients")
+async def get_broadcast_recipients(
+    broadcast_id: int,
+    status: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    org_id: int = Depends(get_org_id),
+):
+    """Per-recipient delivery status, optionally filtered by status."""
+    if status is not None and status not in RECIPIENT_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {sorted(RECIPIENT_STATUSES)}")
+    if not await broadcasts.get(broadcast_id, org_id):
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return await broadcasts.get_recipients(broadcast_id, status, min(max(limit, 1), 1000), max(offset, 0))
+
+
+async def _transition(broadcast_id: int, org_id: int, status: str, from_statuses: list):
+    if not await broadcasts.set_status(broadcast_id, org_id, status, from_statuses):
+        if not await broadcasts.get(broadcast_id, org_id):
+            raise HTTPException(status_code=404, detail="Broadcast not found")
+        raise HTTPException(status_code=409, detail=f"Broadcast can't be {status} from its current status")
+    return await broadcasts.get(broadcast_id, org_id)
+
+
+@router.post("/{broadcast_id}/pause")
+async def pause_broadcast(broadcast_id: int, org_id: int = Depends(get_org_id)):
+    """Stop releasing recipients; messages already queued still go out."""
+    return await _transition(broadcast_id, org_id, "paused", ["running"])
+
+
+@router.post("/{broadcast_id}/resume")
+async def resume_broadcast(broadcast_id: int, org_id: int = Depends(get_org_id)):
+    """Carry on from the next unreleased recipient."""
+    return await _transition(broadcast_id, org_id, "running", ["paused"])
+
+
+@router.post("/{broadcast_id}/cancel")
+async def cancel_broadcast(broadcast_id: int, org_id: int = Depends(get_org_id)):
+    """Drop every recipient not yet released."""
+    return await _transition(broadcast_id, org_id, "cancelled", ["running", "paused"])
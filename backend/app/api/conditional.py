@@ -0,0 +1,40 @@
+"""ETags and conditional GETs.
+
+Message and activity lists take their ETag from a cheap version query
+(the newest row id) before loading the payload; issue detail is a single
+row, so it is loaded and the row itself is hashed. When the ETag matches
+the request's If-None-Match the handler returns 304 without serializing
+(or, for the lists, loading) the payload.
+"""
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+# Clients may keep a copy but must revalidate before reusing it
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """A strong ETag over the given version parts."""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match already names this ETag (weak comparison, per RFC 9110)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
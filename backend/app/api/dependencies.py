@@ -0,0 +1,35 @@
+"""Shared FastAPI dependencies."""
+from typing import Optional
+
+from fastapi import HTTPException, Header
+
+from app.db.organizations import organizations
+from app.db.scoped import Scoped
+
+
+async def get_org_id(x_clerk_org_id: Optional[str] = Header(None)) -> int:
+    """
+    Internal org_id from the Clerk org header.
+
+    Cached per process, so org-scoped endpoints don't pay a database round
+    trip for it; an org seen for the first time is created.
+    """
+    if not x_clerk_org_id:
+        raise HTTPException(status_code=401, detail="Organization ID required")
+    return await organizations.resolve_id(x_clerk_org_id)
+
+
+async def get_optional_org_id(x_clerk_org_id: Optional[str] = Header(None)) -> Optional[int]:
+    """get_org_id for endpoints that also serve callers without an org header."""
+    if not x_clerk_org_id:
+        return None
+    return await organizations.resolve_id(x_clerk_org_id)
+
+
+def owned(result: Scoped, label: str):
+    """The value of an org-scoped query, or the 404/403 it came back as."""
+    if not result.found:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    if result.forbidden:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return result.value
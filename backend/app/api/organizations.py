@@ -1,9 +1,11 @@
 """API routes for organization management."""
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Depends
 from pydantic import BaseModel
 from typing import Optional
 
 from app.db.organizations import organizations
+from app.db.notifications import notification_outbox, CONTACT_ROLES, CONTACT_CHANNELS
+from app.api.dependencies import get_org_id
 
 router = APIRouter(prefix="/api/organizations", tags=["organizations"])
 
@@ -13,6 +15,12 @@ class CreateOrgRequest(BaseModel):
     name: str
 
 
+class NotificationContactRequest(BaseModel):
+    role: str  # property_manager, landlord
+    channel: str  # email, whatsapp
+    address: str  # email address or phone number
+
+
 @router.post("/sync")
 async def sync_organization(
     request: CreateOrgRequest,
@@ -38,3 +46,37 @@ async def get_current_organization(
         raise HTTPException(status_code=404, detail="Organization not found")
     
     return org
+
+
+@router.get("/notification-contacts")
+async def list_notification_contacts(
+    org_id: int = Depends(get_org_id),
+):
+    """Who gets property_manager and landlord notifications."""
+    return await notification_outbox.get_contacts(org_id)
+
+
+@router.post("/notification-contacts")
+async def add_notification_contact(
+    request: NotificationContactRequest,
+    org_id: int = Depends(get_org_id),
+):
+    """Send an org's property_manager or landlord notifications to an address."""
+    if request.role not in CONTACT_ROLES:
+        raise HTTPException(status_code=400, detail=f"Invalid role. Must be one of: {sorted(CONTACT_ROLES)}")
+    if request.channel not in CONTACT_CHANNELS:
+        raise HTTPException(status_code=400, detail=f"Invalid channel. Must be one of: {sorted(CONTACT_CHANNELS)}")
+    if not request.address.strip():
+        raise HTTPException(status_code=400, detail="Address is required")
+    return await notification_outbox.add_contact(org_id, request.role, request.channel, request.address.strip())
+
+
+@router.delete("/notification-contacts/{contact_id}")
+async def remove_notification_contact(
+    contact_id: int,
+    org_id: int = Depends(get_org_id),
+):
+    """Stop notifying a contact."""
+    if not await notification_outbox.remove_contact(org_id, contact_id):
+        raise HTTPException(status_code=404, detail="Contact not found")
+    return {"status": "deleted"}
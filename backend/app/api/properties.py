@@ -1,11 +1,10 @@
 """API routes for properties management."""
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, Header, Depends, Response
 from pydantic import BaseModel
 from typing import Optional
 
 from app.db.properties import properties
-from app.db.organizations import organizations
-from app.db.tenants import tenants as tenants_db
+from app.api.dependencies import get_org_id, owned
 
 router = APIRouter(prefix="/api/properties", tags=["properties"])
 
@@ -20,27 +19,12 @@ class UpdatePropertyRequest(BaseModel):
     address: Optional[str] = None
 
 
-async def get_org_id_from_header(x_clerk_org_id: Optional[str] = Header(None)) -> int:
-    """Get internal org_id from Clerk org header."""
-    if not x_clerk_org_id:
-        raise HTTPException(status_code=401, detail="Organization ID required")
-    
-    org = await organizations.get_by_clerk_id(x_clerk_org_id)
-    if not org:
-        # Auto-create org if it doesn't exist
-        org = await organizations.create(x_clerk_org_id, "Organization")
-    
-    return org["id"]
-
-
 @router.post("")
 async def create_property(
     request: CreatePropertyRequest,
-    x_clerk_org_id: Optional[str] = Header(None),
+    org_id: int = Depends(get_org_id),
 ):
     """Create a new property."""
-    org_id = await get_org_id_from_header(x_clerk_org_id)
-    
     property_data = await properties.create(
         org_id=org_id,
         name=request.name,
@@ -51,89 +35,66 @@ async def create_property(
 
 @router.get("")
 async def list_properties(
+    response: Response,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    org_id: int = Depends(get_org_id),
     x_clerk_org_id: Optional[str] = Header(None),
 ):
-    """List all properties for the organization."""
-    org_id = await get_org_id_from_header(x_clerk_org_id)
+    """List the organization's properties (by name).
+
+    All of them by default; pass limit to page, and a full page sets
+    X-Next-Offset to the offset of the next one.
+    """
+    if limit is not None:
+        limit = min(max(limit, 1), 1000)
+    offset = max(offset, 0)
     # Pass both org_id (Railway model) and clerk_org_id (Drizzle model)
-    return await properties.get_by_org(org_id, clerk_org_id=x_clerk_org_id)
+    page = await properties.get_by_org(org_id, clerk_org_id=x_clerk_org_id, limit=limit, offset=offset)
+    if limit is not None and len(page) == limit:
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return page
 
 
 @router.get("/{property_id}")
 async def get_property(
     property_id: int,
-    x_clerk_org_id: Optional[str] = Header(None),
+    org_id: int = Depends(get_org_id),
 ):
     """Get a single property."""
-    org_id = await get_org_id_from_header(x_clerk_org_id)
-    
-    prop = await properties.get_by_id(property_id)
-    if not prop:
-        raise HTTPException(status_code=404, detail="Property not found")
-    
-    # Verify org ownership
-    if prop["org_id"] != org_id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    return prop
+    return owned(await properties.get_for_org(property_id, org_id), "Property")
 
 
 @router.put("/{property_id}")
 async def update_property(
     property_id: int,
     request: UpdatePropertyRequest,
-    x_clerk_org_id: Optional[str] = Header(None),
+    org_id: int = Depends(get_org_id),
 ):
     """Update a property."""
-    org_id = await get_org_id_from_header(x_clerk_org_id)
-    
-    # Verify ownership first
-    prop = await properties.get_by_id(property_id)
-    if not prop:
-        raise HTTPException(status_code=404, detail="Property not found")
-    if prop["org_id"] != org_id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    updated = await properties.update(
+    updated = await properties.update_for_org(
         property_id,
+        org_id,
         name=request.name,
         address=request.address,
     )
-    return updated
+    return owned(updated, "Property")
 
 
 @router.delete("/{property_id}")
 async def delete_property(
     property_id: int,
-    x_clerk_org_id: Optional[str] = Header(None),
+    org_id: int = Depends(get_org_id),
 ):
     """Delete a property."""
-    org_id = await get_org_id_from_header(x_clerk_org_id)
-    
-    # Verify ownership first
-    prop = await properties.get_by_id(property_id)
-    if not prop:
-        raise HTTPException(status_code=404, detail="Property not found")
-    if prop["org_id"] != org_id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    await properties.delete(property_id)
+    owned(await properties.delete_for_org(property_id, org_id), "Property")
     return {"status": "deleted"}
 
 
 @router.get("/{property_id}/tenants")
 async def get_property_tenants(
     property_id: int,
-    x_clerk_org_id: Optional[str] = Header(None),
+    org_id: int = Depends(get_org_id),
 ):
     """Get all tenants for a property."""
-    org_id = await get_org_id_from_header(x_clerk_org_id)
-    
-    # Verify ownership first
-    prop = await properties.get_by_id(property_id)
-    if not prop:
-        raise HTTPException(status_code=404, detail="Property not found")
-    if prop["org_id"] != org_id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    return await tenants_db.get_by_property(property_id)
+    return owned(await properties.get_tenants_for_org(property_id, org_id), "Property")
@@ -1,11 +1,26 @@
 """API routes for FixMate."""
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response, Depends
+from fastapi.responses import FileResponse, RedirectResponse
 from pydantic import BaseModel
 from typing import Optional, List
+from datetime import datetime
 
-from app.db import issues, messages, activity
+from app.db import issues, messages, activity, usage
 from app.agents import TriageAgent
 from app.agents.triage_agent import AgentAnalytics
+from app.agents.similar_issues import similar_issues
+from app.agents.demo_scenarios import DEMO_SCENARIOS
+from app.db.jobs import agent_jobs
+from app.db.media import issue_media
+from app.db.notifications import notification_outbox
+from app.workers.notification_dispatcher import notification_dispatcher
+from app.workers.timer_scheduler import timer_scheduler
+from app.workers.counter_reconciler import counter_reconciler
+from app.db.timers import issue_timers
+from app.integrations.media_storage import media_storage
+from app.workers.agent_worker import agent_worker_pool, enqueue_new_issue, enqueue_tenant_response
+from app.api.dependencies import get_optional_org_id, owned
+from app.api.conditional import make_etag, etag_matches, set_etag, not_modified
 
 router = APIRouter()
 triage_agent = TriageAgent()
@@ -46,11 +61,12 @@ class IssueResponse(BaseModel):
 
 # Issue endpoints
 @router.post("/issues", response_model=dict)
-async def create_issue(request: CreateIssueRequest):
+async def create_issue(request: CreateIssueRequest, response: Response):
     """Create a new maintenance issue.
 
     If skip_agent=True (team member workflow), the issue is created with
-    status 'escalated' and no AI agent is triggered.
+    status 'escalated' and no AI agent is triggered. Otherwise the triage
+    run is queued and 202 is returned immediately.
     """
     # Create the issue
     issue = await issues.create_issue(
@@ -99,24 +115,53 @@ async def create_issue(request: CreateIssueRequest):
         f"Issue reported: {request.title}\n\n{request.description}"
     )
 
-    try:
-        await triage_agent.handle_new_issue(issue["id"])
-    except Exception as e:
-        await activity.log_activity(
-            issue["id"],
-            "agent_error",
-            {"error": str(e)}
-        )
+    # Queue the triage run - workers pick it up, urgent issues jump the queue
+    job = await enqueue_new_issue(issue)
 
-    return {"id": issue["id"], "status": "created", "message": "Issue created and agent notified"}
+    response.status_code = 202
+    return {
+        "id": issue["id"],
+        "status": "created",
+        "message": "Issue created and agent notified",
+        "job_id": job["id"],
+        "lane": job["lane"],
+    }
 
 
-@router.get("/issues/{issue_id}")
-async def get_issue(issue_id: int):
-    """Get issue details."""
-    issue = await issues.get_issue(issue_id)
-    if not issue:
+async def _issue_version(issue_id: int, org_id: Optional[int]) -> dict:
+    """The issue's version for ETags, or the 404/403 the endpoint would give."""
+    version = await issues.get_issue_version(issue_id)
+    if not version:
         raise HTTPException(status_code=404, detail="Issue not found")
+    if org_id is not None and version["org_id"] != org_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return version
+
+
+@router.get("/issues/{issue_id}")
+async def get_issue(
+    issue_id: int,
+    request: Request,
+    response: Response,
+    org_id: Optional[int] = Depends(get_optional_org_id),
+):
+    """Get issue details (restricted to the caller's org when it sends one).
+
+    Send the last ETag as If-None-Match to get 304 if nothing changed. The
+    detail is a single row, so it is loaded (with the org check in the same
+    query) and the ETag hashes the row itself.
+    """
+    if org_id is not None:
+        issue = owned(await issues.get_issue_for_org(issue_id, org_id), "Issue")
+    else:
+        issue = await issues.get_issue(issue_id)
+        if not issue:
+            raise HTTPException(status_code=404, detail="Issue not found")
+
+    etag = make_etag("issue", issue_id, sorted(issue.items()))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return issue
 
 
@@ -125,8 +170,11 @@ async def list_issues(
     property_id: Optional[int] = None,
     tenant_id: Optional[int] = None,
     status: Optional[str] = None,
+    org_id: Optional[int] = Depends(get_optional_org_id),
 ):
     """List issues with optional filters."""
+    if property_id and org_id is not None:
+        return owned(await issues.get_issues_by_property_for_org(property_id, org_id), "Property")
     if property_id:
         return await issues.get_issues_by_property(property_id)
     elif tenant_id:
@@ -139,8 +187,11 @@ async def list_issues(
 
 
 @router.post("/issues/{issue_id}/messages")
-async def send_message(issue_id: int, request: TenantMessageRequest):
-    """Send a message to the conversation. Role determines if agent responds."""
+async def send_message(issue_id: int, request: TenantMessageRequest, response: Response):
+    """Send a message to the conversation. Role determines if agent responds.
+
+    Tenant messages are recorded and the agent turn is queued (202).
+    """
     issue = await issues.get_issue(issue_id)
     if not issue:
         raise HTTPException(status_code=404, detail="Issue not found")
@@ -149,16 +200,18 @@ async def send_message(issue_id: int, request: TenantMessageRequest):
 
     # Only trigger agent for tenant messages
     if role == "tenant":
-        # Agent's handle_tenant_response adds the message
-        try:
-            await triage_agent.handle_tenant_response(issue_id, request.message)
-        except Exception as e:
-            await activity.log_activity(
-                issue_id,
-                "agent_error",
-                {"error": str(e)}
-            )
-        return {"status": "message_sent", "message": "Agent will respond shortly"}
+        # Record the message now so the thread keeps arrival order,
+        # then queue the agent turn
+        await messages.add_message(issue_id, "tenant", request.message)
+        job = await enqueue_tenant_response(issue, request.message)
+
+        response.status_code = 202
+        return {
+            "status": "message_sent",
+            "message": "Agent will respond shortly",
+            "job_id": job["id"],
+            "lane": job["lane"],
+        }
     else:
         # Team message - save message and log activity, no agent response
         await messages.add_message(issue_id, "team", request.message)
@@ -171,17 +224,83 @@ async def send_message(issue_id: int, request: TenantMessageRequest):
 
 
 @router.get("/issues/{issue_id}/messages")
-async def get_issue_messages(issue_id: int):
-    """Get all messages for an issue."""
-    issue = await issues.get_issue(issue_id)
-    if not issue:
-        raise HTTPException(status_code=404, detail="Issue not found")
+async def get_issue_messages(
+    issue_id: int,
+    request: Request,
+    response: Response,
+    org_id: Optional[int] = Depends(get_optional_org_id),
+):
+    """Get all messages for an issue (304 if If-None-Match is still current)."""
+    version = await _issue_version(issue_id, org_id)
+    etag = make_etag("messages", issue_id, version["last_message_id"])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    set_etag(response, etag)
     return await messages.get_messages(issue_id)
 
 
+@router.get("/issues/{issue_id}/media")
+async def get_issue_media(issue_id: int, org_id: Optional[int] = Depends(get_optional_org_id)):
+    """Attachments sent on an issue, with their download status."""
+    if org_id is not None:
+        return owned(await issue_media.get_for_issue_for_org(issue_id, org_id), "Issue")
+    return await issue_media.get_for_issue(issue_id)
+
+
+@router.get("/issues/{issue_id}/media/{media_id}")
+async def download_issue_media(
+    issue_id: int,
+    media_id: int,
+    thumbnail: bool = False,
+    org_id: Optional[int] = Depends(get_optional_org_id),
+):
+    """
+    Stream a stored attachment (or its thumbnail) from storage.
+
+    The content type comes from the tenant's provider, so originals are
+    always served as downloads; only our own JPEG thumbnail is inline.
+    """
+    if org_id is not None:
+        media = owned(await issue_media.get_media_for_org(issue_id, media_id, org_id), "Media")
+    else:
+        media = await issue_media.get_media(issue_id, media_id)
+    key = media and (media["thumbnail_key"] if thumbnail else media["storage_key"])
+    if not key:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    if thumbnail:
+        filename, media_type, disposition = None, "image/jpeg", "inline"
+    else:
+        filename = media["file_name"] or f"attachment-{media_id}"
+        media_type, disposition = media["content_type"] or "application/octet-stream", "attachment"
+
+    local_path = media_storage.local_path(key)
+    if local_path is None:
+        return RedirectResponse(media_storage.presigned_url(key, disposition=disposition))
+    return FileResponse(
+        local_path,
+        media_type=media_type,
+        filename=filename,
+        content_disposition_type=disposition,
+        headers={"X-Content-Type-Options": "nosniff"},
+    )
+
+
 @router.get("/issues/{issue_id}/activity")
-async def get_issue_activity(issue_id: int):
-    """Get agent activity log for an issue."""
+async def get_issue_activity(
+    issue_id: int,
+    request: Request,
+    response: Response,
+    org_id: Optional[int] = Depends(get_optional_org_id),
+):
+    """Get agent activity log for an issue (304 if If-None-Match is still current)."""
+    version = await _issue_version(issue_id, org_id)
+    etag = make_etag("activity", issue_id, version["last_activity_id"])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    set_etag(response, etag)
     return await activity.get_activities(issue_id)
 
 
@@ -242,6 +361,10 @@ class MuteAgentRequest(BaseModel):
     muted: bool
 
 
+class FollowUpRequest(BaseModel):
+    follow_up_date: datetime
+
+
 @router.put("/issues/{issue_id}/status")
 async def update_issue_status(issue_id: int, request: UpdateStatusRequest):
     """Update issue status directly."""
@@ -355,6 +478,28 @@ async def get_agent_status(issue_id: int):
     return {"issue_id": issue_id, "agent_muted": muted}
 
 
+@router.put("/issues/{issue_id}/follow-up")
+async def set_follow_up(issue_id: int, request: FollowUpRequest):
+    """Schedule (or move) a follow-up; when it's due the agent checks in with the tenant."""
+    issue = await issues.set_follow_up_date(issue_id, request.follow_up_date)
+    if not issue:
+        raise HTTPException(status_code=404, detail="Issue not found")
+
+    await activity.log_activity(
+        issue_id,
+        "follow_up_scheduled",
+        {"follow_up_date": request.follow_up_date.isoformat()},
+        would_notify=None
+    )
+    return {"status": "scheduled", "follow_up_date": issue["follow_up_date"]}
+
+
+@router.get("/issues/{issue_id}/timers")
+async def get_issue_timers(issue_id: int):
+    """Follow-up and SLA timers for an issue, including fired and cancelled ones."""
+    return await issue_timers.get_for_issue(issue_id)
+
+
 # Activity feed endpoint (for dashboard)
 @router.get("/activity")
 async def get_all_activity(limit: int = 50):
@@ -362,10 +507,70 @@ async def get_all_activity(limit: int = 50):
     return await activity.get_activities(limit=limit)
 
 
+# Agent job queue endpoints
+@router.get("/jobs/metrics")
+async def get_job_metrics():
+    """Get agent job queue depth and age per lane."""
+    return await agent_worker_pool.get_metrics()
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: int):
+    """Get the status of a queued agent job."""
+    job = await agent_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: int):
+    """Requeue a dead-lettered agent job."""
+    job = await agent_jobs.retry_dead(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Dead-lettered job not found")
+    return {"status": "queued", "job_id": job["id"]}
+
+
 # ============================================================================
 # Analytics Endpoints (For Investor Demos!)
 # ============================================================================
 
+class NotificationReplayRequest(BaseModel):
+    notification_ids: Optional[List[int]] = None
+
+
+@router.get("/notifications/metrics")
+async def get_notification_metrics():
+    """Notification backlog (pending, recipients awaiting a digest, failed) and dispatcher counters."""
+    return await notification_dispatcher.get_metrics()
+
+
+@router.get("/notifications/failed")
+async def get_failed_notifications(limit: int = 50):
+    """Notifications that could not be delivered."""
+    return {"notifications": await notification_outbox.get_failed(limit)}
+
+
+@router.post("/notifications/replay")
+async def replay_notifications(request: NotificationReplayRequest):
+    """Requeue failed notifications - all of them, or just the given ids."""
+    replayed = await notification_outbox.replay_failed(request.notification_ids)
+    return {"replayed": replayed}
+
+
+@router.get("/timers/metrics")
+async def get_timer_metrics():
+    """Pending and overdue follow-up and SLA timers, and scheduler counters."""
+    return await timer_scheduler.get_metrics()
+
+
+@router.get("/counters/metrics")
+async def get_counter_metrics():
+    """Property counter reconciler rounds and drift corrected (this process)."""
+    return counter_reconciler.get_metrics()
+
+
 @router.get("/analytics/overview")
 async def get_analytics_overview():
     """Get comprehensive analytics overview for the dashboard.
@@ -388,6 +593,7 @@ async def get_analytics_overview():
         "highlights": {
             "ai_resolution_rate": f"{resolution_stats['resolution_rate']:.1f}%",
             "total_savings": f"£{resolution_stats['estimated_savings']:,}",
+            "cost_per_resolved_issue": f"${resolution_stats['cost_per_resolved_issue_usd']:.2f}",
             "avg_response_time": response_times["avg_response_formatted"],
             "issues_handled": resolution_stats["total_issues"],
         }
@@ -422,6 +628,40 @@ async def get_response_time_stats():
     return await AgentAnalytics.get_response_time_stats()
 
 
+@router.get("/analytics/usage")
+async def get_usage_breakdown(org_id: Optional[int] = None, days: int = 30):
+    """Get LLM token usage and cost per org, model and day.
+
+    Shows where the agent's API spend goes.
+    """
+    return await AgentAnalytics.get_usage_breakdown(org_id, days)
+
+
+@router.get("/analytics/usage/issues/{issue_id}")
+async def get_issue_usage(issue_id: int):
+    """Get LLM token usage, latency and cost for one issue."""
+    return await usage.get_issue_usage(issue_id)
+
+
+@router.get("/analytics/model-routing")
+async def get_model_routing_stats(days: int = 30):
+    """Get model routing decisions with their latency, cost and outcomes.
+
+    Use this to tune when turns escalate from the small to the large model.
+    """
+    return await usage.get_routing_outcomes(days)
+
+
+@router.get("/analytics/similar-replies")
+async def get_similar_reply_stats():
+    """Get similar-issue reply reuse statistics.
+
+    Shows how often new issues matched one the AI already resolved.
+    """
+    await similar_issues.ensure_loaded()
+    return similar_issues.get_stats()
+
+
 @router.get("/demo/simulate-issue")
 async def simulate_demo_issue(
     scenario: str = "washing_machine",
@@ -436,36 +676,13 @@ async def simulate_demo_issue(
 
     This creates a realistic demo without needing real tenant data.
     """
-    scenarios = {
-        "washing_machine": {
-            "title": "Washing machine won't start",
-            "description": "My washing machine won't turn on. I pressed the power button but nothing happens. The display is completely blank.",
-            "category": "appliance",
-        },
-        "emergency": {
-            "title": "Smell gas in kitchen",
-            "description": "I can smell gas near the cooker in my kitchen. It started about 10 minutes ago. Should I be worried?",
-            "category": "heating",
-        },
-        "heating": {
-            "title": "No hot water this morning",
-            "description": "Woke up to find we have no hot water. The boiler is showing an error code E119. Radiators are working fine though.",
-            "category": "heating",
-        },
-        "plumbing": {
-            "title": "Kitchen sink draining slowly",
-            "description": "The kitchen sink is draining really slowly. It takes about 5 minutes for the water to go down. Getting worse over the past week.",
-            "category": "plumbing",
-        },
-    }
-
-    if scenario not in scenarios:
+    if scenario not in DEMO_SCENARIOS:
         raise HTTPException(
             status_code=400,
-            detail=f"Unknown scenario. Available: {list(scenarios.keys())}"
+            detail=f"Unknown scenario. Available: {list(DEMO_SCENARIOS.keys())}"
         )
 
-    scenario_data = scenarios[scenario]
+    scenario_data = DEMO_SCENARIOS[scenario]
 
     # Create a demo issue (using tenant_id=1, property_id=1 for demo)
     issue = await issues.create_issue(
@@ -1,10 +1,10 @@
 """API routes for tenant management."""
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 from typing import Optional
 
 from app.db.tenants import tenants
-from app.db.organizations import organizations
+from app.api.dependencies import get_org_id, owned
 
 router = APIRouter(prefix="/api/tenants", tags=["tenants"])
 
@@ -23,27 +23,12 @@ class UpdateTenantRequest(BaseModel):
     phone: Optional[str] = None
 
 
-async def get_org_id_from_header(x_clerk_org_id: Optional[str] = Header(None)) -> int:
-    """Get internal org_id from Clerk org header."""
-    if not x_clerk_org_id:
-        raise HTTPException(status_code=401, detail="Organization ID required")
-    
-    org = await organizations.get_by_clerk_id(x_clerk_org_id)
-    if not org:
-        # Auto-create org if it doesn't exist
-        org = await organizations.create(x_clerk_org_id, "Organization")
-    
-    return org["id"]
-
-
 @router.post("")
 async def create_tenant(
     request: CreateTenantRequest,
-    x_clerk_org_id: Optional[str] = Header(None),
+    org_id: int = Depends(get_org_id),
 ):
     """Create a new tenant."""
-    org_id = await get_org_id_from_header(x_clerk_org_id)
-    
     tenant = await tenants.create(
         org_id=org_id,
         name=request.name,
@@ -57,72 +42,44 @@ async def create_tenant(
 @router.get("")
 async def list_tenants(
     include_inactive: bool = False,
-    x_clerk_org_id: Optional[str] = Header(None),
+    org_id: int = Depends(get_org_id),
 ):
     """List all tenants for the organization."""
-    org_id = await get_org_id_from_header(x_clerk_org_id)
     return await tenants.get_by_org(org_id, include_inactive=include_inactive)
 
 
 @router.get("/{tenant_id}")
 async def get_tenant(
     tenant_id: int,
-    x_clerk_org_id: Optional[str] = Header(None),
+    org_id: int = Depends(get_org_id),
 ):
     """Get a single tenant."""
-    org_id = await get_org_id_from_header(x_clerk_org_id)
-    
-    tenant = await tenants.get_by_id(tenant_id)
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant not found")
-    
-    # Verify org ownership
-    if tenant["org_id"] != org_id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    return tenant
+    return owned(await tenants.get_for_org(tenant_id, org_id), "Tenant")
 
 
 @router.put("/{tenant_id}")
 async def update_tenant(
     tenant_id: int,
     request: UpdateTenantRequest,
-    x_clerk_org_id: Optional[str] = Header(None),
+    org_id: int = Depends(get_org_id),
 ):
     """Update a tenant."""
-    org_id = await get_org_id_from_header(x_clerk_org_id)
-    
-    # Verify ownership first
-    tenant = await tenants.get_by_id(tenant_id)
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant not found")
-    if tenant["org_id"] != org_id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    updated = await tenants.update(
+    updated = await tenants.update_for_org(
         tenant_id,
+        org_id,
         name=request.name,
         email=request.email,
         phone=request.phone,
         property_id=request.property_id,
     )
-    return updated
+    return owned(updated, "Tenant")
 
 
 @router.delete("/{tenant_id}")
 async def delete_tenant(
     tenant_id: int,
-    x_clerk_org_id: Optional[str] = Header(None),
+    org_id: int = Depends(get_org_id),
 ):
     """Soft delete a tenant (preserves history)."""
-    org_id = await get_org_id_from_header(x_clerk_org_id)
-    
-    # Verify ownership first
-    tenant = await tenants.get_by_id(tenant_id)
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant not found")
-    if tenant["org_id"] != org_id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    await tenants.soft_delete(tenant_id)
+    owned(await tenants.soft_delete_for_org(tenant_id, org_id), "Tenant")
     return {"status": "deleted"}
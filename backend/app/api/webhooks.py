@@ -2,19 +2,31 @@
 import os
 import hmac
 import hashlib
-from fastapi import APIRouter, HTTPException, Request, BackgroundTasks, Form
+from fastapi import APIRouter, HTTPException, Request, Form
 from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from typing import Optional, Any
+from typing import Optional, Any, List
 from datetime import datetime
 
 from app.db import issues, messages, activity
 from app.db.whatsapp import whatsapp_conversations
-from app.agents import TriageAgent
+from app.agents.issue_actor import issue_actors
 from app.integrations import respondio_client, twilio_client
+from app.integrations.outbound import coalesce_messages
+from app.integrations.idempotency import inbound_dedupe
+from app.db.inbox import webhook_inbox
+from app.db.cache import tenant_phone_cache
+from app.db.tenants import normalize_phone
+from app.db.organizations import organizations
+from app.db.property_index import property_index, MATCH_THRESHOLD as PROPERTY_MATCH_THRESHOLD
+from app.workers.inbox_worker import inbox_worker_pool
+from app.workers.agent_worker import enqueue_inbound_message, enqueue_new_issue
+from app.workers.outbound_dispatcher import outbound_dispatcher
+from app.db.outbox import outbound_messages
+from app.db.media import issue_media
+from app.workers.media_worker import media_worker_pool
 
 router = APIRouter()
-triage_agent = TriageAgent()
 
 
 class RespondIOWebhookPayload(BaseModel):
@@ -34,6 +46,7 @@ class IncomingMessage(BaseModel):
     text: Optional[str] = None
     channel: Optional[str] = None
     metadata: Optional[dict] = None
+    attachments: Optional[list] = None  # [{"url", "content_type", "file_name"}]
 
 
 def verify_webhook_signature(payload: bytes, signature: str) -> bool:
@@ -56,60 +69,83 @@ def verify_webhook_signature(payload: bytes, signature: str) -> bool:
     return hmac.compare_digest(expected, signature)
 
 
+def attachment_placeholder(attachments: List[dict]) -> str:
+    """Thread text for a message that only carries attachments."""
+    kinds = [(a.get("content_type") or "file").split("/")[0] for a in attachments]
+    return "[Sent " + ", ".join(f"a {kind}" if kind != "image" else "a photo" for kind in kinds) + "]"
+
+
+async def queue_attachments(
+    issue_id: int,
+    provider: str,
+    provider_message_id: Optional[str],
+    attachments: Optional[List[dict]],
+):
+    """
+    Hand a message's attachments to the media workers.
+
+    Failures propagate so the inbox event is retried; the retry finds the
+    message already recorded and queues its attachments again (already
+    queued ones are skipped).
+    """
+    if not attachments:
+        return
+    media_ids = await issue_media.enqueue(issue_id, provider, provider_message_id or None, attachments)
+    if media_ids:
+        print(f"[MEDIA] Queued {len(media_ids)} attachment(s) for issue {issue_id}", flush=True)
+
+
 async def process_whatsapp_message(message: IncomingMessage):
     """
     Process an incoming WhatsApp message.
 
     Routes to existing conversation or creates new issue.
     """
-    # Skip non-text messages for now (could handle images later)
-    if message.message_type != "text" or not message.text:
+    # Attachments are stored by the media workers; the thread gets a caption
+    # or a placeholder so the agent knows something was sent
+    if not message.text and not message.attachments:
         return
-
-    # Check if we have an active conversation for this contact
-    conversation = await whatsapp_conversations.get_active_conversation(
-        message.contact_id
-    )
-
-    if conversation:
-        # Continue existing conversation
-        issue_id = conversation["issue_id"]
-
-        # Record the message
-        await messages.add_message(issue_id, "tenant", message.text)
-
-        # Log activity
-        await activity.log_activity(
-            issue_id,
-            "whatsapp_message_received",
-            {
-                "contact_id": message.contact_id,
-                "message_preview": message.text[:100],
-            }
+    if not message.text:
+        message = message.model_copy(update={"text": attachment_placeholder(message.attachments)})
+
+    # Redelivery of a message another worker (or a previous process) handled;
+    # only its attachments may still need queueing
+    if message.message_id:
+        recorded_issue_id = await messages.get_provider_message_issue_id(message.message_id)
+        if recorded_issue_id is not None:
+            await queue_attachments(recorded_issue_id, "respondio", message.message_id, message.attachments)
+            return
+
+    # Route messages from one contact strictly in arrival order
+    async with issue_actors.contact_order(message.contact_id):
+        # Check if we have an active conversation for this contact
+        conversation = await whatsapp_conversations.get_active_conversation(
+            message.contact_id
         )
 
-        # Trigger agent response
-        try:
-            await triage_agent.handle_tenant_response(issue_id, message.text)
+        if conversation:
+            # Continue existing conversation
+            issue_id = conversation["issue_id"]
 
-            # Send agent's response back via WhatsApp
-            await send_agent_response_to_whatsapp(issue_id, message.contact_id)
-
-        except Exception as e:
+            # Log activity
             await activity.log_activity(
                 issue_id,
-                "agent_error",
-                {"error": str(e), "source": "whatsapp"}
+                "whatsapp_message_received",
+                {
+                    "contact_id": message.contact_id,
+                    "message_preview": message.text[:100],
+                }
             )
-            # Send error message to user
-            await respondio_client.send_message(
-                message.contact_id,
-                "Sorry, I'm having trouble processing your message. "
-                "Please try again or contact your property manager directly."
-            )
-    else:
-        # New conversation - create an issue
-        await handle_new_whatsapp_issue(message)
+
+            # Record the message and queue the agent turn in one statement, so
+            # the reply survives a crash; the job answers over WhatsApp and
+            # quick follow-ups are coalesced into one run
+            issue = await issues.get_issue(issue_id) or {"id": issue_id}
+            await enqueue_inbound_message(issue, "tenant_response", message.text, message.message_id or None)
+            await queue_attachments(issue_id, "respondio", message.message_id, message.attachments)
+        else:
+            # New conversation - create an issue
+            await handle_new_whatsapp_issue(message)
 
 
 async def handle_new_whatsapp_issue(message: IncomingMessage):
@@ -153,12 +189,12 @@ async def handle_new_whatsapp_issue(message: IncomingMessage):
         issue_id=issue["id"],
     )
 
-    # Record the initial message
-    await messages.add_message(
-        issue["id"],
-        "tenant",
-        f"[Via WhatsApp] {message.text}"
+    # Record the initial message and queue the triage run (which replies
+    # over WhatsApp) in one statement
+    await enqueue_inbound_message(
+        issue, "new_issue", f"[Via WhatsApp] {message.text}", message.message_id or None
     )
+    await queue_attachments(issue["id"], "respondio", message.message_id, message.attachments)
 
     # Log activity
     await activity.log_activity(
@@ -170,60 +206,37 @@ async def handle_new_whatsapp_issue(message: IncomingMessage):
         }
     )
 
-    # Trigger the triage agent
-    try:
-        await triage_agent.handle_new_issue(issue["id"])
 
-        # Send agent's response back via WhatsApp
-        await send_agent_response_to_whatsapp(issue["id"], message.contact_id)
+async def send_agent_response_to_whatsapp(issue_id: int, contact_id: str, outbound: List[str]):
+    """
+    Send the messages an agent run produced to WhatsApp.
 
-    except Exception as e:
-        await activity.log_activity(
-            issue["id"],
-            "agent_error",
-            {"error": str(e), "source": "whatsapp"}
-        )
-        await respondio_client.send_message(
-            message.contact_id,
-            "Thanks for reporting this issue! I'll look into it and get back to you shortly."
+    Consecutive messages are coalesced into as few WhatsApp bodies as fit.
+    """
+    for body in coalesce_messages(outbound):
+        # Queued sends are logged by the outbound dispatcher on delivery
+        result = await respondio_client.send_message(
+            contact_id,
+            body,
+            issue_id=issue_id,
         )
 
-
-async def send_agent_response_to_whatsapp(issue_id: int, contact_id: str):
-    """
-    Get the latest agent message and send it to WhatsApp.
-    """
-    # Get recent messages
-    recent_messages = await messages.get_messages(issue_id)
-
-    # Find the most recent agent message
-    for msg in reversed(recent_messages):
-        if msg["role"] == "agent":
-            result = await respondio_client.send_message(
-                contact_id,
-                msg["content"]
+        if result.get("sent"):
+            await activity.log_activity(
+                issue_id,
+                "whatsapp_message_sent",
+                {"contact_id": contact_id, "message_preview": body[:100]}
             )
 
-            if result.get("sent"):
-                await activity.log_activity(
-                    issue_id,
-                    "whatsapp_message_sent",
-                    {"contact_id": contact_id, "message_preview": msg["content"][:100]}
-                )
-            break
-
 
 # Webhook endpoint
 @router.post("/webhooks/respondio")
-async def respondio_webhook(
-    request: Request,
-    background_tasks: BackgroundTasks,
-):
+async def respondio_webhook(request: Request):
     """
     Handle incoming webhooks from Respond.io.
 
     Must respond within 5 seconds to avoid timeout.
-    Heavy processing is done in background tasks.
+    The event is stored in the webhook inbox and processed by inbox workers.
     """
     # Get raw body for signature verification
     body = await request.body()
@@ -245,6 +258,7 @@ async def respondio_webhook(
     # Only process incoming messages
     if event_type == "message:received":
         # Extract message details
+        attachment = data.get("message", {}).get("attachment") or {}
         message = IncomingMessage(
             contact_id=data.get("contact", {}).get("id", ""),
             contact_name=data.get("contact", {}).get("name"),
@@ -254,10 +268,25 @@ async def respondio_webhook(
             text=data.get("message", {}).get("text"),
             channel=data.get("channel", {}).get("type"),
             metadata=data,
+            attachments=[{
+                "url": attachment["url"],
+                "content_type": attachment.get("mimeType"),
+                "file_name": attachment.get("fileName"),
+            }] if attachment.get("url") else None,
         )
 
-        # Process in background to respond quickly
-        background_tasks.add_task(process_whatsapp_message, message)
+        # Retries of a delivery we've already accepted are acked and dropped
+        if inbound_dedupe.check_and_add(f"respondio:{message.message_id}" if message.message_id else None):
+            return {"status": "ok", "event": event_type, "duplicate": True}
+
+        # Persist before acking; a failed store lets Respond.io retry
+        dedupe_key = f"respondio:{message.message_id}" if message.message_id else None
+        try:
+            await webhook_inbox.store("respondio", message.message_id, message.model_dump(), sender=message.contact_id)
+        except Exception as e:
+            inbound_dedupe.discard(dedupe_key)
+            print(f"[RESPONDIO WEBHOOK] Failed to store event: {e}", flush=True)
+            raise HTTPException(status_code=503, detail="Could not accept event")
 
     # Always respond quickly with 200 OK
     return {"status": "ok", "event": event_type}
@@ -289,135 +318,148 @@ def parse_twilio_phone(twilio_from: str) -> str:
     return twilio_from
 
 
+def twilio_attachments(form_data) -> List[dict]:
+    """MediaUrl{n} / MediaContentType{n} pairs from a Twilio webhook."""
+    try:
+        count = int(form_data.get("NumMedia", "0") or 0)
+    except ValueError:
+        count = 0
+    return [
+        {"url": form_data[f"MediaUrl{i}"], "content_type": form_data.get(f"MediaContentType{i}")}
+        for i in range(count)
+        if form_data.get(f"MediaUrl{i}")
+    ]
+
+
 async def process_twilio_message(
     from_number: str,
     body: str,
     message_sid: str,
+    to_number: Optional[str] = None,
+    media: Optional[List[dict]] = None,
 ):
     """
     Process an incoming WhatsApp message from Twilio.
 
     Similar to process_whatsapp_message but uses phone as contact_id.
+    to_number (our WhatsApp number) scopes registration to its org.
+    media holds the message's attachments, queued for the media workers.
     """
+    if not body and media:
+        body = attachment_placeholder(media)
     phone = parse_twilio_phone(from_number)
     contact_id = phone
     print(f"[PROCESS] Processing message for phone={phone}", flush=True)
 
-    # Check for "new issue" command to force fresh start
-    body_lower = body.lower().strip()
-    if body_lower in ["new issue", "new problem", "start over", "reset"]:
-        print(f"[PROCESS] User requested new issue, closing active conversation", flush=True)
-        # Close any active conversation so next message creates a new issue
-        active_conv = await whatsapp_conversations.get_active_conversation(contact_id)
-        if active_conv:
-            await whatsapp_conversations.close_conversation(active_conv["id"])
-            print(f"[PROCESS] Closed conversation {active_conv['id']}", flush=True)
-        await twilio_client.send_message(phone, "Starting a fresh conversation. What's the issue you need help with?")
-        # Don't create an issue yet - wait for user's next message with their actual problem
-        return
-
-    # Check if we have an active conversation for this phone
-    conversation = await whatsapp_conversations.get_active_conversation(contact_id)
-    print(f"[PROCESS] Active conversation: {conversation}", flush=True)
-
-    if conversation:
-        # Continue existing conversation
-        issue_id = conversation["issue_id"]
-        print(f"[PROCESS] Continuing conversation for issue {issue_id}", flush=True)
-
-        # Note: Message is recorded by triage_agent.handle_tenant_response()
-        # to avoid duplicate entries
-
-        # Log activity
-        await activity.log_activity(
-            issue_id,
-            "whatsapp_message_received",
-            {
-                "phone": phone,
-                "message_sid": message_sid,
-                "message_preview": body[:100],
-            }
-        )
-
-        # Trigger agent response
-        try:
-            print(f"[PROCESS] Calling agent for issue {issue_id}", flush=True)
-            agent_result = await triage_agent.handle_tenant_response(issue_id, body)
-            print(f"[PROCESS] Agent result: {agent_result}", flush=True)
-            response_result = await send_twilio_agent_response(issue_id, phone)
-            print(f"[PROCESS] Response send result: {response_result}", flush=True)
-
-        except Exception as e:
-            print(f"[PROCESS] ERROR in process_twilio_message: {e}", flush=True)
+    # Redelivery of a message another worker (or a previous process) handled;
+    # only its attachments may still need queueing
+    if message_sid:
+        recorded_issue_id = await messages.get_provider_message_issue_id(message_sid)
+        if recorded_issue_id is not None:
+            print(f"[PROCESS] Duplicate delivery of {message_sid}, skipping", flush=True)
+            await queue_attachments(recorded_issue_id, "twilio", message_sid, media)
+            return
+
+    # Route messages from one contact strictly in arrival order
+    async with issue_actors.contact_order(contact_id):
+        # Check for "new issue" command to force fresh start
+        body_lower = body.lower().strip()
+        if body_lower in ["new issue", "new problem", "start over", "reset"]:
+            print(f"[PROCESS] User requested new issue, closing active conversation", flush=True)
+            # Close any active conversation so next message creates a new issue
+            active_conv = await whatsapp_conversations.get_active_conversation(contact_id)
+            if active_conv:
+                await whatsapp_conversations.close_conversation(active_conv["id"])
+                print(f"[PROCESS] Closed conversation {active_conv['id']}", flush=True)
+            await twilio_client.send_message(phone, "Starting a fresh conversation. What's the issue you need help with?")
+            # Don't create an issue yet - wait for user's next message with their actual problem
+            return
+
+        # Check if we have an active conversation for this phone
+        conversation = await whatsapp_conversations.get_active_conversation(contact_id)
+        print(f"[PROCESS] Active conversation: {conversation}", flush=True)
+
+        if conversation:
+            # Continue existing conversation
+            issue_id = conversation["issue_id"]
+            print(f"[PROCESS] Continuing conversation for issue {issue_id}", flush=True)
+
+            # Log activity
             await activity.log_activity(
                 issue_id,
-                "agent_error",
-                {"error": str(e), "source": "twilio_whatsapp"}
+                "whatsapp_message_received",
+                {
+                    "phone": phone,
+                    "message_sid": message_sid,
+                    "message_preview": body[:100],
+                }
             )
-            await twilio_client.send_message(
-                phone,
-                "Sorry, I'm having trouble right now. Your property manager has been notified and will get back to you soon."
-            )
-    else:
-        # Check if this is a pending registration (user responding with their details)
-        pending = await whatsapp_conversations.get_pending_registration(contact_id)
-        print(f"[PROCESS] Pending registration: {pending}", flush=True)
-        if pending:
-            print(f"[PROCESS] Handling registration response", flush=True)
-            await handle_registration_response(phone, body, pending)
+
+            # Record the message and queue the agent turn in one statement, so
+            # the reply survives a crash; the job answers over WhatsApp and
+            # quick follow-ups are coalesced into one run
+            print(f"[PROCESS] Queueing message for issue {issue_id}", flush=True)
+            issue = await issues.get_issue(issue_id) or {"id": issue_id}
+            await enqueue_inbound_message(issue, "tenant_response", body, message_sid or None)
+            await queue_attachments(issue_id, "twilio", message_sid, media)
         else:
-            # New conversation - create an issue or start registration
-            print(f"[PROCESS] Calling handle_new_twilio_issue", flush=True)
-            await handle_new_twilio_issue(phone, body, message_sid)
+            # Check if this is a pending registration (user responding with their details)
+            pending = await whatsapp_conversations.get_pending_registration(contact_id)
+            print(f"[PROCESS] Pending registration: {pending}", flush=True)
+            if pending:
+                print(f"[PROCESS] Handling registration response", flush=True)
+                await handle_registration_response(phone, body, pending, to_number)
+            else:
+                # New conversation - create an issue or start registration
+                print(f"[PROCESS] Calling handle_new_twilio_issue", flush=True)
+                await handle_new_twilio_issue(phone, body, message_sid, to_number, media)
 
 
-async def handle_registration_response(phone: str, body: str, pending: dict):
+async def handle_registration_response(
+    phone: str,
+    body: str,
+    pending: dict,
+    to_number: Optional[str] = None,
+):
     """
     Handle a user responding to the registration prompt.
 
     Try to match them to a property and create their tenant record.
     """
-    from app.db.database import fetch_all, fetch_one
+    org_id = await organizations.get_id_by_whatsapp_number(parse_twilio_phone(to_number or ""))
 
-    # Get all properties to try to match
-    properties = await fetch_all("""
-        SELECT id, name, address FROM properties ORDER BY name
-    """)
-
-    if not properties:
-        await twilio_client.send_message(
-            phone,
-            "Sorry, no properties are set up yet. Please contact your property manager directly."
-        )
-        return
-
-    # Try to match the property from their message
-    body_lower = body.lower()
+    # Fuzzy-match the message against property names and addresses
+    candidates = await property_index.search(body, org_id, k=5)
     matched_property = None
-
-    for prop in properties:
-        prop_name = (prop["name"] or "").lower()
-        prop_address = (prop["address"] or "").lower()
-        if prop_name in body_lower or prop_address in body_lower:
-            matched_property = prop
-            break
+    if candidates and candidates[0]["score"] >= PROPERTY_MATCH_THRESHOLD:
+        matched_property = candidates[0]
+        print(f"[REGISTRATION] Matched property {matched_property['id']} (score {matched_property['score']})", flush=True)
 
     if matched_property:
         # Great! We found a match - create the tenant
         await complete_registration(phone, body, matched_property, pending)
-    else:
-        # Couldn't match - show them the options
-        property_list = "\n".join([
-            f"- {p['name']}" + (f" ({p['address']})" if p['address'] else "")
-            for p in properties[:5]  # Limit to 5
-        ])
+        return
 
+    # Couldn't match - show the closest options, or the first few by name
+    properties = candidates or await property_index.list_properties(org_id, limit=5)
+    if not properties:
         await twilio_client.send_message(
             phone,
-            f"I couldn't find that property. Here are the properties I manage:\n\n"
-            f"{property_list}\n\n"
-            f"Please reply with your name and one of these property names."
+            "Sorry, no properties are set up yet. Please contact your property manager directly."
         )
+        return
+
+    property_list = "\n".join([
+        f"- {p['name']}" + (f" ({p['address']})" if p['address'] else "")
+        for p in properties
+    ])
+
+    await twilio_client.send_message(
+        phone,
+        f"I couldn't find that property. Here are the properties I manage:\n\n"
+        f"{property_list}\n\n"
+        f"Please reply with your name and one of these property names."
+    )
 
 
 async def complete_registration(phone: str, body: str, property: dict, pending: dict):
@@ -442,6 +484,7 @@ async def complete_registration(phone: str, body: str, property: dict, pending:
         VALUES ($1, $2, $3, TRUE, NOW(), NOW())
         RETURNING *
     """, name, phone, property["id"])
+    await tenant_phone_cache.invalidate(normalize_phone(phone))
 
     # Complete the registration
     await whatsapp_conversations.complete_registration(phone, tenant["id"])
@@ -479,17 +522,18 @@ async def complete_registration(phone: str, body: str, property: dict, pending:
         issue_id=issue["id"],
     )
 
-    # Trigger the agent to respond to their original issue
-    try:
-        await triage_agent.handle_new_issue(issue["id"])
-        await send_twilio_agent_response(issue["id"], phone)
-    except Exception as e:
-        print(f"Error triggering agent after registration: {e}")
+    # Queue the agent's reply to their original issue
+    await enqueue_new_issue(issue, reply_via="whatsapp")
 
 
-async def handle_new_twilio_issue(phone: str, body: str, message_sid: str):
+async def handle_new_twilio_issue(
+    phone: str,
+    body: str,
+    message_sid: str,
+    to_number: Optional[str] = None,
+    media: Optional[List[dict]] = None,
+):
     """Handle a new issue reported via Twilio WhatsApp."""
-    from app.db.database import fetch_all
     print(f"[NEW ISSUE] Handling new Twilio issue from {phone}", flush=True)
 
     # Try to find tenant by phone number
@@ -506,11 +550,13 @@ async def handle_new_twilio_issue(phone: str, body: str, message_sid: str):
     if not tenant:
         print(f"[NEW ISSUE] Tenant not found for {phone}. Sending registration prompt.", flush=True)
 
-        # Get available properties to show the user
+        # Show the properties their message looks closest to, or the first few
         try:
-            properties = await fetch_all("""
-                SELECT name, address FROM properties ORDER BY name LIMIT 5
-            """)
+            org_id = await organizations.get_id_by_whatsapp_number(parse_twilio_phone(to_number or ""))
+            properties = (
+                await property_index.search(body, org_id, k=5)
+                or await property_index.list_properties(org_id, limit=5)
+            )
             if properties:
                 property_list = "\n".join([
                     f"- {p['name']}" + (f" ({p['address']})" if p['address'] else "")
@@ -575,12 +621,10 @@ async def handle_new_twilio_issue(phone: str, body: str, message_sid: str):
         issue_id=issue["id"],
     )
 
-    # Record the initial message
-    await messages.add_message(
-        issue["id"],
-        "tenant",
-        f"[Via WhatsApp] {body}"
-    )
+    # Record the initial message and queue the triage run (which replies
+    # over WhatsApp) in one statement
+    await enqueue_inbound_message(issue, "new_issue", f"[Via WhatsApp] {body}", message_sid or None)
+    await queue_attachments(issue["id"], "twilio", message_sid, media)
 
     # Log activity
     await activity.log_activity(
@@ -592,81 +636,75 @@ async def handle_new_twilio_issue(phone: str, body: str, message_sid: str):
         }
     )
 
-    # Trigger the triage agent
-    try:
-        await triage_agent.handle_new_issue(issue["id"])
 
-        # Send agent's response back via WhatsApp
-        await send_twilio_agent_response(issue["id"], phone)
+async def send_twilio_agent_response(issue_id: int, phone: str, outbound: List[str]):
+    """
+    Send the messages an agent run produced via Twilio WhatsApp.
 
-    except Exception as e:
-        print(f"Agent error for issue {issue['id']}: {e}")
-        await activity.log_activity(
-            issue["id"],
-            "agent_error",
-            {"error": str(e), "source": "twilio_whatsapp"}
-        )
-        await twilio_client.send_message(
+    Consecutive messages are coalesced into as few WhatsApp bodies as fit;
+    returns the send result for each body.
+    """
+    bodies = coalesce_messages(outbound)
+    print(f"[SEND RESPONSE] {len(outbound)} agent messages -> {len(bodies)} sends for issue {issue_id}", flush=True)
+
+    results = []
+    for body in bodies:
+        # Queued sends are logged by the outbound dispatcher on delivery
+        result = await twilio_client.send_message(
             phone,
-            "I've logged your issue and your property manager will be in touch soon. "
-            "Is there anything else you'd like to add?"
+            body,
+            issue_id=issue_id,
         )
 
+        if result.get("sent"):
+            await activity.log_activity(
+                issue_id,
+                "whatsapp_message_sent",
+                {
+                    "phone": phone,
+                    "message_sid": result.get("message_sid"),
+                    "message_preview": body[:100],
+                }
+            )
+        elif not result.get("queued"):
+            await activity.log_activity(
+                issue_id,
+                "whatsapp_send_failed",
+                {
+                    "phone": phone,
+                    "error": result.get("error"),
+                }
+            )
+        results.append(result)
+    return results
 
-async def send_twilio_agent_response(issue_id: int, phone: str):
-    """
-    Get the latest agent message and send it via Twilio WhatsApp.
+
+async def send_agent_response_for_issue(issue_id: int, outbound: List[str]) -> None:
     """
-    # Get recent messages
-    recent_messages = await messages.get_messages(issue_id)
-    print(f"[SEND RESPONSE] Got {len(recent_messages)} messages for issue {issue_id}", flush=True)
-
-    # Find the most recent agent message
-    for msg in reversed(recent_messages):
-        print(f"[SEND RESPONSE] Checking msg role={msg['role']}", flush=True)
-        if msg["role"] == "agent":
-            print(f"[SEND RESPONSE] Found agent message: {msg['content'][:50]}...", flush=True)
-            result = await twilio_client.send_message(
-                phone,
-                msg["content"]
-            )
-            print(f"[SEND RESPONSE] Twilio result: {result}", flush=True)
-
-            if result.get("sent"):
-                await activity.log_activity(
-                    issue_id,
-                    "whatsapp_message_sent",
-                    {
-                        "phone": phone,
-                        "message_sid": result.get("message_sid"),
-                        "message_preview": msg["content"][:100],
-                    }
-                )
-            else:
-                await activity.log_activity(
-                    issue_id,
-                    "whatsapp_send_failed",
-                    {
-                        "phone": phone,
-                        "error": result.get("error"),
-                    }
-                )
-            return result
+    Send agent messages to the issue's WhatsApp conversation, if it has one.
 
-    print(f"[SEND RESPONSE] No agent message found!", flush=True)
-    return None
+    For runs not started by an inbound message (such as scheduled
+    follow-ups). Twilio conversations use the phone number as contact id.
+    """
+    if not outbound:
+        return
+    conversation = await whatsapp_conversations.get_conversation_by_issue(issue_id)
+    if not conversation:
+        return
+    if conversation.get("phone") and conversation["contact_id"] == conversation["phone"]:
+        await send_twilio_agent_response(issue_id, conversation["phone"], outbound)
+    else:
+        await send_agent_response_to_whatsapp(issue_id, conversation["contact_id"], outbound)
 
 
 @router.post("/webhooks/twilio", response_class=PlainTextResponse)
-async def twilio_webhook(
-    request: Request,
-    background_tasks: BackgroundTasks,
-):
+async def twilio_webhook(request: Request):
     """
     Handle incoming webhooks from Twilio WhatsApp Sandbox.
 
     Twilio sends form-encoded data, not JSON.
     Must respond with TwiML or empty 200 to acknowledge.
+    The message is stored in the webhook inbox and processed by inbox workers.
     """
     # Get form data
     form_data = await request.form()
@@ -686,19 +724,31 @@ async def twilio_webhook(
     from_number = form_data.get("From", "")
     body = form_data.get("Body", "")
     message_sid = form_data.get("MessageSid", "")
+    to_number = form_data.get("To", "")
+    media = twilio_attachments(form_data)
 
     print(f"[TWILIO WEBHOOK] Received message from {from_number}: {body[:50]}...")
     print(f"[TWILIO WEBHOOK] Twilio configured: {twilio_client.is_configured()}")
 
-    # Only process if we have a message
-    if from_number and body:
-        # Process in background to respond quickly
-        background_tasks.add_task(
-            process_twilio_message_with_logging,
-            from_number,
-            body,
-            message_sid,
-        )
+    # Retries of a delivery we've already accepted are acked and dropped
+    if inbound_dedupe.check_and_add(f"twilio:{message_sid}" if message_sid else None):
+        print(f"[TWILIO WEBHOOK] Duplicate delivery of {message_sid}, ignoring")
+        return '<?xml version="1.0" encoding="UTF-8"?><Response></Response>'
+
+    # Only process if we have a message (text, attachments or both)
+    if from_number and (body or media):
+        # Persist before acking; a failed store lets Twilio retry
+        try:
+            await webhook_inbox.store(
+                "twilio",
+                message_sid,
+                {"from": from_number, "body": body, "message_sid": message_sid, "to": to_number, "media": media},
+                sender=from_number,
+            )
+        except Exception as e:
+            inbound_dedupe.discard(f"twilio:{message_sid}" if message_sid else None)
+            print(f"[TWILIO WEBHOOK] Failed to store message: {e}", flush=True)
+            raise HTTPException(status_code=503, detail="Could not accept message")
     else:
         print(f"[TWILIO WEBHOOK] No message to process (from={from_number}, body={body})")
 
@@ -706,28 +756,16 @@ async def twilio_webhook(
     return '<?xml version="1.0" encoding="UTF-8"?><Response></Response>'
 
 
-async def process_twilio_message_with_logging(from_number: str, body: str, message_sid: str):
-    """Wrapper to catch and log all errors in background task."""
-    import sys
+async def notify_twilio_failure(from_number: str):
+    """Tell the tenant their message could not be processed."""
     try:
-        print(f"[BACKGROUND] Starting to process message from {from_number}", flush=True)
-        sys.stdout.flush()
-        await process_twilio_message(from_number, body, message_sid)
-        print(f"[BACKGROUND] Finished processing message from {from_number}", flush=True)
-        sys.stdout.flush()
-    except Exception as e:
-        print(f"[BACKGROUND ERROR] Failed to process message: {e}")
-        import traceback
-        traceback.print_exc()
-        # Try to send error message to user
-        try:
-            phone = parse_twilio_phone(from_number)
-            await twilio_client.send_message(
-                phone,
-                "Sorry, something went wrong. Please try again or contact your property manager."
-            )
-        except Exception as send_error:
-            print(f"[BACKGROUND ERROR] Also failed to send error message: {send_error}")
+        phone = parse_twilio_phone(from_number)
+        await twilio_client.send_message(
+            phone,
+            "Sorry, something went wrong. Please try again or contact your property manager."
+        )
+    except Exception as send_error:
+        print(f"[INBOX] Also failed to send error message: {send_error}")
 
 
 @router.get("/webhooks/twilio")
@@ -740,3 +778,67 @@ async def twilio_webhook_verify():
         "service": "FixMate Twilio WhatsApp Integration",
         "configured": twilio_client.is_configured(),
     }
+
+
+# =============================================================================
+# WEBHOOK INBOX
+# =============================================================================
+
+class InboxReplayRequest(BaseModel):
+    event_ids: Optional[list[int]] = None
+
+
+@router.get("/webhooks/inbox/metrics")
+async def get_inbox_metrics():
+    """Inbox backlog (pending, processing, failed, oldest pending age) and worker counters."""
+    return await inbox_worker_pool.get_metrics()
+
+
+@router.get("/webhooks/inbox/failed")
+async def get_failed_inbox_events(limit: int = 50):
+    """Events that exhausted their retries."""
+    return {"events": await webhook_inbox.get_failed(limit)}
+
+
+@router.post("/webhooks/inbox/replay")
+async def replay_inbox_events(request: InboxReplayRequest):
+    """Requeue failed events - all of them, or just the given ids."""
+    replayed = await webhook_inbox.replay_failed(request.event_ids)
+    return {"replayed": replayed}
+
+
+# =============================================================================
+# OUTBOUND OUTBOX
+# =============================================================================
+
+class OutboxReplayRequest(BaseModel):
+    message_ids: Optional[list[int]] = None
+
+
+@router.get("/webhooks/outbox/metrics")
+async def get_outbox_metrics():
+    """Outbound backlog (pending, sending, failed, oldest pending age) and dispatcher counters."""
+    return await outbound_dispatcher.get_metrics()
+
+
+@router.get("/webhooks/outbox/failed")
+async def get_failed_outbound_messages(limit: int = 50):
+    """Messages that could not be delivered."""
+    return {"messages": await outbound_messages.get_failed(limit)}
+
+
+@router.post("/webhooks/outbox/replay")
+async def replay_outbound_messages(request: OutboxReplayRequest):
+    """Requeue failed messages - all of them, or just the given ids."""
+    replayed = await outbound_messages.replay_failed(request.message_ids)
+    return {"replayed": replayed}
+
+
+# =============================================================================
+# MEDIA
+# =============================================================================
+
+@router.get("/webhooks/media/metrics")
+async def get_media_metrics():
+    """Attachment download backlog and media worker counters."""
+    return await media_worker_pool.get_metrics()
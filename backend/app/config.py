@@ -7,5 +7,141 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 
-# For MVP, we just log notifications instead of sending them
-NOTIFICATIONS_ENABLED = False
+# Similar-issue reply reuse: "seed" adds the proven reply to the prompt,
+# "reuse" sends it (readdressed to the new tenant) without calling the model,
+# "off" disables lookups. Matches never cross organisations
+SIMILAR_REPLY_MODE = os.getenv("SIMILAR_REPLY_MODE", "seed")
+SIMILAR_REPLY_THRESHOLD = float(os.getenv("SIMILAR_REPLY_THRESHOLD", "0.8"))
+
+# Tenant messages arriving within this window (or during a run) are
+# coalesced into a single agent turn
+AGENT_DEBOUNCE_SECONDS = float(os.getenv("AGENT_DEBOUNCE_SECONDS", "1.5"))
+
+# Agent job queue worker pool
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "4"))
+AGENT_PRIORITY_WORKERS = int(os.getenv("AGENT_PRIORITY_WORKERS", "1"))  # reserved for urgent/emergency jobs
+AGENT_JOB_MAX_ATTEMPTS = int(os.getenv("AGENT_JOB_MAX_ATTEMPTS", "3"))
+AGENT_JOB_VISIBILITY_SECONDS = int(os.getenv("AGENT_JOB_VISIBILITY_SECONDS", "120"))
+AGENT_JOB_POLL_SECONDS = float(os.getenv("AGENT_JOB_POLL_SECONDS", "1.0"))
+
+# Models used by the triage agent. Orgs over their monthly LLM budget are
+# degraded to the budget model with a shorter reply limit
+AGENT_MODEL = os.getenv("AGENT_MODEL", "claude-sonnet-4-20250514")
+AGENT_BUDGET_MODEL = os.getenv("AGENT_BUDGET_MODEL", "claude-3-5-haiku-20241022")
+
+# Tiered model routing: "tiered" sends routine turns to the small model and
+# escalates to AGENT_MODEL; "large_only" / "small_only" pin one model.
+# Orgs can override these via organizations.agent_model_policy
+AGENT_ROUTING_MODE = os.getenv("AGENT_ROUTING_MODE", "tiered")
+AGENT_SMALL_MODEL = os.getenv("AGENT_SMALL_MODEL", AGENT_BUDGET_MODEL)
+AGENT_MAX_FAILED_ATTEMPTS = int(os.getenv("AGENT_MAX_FAILED_ATTEMPTS", "2"))
+
+# Inbound webhook deduplication (in-memory front for the provider_message_id index)
+INBOUND_DEDUPE_TTL_SECONDS = int(os.getenv("INBOUND_DEDUPE_TTL_SECONDS", "900"))
+INBOUND_DEDUPE_MAX_ENTRIES = int(os.getenv("INBOUND_DEDUPE_MAX_ENTRIES", "20000"))
+
+# Webhook inbox drain workers
+INBOX_WORKERS = int(os.getenv("INBOX_WORKERS", "4"))
+INBOX_MAX_ATTEMPTS = int(os.getenv("INBOX_MAX_ATTEMPTS", "5"))
+INBOX_VISIBILITY_SECONDS = int(os.getenv("INBOX_VISIBILITY_SECONDS", "300"))
+INBOX_POLL_SECONDS = float(os.getenv("INBOX_POLL_SECONDS", "0.5"))
+
+# Read caches (invalidated across workers via Postgres NOTIFY)
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "fixmate_cache")
+TENANT_CACHE_TTL_SECONDS = int(os.getenv("TENANT_CACHE_TTL_SECONDS", "300"))
+TENANT_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("TENANT_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+TENANT_CACHE_MAX_ENTRIES = int(os.getenv("TENANT_CACHE_MAX_ENTRIES", "10000"))
+ROUTE_CACHE_TTL_SECONDS = int(os.getenv("ROUTE_CACHE_TTL_SECONDS", "300"))
+ROUTE_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("ROUTE_CACHE_NEGATIVE_TTL_SECONDS", "5"))
+ROUTE_CACHE_MAX_ENTRIES = int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "20000"))
+
+# Outbound WhatsApp dispatcher
+# Rate is per sender number per process; WhatsApp's default throughput tier
+# is 80 messages/second per business number
+OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", "4"))
+OUTBOUND_RATE_PER_SECOND = float(os.getenv("OUTBOUND_RATE_PER_SECOND", "80"))
+OUTBOUND_BURST = int(os.getenv("OUTBOUND_BURST", "20"))
+OUTBOUND_MAX_ATTEMPTS = int(os.getenv("OUTBOUND_MAX_ATTEMPTS", "6"))
+OUTBOUND_VISIBILITY_SECONDS = int(os.getenv("OUTBOUND_VISIBILITY_SECONDS", "60"))
+OUTBOUND_POLL_SECONDS = float(os.getenv("OUTBOUND_POLL_SECONDS", "1.0"))
+OUTBOUND_BACKOFF_SECONDS = float(os.getenv("OUTBOUND_BACKOFF_SECONDS", "2"))
+
+# Respond.io HTTP client pool and contact lookup cache
+RESPONDIO_MAX_CONNECTIONS = int(os.getenv("RESPONDIO_MAX_CONNECTIONS", "20"))
+RESPONDIO_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("RESPONDIO_MAX_KEEPALIVE_CONNECTIONS", "10"))
+RESPONDIO_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("RESPONDIO_KEEPALIVE_EXPIRY_SECONDS", "60"))
+RESPONDIO_CONTACT_CACHE_TTL_SECONDS = int(os.getenv("RESPONDIO_CONTACT_CACHE_TTL_SECONDS", "300"))
+RESPONDIO_CONTACT_CACHE_MAX_ENTRIES = int(os.getenv("RESPONDIO_CONTACT_CACHE_MAX_ENTRIES", "5000"))
+RESPONDIO_BATCH_CONCURRENCY = int(os.getenv("RESPONDIO_BATCH_CONCURRENCY", "8"))
+RESPONDIO_BATCH_MAX_ATTEMPTS = int(os.getenv("RESPONDIO_BATCH_MAX_ATTEMPTS", "4"))
+
+# WhatsApp media ingestion
+# Attachments are streamed to storage in chunks (never held in memory) and
+# stored once per content hash. Backend "local" writes under MEDIA_STORAGE_DIR;
+# "s3" uploads to MEDIA_S3_BUCKET (needs boto3). Thumbnails need Pillow
+MEDIA_STORAGE_BACKEND = os.getenv("MEDIA_STORAGE_BACKEND", "local")
+MEDIA_STORAGE_DIR = os.getenv("MEDIA_STORAGE_DIR", "media")
+MEDIA_S3_BUCKET = os.getenv("MEDIA_S3_BUCKET", "")
+MEDIA_S3_PREFIX = os.getenv("MEDIA_S3_PREFIX", "media/")
+MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", str(25 * 1024 * 1024)))
+MEDIA_CHUNK_BYTES = int(os.getenv("MEDIA_CHUNK_BYTES", str(64 * 1024)))
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+MEDIA_THUMBNAIL_WORKERS = int(os.getenv("MEDIA_THUMBNAIL_WORKERS", "2"))  # processes
+MEDIA_THUMBNAIL_SIZE = int(os.getenv("MEDIA_THUMBNAIL_SIZE", "320"))
+MEDIA_MAX_ATTEMPTS = int(os.getenv("MEDIA_MAX_ATTEMPTS", "5"))
+MEDIA_VISIBILITY_SECONDS = int(os.getenv("MEDIA_VISIBILITY_SECONDS", "600"))
+MEDIA_POLL_SECONDS = float(os.getenv("MEDIA_POLL_SECONDS", "2.0"))
+
+# Bulk announcements. Recipients are released into the outbound outbox at
+# BROADCAST_RATE_PER_SECOND (per process), with at most
+# BROADCAST_MAX_IN_FLIGHT unsent per broadcast, leaving the rest of the
+# sender's OUTBOUND_RATE_PER_SECOND for interactive replies
+BROADCAST_PROVIDER = os.getenv("BROADCAST_PROVIDER", "twilio")
+BROADCAST_RATE_PER_SECOND = float(os.getenv("BROADCAST_RATE_PER_SECOND", "20"))
+BROADCAST_MAX_IN_FLIGHT = int(os.getenv("BROADCAST_MAX_IN_FLIGHT", "100"))
+BROADCAST_POLL_SECONDS = float(os.getenv("BROADCAST_POLL_SECONDS", "1.0"))
+BROADCAST_MAX_ATTEMPTS = int(os.getenv("BROADCAST_MAX_ATTEMPTS", "4"))
+
+# Notifications for would_notify activity (off until channels are set up).
+# Non-urgent events for a recipient are held for NOTIFICATION_DIGEST_MINUTES
+# and sent as one digest; escalations at these priorities go out at once
+NOTIFICATIONS_ENABLED = os.getenv("NOTIFICATIONS_ENABLED", "false").lower() == "true"
+NOTIFICATION_DIGEST_MINUTES = float(os.getenv("NOTIFICATION_DIGEST_MINUTES", "60"))
+NOTIFICATION_URGENT_PRIORITIES = os.getenv("NOTIFICATION_URGENT_PRIORITIES", "urgent").split(",")
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "20"))  # digests per send round
+NOTIFICATION_VISIBILITY_SECONDS = int(os.getenv("NOTIFICATION_VISIBILITY_SECONDS", "120"))
+NOTIFICATION_POLL_SECONDS = float(os.getenv("NOTIFICATION_POLL_SECONDS", "5.0"))
+
+# Email notifications (point at a local stand-in such as
+# `python -m aiosmtpd -n -l localhost:1025` in development)
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "1025"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "false").lower() == "true"
+NOTIFICATION_EMAIL_FROM = os.getenv("NOTIFICATION_EMAIL_FROM", "FixMate <notifications@fixmate.local>")
+
+# Follow-up and SLA timers. Escalated issues breach their SLA if still
+# escalated (nobody assigned) after SLA_HOURS for their priority; the
+# scheduler sleeps until the next timer is due, at most TIMER_POLL_SECONDS
+SLA_HOURS = {
+    priority: float(hours)
+    for priority, hours in (
+        item.split(":") for item in os.getenv("SLA_HOURS", "urgent:4,high:24,medium:72,low:168").split(",")
+    )
+}
+TIMER_BATCH_SIZE = int(os.getenv("TIMER_BATCH_SIZE", "50"))
+TIMER_MAX_ATTEMPTS = int(os.getenv("TIMER_MAX_ATTEMPTS", "5"))
+TIMER_VISIBILITY_SECONDS = int(os.getenv("TIMER_VISIBILITY_SECONDS", "120"))
+TIMER_POLL_SECONDS = float(os.getenv("TIMER_POLL_SECONDS", "30"))
+
+# Clerk org id -> internal org id, resolved on every org-scoped request.
+# The mapping never changes once created, so entries live long
+ORG_CACHE_TTL_SECONDS = int(os.getenv("ORG_CACHE_TTL_SECONDS", "3600"))
+ORG_CACHE_MAX_ENTRIES = int(os.getenv("ORG_CACHE_MAX_ENTRIES", "10000"))
+
+# Property counter reconciliation. Triggers keep property_counters exact;
+# this periodic recount (one instance at a time) repairs any drift
+COUNTER_RECONCILE_INTERVAL_SECONDS = float(os.getenv("COUNTER_RECONCILE_INTERVAL_SECONDS", "3600"))
+COUNTER_RECONCILE_BATCH_SIZE = int(os.getenv("COUNTER_RECONCILE_BATCH_SIZE", "500"))
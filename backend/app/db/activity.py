@@ -1,7 +1,9 @@
 """Agent activity logging."""
 import json
 from typing import Optional, List, Dict, Any
+from app.config import NOTIFICATIONS_ENABLED
 from app.db.database import fetch_all, execute_returning
+from app.db.notifications import notification_outbox
 
 
 async def log_activity(
@@ -10,7 +12,11 @@ async def log_activity(
     details: Optional[Dict[str, Any]] = None,
     would_notify: Optional[str] = None,
 ) -> Dict[str, Any]:
-    """Log an agent activity."""
+    """Log an agent activity.
+
+    With notifications enabled, would_notify targets are queued in the
+    notification outbox.
+    """
     query = """
         INSERT INTO agent_activity (issue_id, action, details, would_notify)
         VALUES ($1, $2, $3, $4)
@@ -18,7 +24,14 @@ async def log_activity(
     """
     details_str = json.dumps(details) if details else None
     row = await execute_returning(query, issue_id, action, details_str, would_notify)
-    return dict(row)
+    act = dict(row)
+    if would_notify and NOTIFICATIONS_ENABLED:
+        try:
+            await notification_outbox.enqueue_for_activity(act)
+        except Exception as e:
+            # A notification problem must never fail the action being logged
+            print(f"[NOTIFY] Failed to queue notifications for activity {act.get('id')}: {e}", flush=True)
+    return act
 
 
 async def get_activities(issue_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
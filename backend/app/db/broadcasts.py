@@ -0,0 +1,224 @@
+"""Bulk announcement (broadcast) database operations."""
+import json
+from typing import Optional, Dict, Any, List
+from app.db.database import fetch_one, fetch_all, execute_returning, execute
+from app.db.scoped import ISSUE_ORG
+
+PROGRESS_COLUMNS = """
+    COUNT(*) as total,
+    COUNT(*) FILTER (WHERE r.status = 'pending') as pending,
+    COUNT(*) FILTER (WHERE r.status = 'queued' AND o.status IN ('pending', 'sending')) as sending,
+    COUNT(*) FILTER (WHERE o.status = 'sent') as sent,
+    COUNT(*) FILTER (WHERE o.status = 'failed') as failed,
+    COUNT(*) FILTER (WHERE r.status = 'cancelled') as cancelled
+"""
+
+
+def _progress(row) -> Dict[str, Any]:
+    progress = {key: row[key] or 0 for key in ("total", "pending", "sending", "sent", "failed", "cancelled")}
+    done = progress["sent"] + progress["failed"] + progress["cancelled"]
+    progress["percent_complete"] = round(100 * done / progress["total"], 1) if progress["total"] else 100.0
+    return progress
+
+
+class Broadcasts:
+    """Announcements fanned out to many tenants through the outbound outbox."""
+
+    async def create(
+        self,
+        org_id: int,
+        provider: str,
+        payload: Dict[str, Any],
+        property_id: Optional[int] = None,
+        created_by: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Create a broadcast and resolve its recipients in one statement.
+
+        Recipients are the org's active tenants with a phone number (of one
+        property, if given), one per number. A tenant's org is their
+        property's, else their own (WhatsApp self-registered tenants have
+        no org_id of their own).
+        """
+        row = await execute_returning(f"""
+            WITH broadcast AS (
+                INSERT INTO broadcasts (org_id, property_id, provider, payload, created_by)
+                VALUES ($1, $2, $3, $4, $5)
+                RETURNING *
+            ),
+            recipients AS (
+                INSERT INTO broadcast_recipients (broadcast_id, tenant_id, phone)
+                SELECT DISTINCT ON (t.phone) b.id, t.id, t.phone
+                FROM broadcast b
+                JOIN tenants t ON b.property_id IS NULL OR t.property_id = b.property_id
+                LEFT JOIN properties p ON p.id = t.property_id
+                WHERE {ISSUE_ORG} = b.org_id
+                AND COALESCE(t.is_active, TRUE)
+                AND t.phone IS NOT NULL AND t.phone <> ''
+                ORDER BY t.phone, t.id
+                RETURNING 1
+            )
+            SELECT broadcast.*, (SELECT COUNT(*) FROM recipients) as recipients
+            FROM broadcast
+        """, org_id, property_id, provider, json.dumps(payload), created_by)
+        broadcast = dict(row)
+        broadcast["payload"] = json.loads(broadcast["payload"])
+        return broadcast
+
+    async def get_running(self) -> List[Dict[str, Any]]:
+        """Broadcasts that still have recipients to release or deliveries to wait on."""
+        rows = await fetch_all("""
+            SELECT id, provider FROM broadcasts WHERE status = 'running' ORDER BY id
+        """)
+        return [dict(row) for row in rows]
+
+    async def in_flight(self, broadcast_id: int) -> int:
+        """Released recipients whose message hasn't been sent (or given up on) yet."""
+        row = await fetch_one("""
+            SELECT COUNT(*) as in_flight
+            FROM broadcast_recipients r
+            JOIN outbound_messages o ON o.id = r.outbound_id
+            WHERE r.broadcast_id = $1 AND r.status = 'queued'
+            AND o.status IN ('pending', 'sending')
+        """, broadcast_id)
+        return row["in_flight"] if row else 0
+
+    async def release(self, broadcast_id: int, sender: str, limit: int, max_attempts: int) -> int:
+        """
+        Move up to `limit` pending recipients into the outbound outbox.
+
+        Claiming recipients, queueing their messages and recording the
+        outbox ids happen in one statement, so a crash can neither lose nor
+        double-send a recipient and concurrent workers skip each other's rows.
+        """
+        result = await execute("""
+            WITH broadcast AS (
+                SELECT id, provider, payload FROM broadcasts
+                WHERE id = $1 AND status = 'running'
+            ),
+            batch AS (
+                SELECT r.id,
+                       CASE WHEN b.provider = 'respondio' THEN 'phone:' || r.phone ELSE r.phone END as recipient
+                FROM broadcast_recipients r
+                JOIN broadcast b ON b.id = r.broadcast_id
+                WHERE r.broadcast_id = $1 AND r.status = 'pending'
+                ORDER BY r.id
+                FOR UPDATE OF r SKIP LOCKED
+                LIMIT $2
+            ),
+            queued AS (
+                INSERT INTO outbound_messages (provider, sender, recipient, payload, max_attempts)
+                SELECT b.provider, $3, batch.recipient, b.payload, $4
+                FROM batch CROSS JOIN broadcast b
+                ORDER BY batch.id
+                RETURNING id, recipient
+            )
+            UPDATE broadcast_recipients r
+            SET status = 'queued', outbound_id = queued.id, queued_at = NOW()
+            FROM batch JOIN queued ON queued.recipient = batch.recipient
+            WHERE r.id = batch.id
+        """, broadcast_id, limit, sender, max_attempts)
+        return int(result.split()[-1]) if result else 0
+
+    async def complete_if_done(self, broadcast_id: int) -> bool:
+        """Mark a running broadcast completed once nothing is left to send."""
+        result = await execute("""
+            UPDATE broadcasts b
+            SET status = 'completed', completed_at = NOW()
+            WHERE b.id = $1 AND b.status = 'running'
+            AND NOT EXISTS (
+                SELECT 1 FROM broadcast_recipients r
+                LEFT JOIN outbound_messages o ON o.id = r.outbound_id
+                WHERE r.broadcast_id = b.id
+                AND (r.status = 'pending' OR (r.status = 'queued' AND o.status IN ('pending', 'sending')))
+            )
+        """, broadcast_id)
+        return bool(result) and int(result.split()[-1]) > 0
+
+    async def set_status(self, broadcast_id: int, org_id: int, status: str, from_statuses: List[str]) -> bool:
+        """Pause, resume or cancel; cancelling also drops recipients not yet released."""
+        row = await execute_returning("""
+            UPDATE broadcasts
+            SET status = $3,
+                completed_at = CASE WHEN $3 = 'cancelled' THEN NOW() ELSE completed_at END
+            WHERE id = $1 AND org_id = $2 AND status = ANY($4::text[])
+            RETURNING id
+        """, broadcast_id, org_id, status, from_statuses)
+        if row and status == "cancelled":
+            await execute("""
+                UPDATE broadcast_recipients SET status = 'cancelled'
+                WHERE broadcast_id = $1 AND status = 'pending'
+            """, broadcast_id)
+        return row is not None
+
+    async def get(self, broadcast_id: int, org_id: int) -> Optional[Dict[str, Any]]:
+        """A broadcast with its delivery progress."""
+        row = await fetch_one("""
+            SELECT * FROM broadcasts WHERE id = $1 AND org_id = $2
+        """, broadcast_id, org_id)
+        if not row:
+            return None
+        broadcast = dict(row)
+        broadcast["payload"] = json.loads(broadcast["payload"])
+        progress = await fetch_one(f"""
+            SELECT {PROGRESS_COLUMNS}
+            FROM broadcast_recipients r
+            LEFT JOIN outbound_messages o ON o.id = r.outbound_id
+            WHERE r.broadcast_id = $1
+        """, broadcast_id)
+        broadcast["progress"] = _progress(progress)
+        return broadcast
+
+    async def get_by_org(self, org_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        """Recent broadcasts for an org with their progress."""
+        rows = await fetch_all(f"""
+            SELECT b.id, b.property_id, b.provider, b.status, b.created_by,
+                   b.created_at, b.completed_at, p.*
+            FROM (
+                SELECT * FROM broadcasts WHERE org_id = $1 ORDER BY id DESC LIMIT $2
+            ) b
+            CROSS JOIN LATERAL (
+                SELECT {PROGRESS_COLUMNS}
+                FROM broadcast_recipients r
+                LEFT JOIN outbound_messages o ON o.id = r.outbound_id
+                WHERE r.broadcast_id = b.id
+            ) p
+            ORDER BY b.id DESC
+        """, org_id, limit)
+        broadcasts = []
+        for row in rows:
+            broadcast = {key: row[key] for key in ("id", "property_id", "provider", "status",
+                                                  "created_by", "created_at", "completed_at")}
+            broadcast["progress"] = _progress(row)
+            broadcasts.append(broadcast)
+        return broadcasts
+
+    async def get_recipients(
+        self,
+        broadcast_id: int,
+        status: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Per-recipient delivery status (pending, sending, sent, failed, cancelled)."""
+        rows = await fetch_all("""
+            SELECT * FROM (
+                SELECT r.id, r.tenant_id, r.phone, r.queued_at, o.sent_at, o.attempts, o.last_error,
+                       CASE
+                           WHEN r.status = 'queued' AND o.status IN ('pending', 'sending') THEN 'sending'
+                           WHEN r.status = 'queued' THEN COALESCE(o.status, 'sent')
+                           ELSE r.status
+                       END as status
+                FROM broadcast_recipients r
+                LEFT JOIN outbound_messages o ON o.id = r.outbound_id
+                WHERE r.broadcast_id = $1
+            ) recipients
+            WHERE $2::text IS NULL OR status = $2
+            ORDER BY id
+            LIMIT $3 OFFSET $4
+        """, broadcast_id, status, limit, offset)
+        return [dict(row) for row in rows]
+
+
+# Singleton instance
+broadcasts = Broadcasts()
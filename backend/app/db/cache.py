@@ -0,0 +1,197 @@
+"""In-process read caches with cross-worker invalidation.
+
+Hot lookups (e.g. tenant by phone on every inbound WhatsApp message) are
+cached per process in a bounded LRU with a TTL. Writers invalidate the local
+entry and publish the key on a Postgres NOTIFY channel so every other worker
+drops it too. If the listener connection is lost, all caches are cleared
+because invalidations may have been missed; the TTL bounds staleness in the
+meantime.
+"""
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+import asyncpg
+
+from app.config import (
+    DATABASE_URL,
+    CACHE_INVALIDATION_CHANNEL,
+    TENANT_CACHE_TTL_SECONDS,
+    TENANT_CACHE_NEGATIVE_TTL_SECONDS,
+    TENANT_CACHE_MAX_ENTRIES,
+    ROUTE_CACHE_TTL_SECONDS,
+    ROUTE_CACHE_NEGATIVE_TTL_SECONDS,
+    ROUTE_CACHE_MAX_ENTRIES,
+    ORG_CACHE_TTL_SECONDS,
+    ORG_CACHE_MAX_ENTRIES,
+)
+from app.db.database import get_connection, execute
+
+# Identifies this process so it can skip its own notifications
+PROCESS_ID = uuid.uuid4().hex
+
+RECONNECT_SECONDS = 5
+
+
+class TTLCache:
+    """
+    LRU cache whose entries expire.
+
+    A None value is a cached miss and uses the shorter negative TTL, so
+    repeated lookups for unknown keys don't reach the database.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, negative_ttl_seconds: float, max_entries: int):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (found, value); a found None is a cached miss."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def set(self, key: str, value: Any):
+        """Cache a value (or a miss, if None)."""
+        ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def invalidate(self, *keys: Optional[str]):
+        """Drop keys here and tell the other workers to drop them."""
+        keys = [key for key in keys if key]
+        for key in keys:
+            self.delete(key)
+        if keys:
+            await cache_bus.publish(self.name, keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0,
+        }
+
+
+class CacheBus:
+    """Postgres LISTEN/NOTIFY channel carrying cache invalidations."""
+
+    def __init__(self, channel: str = CACHE_INVALIDATION_CHANNEL):
+        self.channel = channel
+        self._caches: Dict[str, TTLCache] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def register(self, cache: TTLCache) -> TTLCache:
+        self._caches[cache.name] = cache
+        return cache
+
+    async def publish(self, cache_name: str, keys: list):
+        """Notify other workers; failures only cost staleness up to the TTL."""
+        if not DATABASE_URL:
+            return
+        payload = json.dumps({"cache": cache_name, "keys": keys, "origin": PROCESS_ID})
+        try:
+            await execute("SELECT pg_notify($1, $2)", self.channel, payload)
+        except Exception as e:
+            print(f"[CACHE] Failed to publish invalidation: {e}", flush=True)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("origin") == PROCESS_ID:
+            return
+        cache = self._caches.get(message.get("cache"))
+        if cache:
+            for key in message.get("keys", []):
+                cache.delete(key)
+
+    def _clear_all(self):
+        for cache in self._caches.values():
+            cache.clear()
+
+    async def _listen(self):
+        """Hold a listening connection, reconnecting when it drops."""
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = await get_connection()
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(self.channel, self._on_notify)
+                # Anything cached before we were listening may be stale
+                self._clear_all()
+                stop_wait = asyncio.create_task(self._stopping.wait())
+                lost_wait = asyncio.create_task(lost.wait())
+                await asyncio.wait({stop_wait, lost_wait}, return_when=asyncio.FIRST_COMPLETED)
+                stop_wait.cancel()
+                lost_wait.cancel()
+            except (OSError, asyncpg.PostgresError) as e:
+                print(f"[CACHE] Invalidation listener error: {e}", flush=True)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            if not self._stopping.is_set():
+                self._clear_all()
+                await asyncio.sleep(RECONNECT_SECONDS)
+
+    def start(self):
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: cache.get_stats() for name, cache in self._caches.items()}
+
+
+# Singleton instances
+cache_bus = CacheBus()
+tenant_phone_cache = cache_bus.register(TTLCache(
+    "tenant_by_phone",
+    TENANT_CACHE_TTL_SECONDS,
+    TENANT_CACHE_NEGATIVE_TTL_SECONDS,
+    TENANT_CACHE_MAX_ENTRIES,
+))
+contact_route_cache = cache_bus.register(TTLCache(
+    "contact_route",
+    ROUTE_CACHE_TTL_SECONDS,
+    ROUTE_CACHE_NEGATIVE_TTL_SECONDS,
+    ROUTE_CACHE_MAX_ENTRIES,
+))
+org_id_cache = cache_bus.register(TTLCache(
+    "org_by_clerk_id",
+    ORG_CACHE_TTL_SECONDS,
+    0,  # misses are never cached; an unknown org is created
+    ORG_CACHE_MAX_ENTRIES,
+))
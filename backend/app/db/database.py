@@ -42,3 +42,18 @@ async def execute_returning(query: str, *args):
     """Execute a query and return the result."""
     async with get_db() as conn:
         return await conn.fetchrow(query, *args)
+
+
+@asynccontextmanager
+async def advisory_lock(namespace: int, key: int):
+    """Hold a Postgres session advisory lock for the duration of the block.
+
+    The lock lives on a dedicated connection, so it is released even if the
+    process dies mid-block and the connection drops.
+    """
+    async with get_db() as conn:
+        await conn.execute("SELECT pg_advisory_lock($1, $2)", namespace, key)
+        try:
+            yield conn
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1, $2)", namespace, key)
@@ -0,0 +1,140 @@
+"""Webhook inbox database operations."""
+import json
+from typing import Optional, Dict, Any, List
+from app.config import INBOX_MAX_ATTEMPTS
+from app.db.database import fetch_one, fetch_all, execute_returning, execute
+
+
+class WebhookInbox:
+    """Durable store for inbound webhook events awaiting processing."""
+
+    async def store(
+        self,
+        provider: str,
+        provider_message_id: Optional[str],
+        payload: Dict[str, Any],
+        sender: Optional[str] = None,
+        max_attempts: int = INBOX_MAX_ATTEMPTS,
+    ) -> Optional[int]:
+        """
+        Store a raw inbound event with a single INSERT.
+
+        Events from the same sender are processed one at a time, in the
+        order stored. Returns the inbox id, or None if the provider already
+        delivered this message.
+        """
+        query = """
+            INSERT INTO webhook_inbox (provider, provider_message_id, payload, sender, max_attempts)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (provider, provider_message_id) WHERE provider_message_id IS NOT NULL DO NOTHING
+            RETURNING id
+        """
+        row = await execute_returning(
+            query, provider, provider_message_id or None, json.dumps(payload), sender or None, max_attempts
+        )
+        return row["id"] if row else None
+
+    async def claim(self, visibility_seconds: int) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest available event.
+
+        An event is held back while an earlier one from the same sender is
+        still pending or processing, so one contact's messages are never
+        handled concurrently or out of order. Events left in 'processing'
+        past their visibility timeout (a worker died mid-event) become
+        claimable again.
+        """
+        query = """
+            UPDATE webhook_inbox
+            SET status = 'processing',
+                attempts = attempts + 1,
+                locked_until = NOW() + make_interval(secs => $1)
+            WHERE id = (
+                SELECT w.id FROM webhook_inbox w
+                WHERE ((w.status = 'pending' AND w.available_at <= NOW())
+                       OR (w.status = 'processing' AND w.locked_until < NOW()))
+                AND NOT EXISTS (
+                    SELECT 1 FROM webhook_inbox earlier
+                    WHERE earlier.provider = w.provider
+                    AND earlier.sender = w.sender
+                    AND earlier.id < w.id
+                    AND earlier.status IN ('pending', 'processing')
+                )
+                ORDER BY w.id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING *
+        """
+        row = await execute_returning(query, visibility_seconds)
+        if not row:
+            return None
+        event = dict(row)
+        event["payload"] = json.loads(event["payload"])
+        return event
+
+    async def complete(self, event_id: int) -> None:
+        """Mark an event as processed."""
+        query = """
+            UPDATE webhook_inbox
+            SET status = 'done', processed_at = NOW(), locked_until = NULL
+            WHERE id = $1
+        """
+        await execute(query, event_id)
+
+    async def fail(self, event_id: int, error: str, backoff_seconds: int) -> Optional[Dict[str, Any]]:
+        """Record a failed attempt; retry after a backoff or park as 'failed'."""
+        query = """
+            UPDATE webhook_inbox
+            SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+                available_at = NOW() + make_interval(secs => $3 * attempts),
+                locked_until = NULL,
+                last_error = $2
+            WHERE id = $1
+            RETURNING id, status, attempts
+        """
+        row = await execute_returning(query, event_id, error[:2000], backoff_seconds)
+        return dict(row) if row else None
+
+    async def replay_failed(self, event_ids: Optional[List[int]] = None) -> int:
+        """Put failed events (all, or the given ids) back in the queue."""
+        query = """
+            UPDATE webhook_inbox
+            SET status = 'pending', attempts = 0, available_at = NOW(), last_error = NULL
+            WHERE status = 'failed'
+            AND ($1::bigint[] IS NULL OR id = ANY($1::bigint[]))
+        """
+        result = await execute(query, event_ids)
+        return int(result.split()[-1]) if result else 0
+
+    async def get_failed(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent failed events."""
+        rows = await fetch_all("""
+            SELECT id, provider, provider_message_id, attempts, last_error, received_at
+            FROM webhook_inbox
+            WHERE status = 'failed'
+            ORDER BY id DESC
+            LIMIT $1
+        """, limit)
+        return [dict(row) for row in rows]
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Backlog size and age."""
+        row = await fetch_one("""
+            SELECT COUNT(*) FILTER (WHERE status = 'pending') as pending,
+                   COUNT(*) FILTER (WHERE status = 'processing') as processing,
+                   COUNT(*) FILTER (WHERE status = 'failed') as failed,
+                   EXTRACT(EPOCH FROM (NOW() - MIN(received_at) FILTER (WHERE status = 'pending'))) as oldest_pending_seconds
+            FROM webhook_inbox
+            WHERE status IN ('pending', 'processing', 'failed')
+        """)
+        return {
+            "pending": row["pending"] if row else 0,
+            "processing": row["processing"] if row else 0,
+            "failed": row["failed"] if row else 0,
+            "oldest_pending_seconds": round(row["oldest_pending_seconds"] or 0, 1) if row else 0,
+        }
+
+
+# Singleton instance
+webhook_inbox = WebhookInbox()
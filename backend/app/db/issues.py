@@ -2,6 +2,12 @@
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from app.db.database import fetch_one, fetch_all, execute_returning, execute
+from app.db.whatsapp import whatsapp_conversations, TERMINAL_ISSUE_STATUSES
+from app.db.timers import issue_timers
+from app.db.scoped import ISSUE_ORG, Scoped, fetch_scoped, fetch_scoped_all
+
+# Nothing left to follow up on once an issue reaches one of these
+RESOLVED_ISSUE_STATUSES = ("closed", "resolved", "resolved_by_agent")
 
 
 async def create_issue(
@@ -28,7 +34,58 @@ async def get_issue(issue_id: int) -> Optional[Dict[str, Any]]:
                t.name as tenant_name,
                t.email as tenant_email,
                p.name as property_name,
-               p.address as property_address
+               p.address as property_address,
+               p.org_id as property_org_id
+        FROM issues i
+        LEFT JOIN tenants t ON t.id = i.tenant_id
+        LEFT JOIN properties p ON p.id = i.property_id
+        WHERE i.id = $1
+    """
+    row = await fetch_one(query, issue_id)
+    return dict(row) if row else None
+
+
+async def get_issue_for_org(issue_id: int, org_id: int) -> Scoped:
+    """Get an issue (as get_issue) if it belongs to the org, through its property or tenant."""
+    query = f"""
+        SELECT i.*,
+               t.name as tenant_name,
+               t.email as tenant_email,
+               p.name as property_name,
+               p.address as property_address,
+               p.org_id as property_org_id,
+               COALESCE({ISSUE_ORG} = $2, FALSE) as in_org
+        FROM issues i
+        LEFT JOIN tenants t ON t.id = i.tenant_id
+        LEFT JOIN properties p ON p.id = i.property_id
+        WHERE i.id = $1
+    """
+    return await fetch_scoped(query, issue_id, org_id)
+
+
+async def get_issues_by_property_for_org(property_id: int, org_id: int) -> Scoped:
+    """Issues for a property, only if the property belongs to the org."""
+    query = """
+        SELECT i.*, COALESCE(p.org_id = $2, FALSE) as in_org
+        FROM properties p
+        LEFT JOIN issues i ON i.property_id = p.id AND p.org_id = $2
+        WHERE p.id = $1
+        ORDER BY i.created_at DESC
+    """
+    return await fetch_scoped_all(query, property_id, org_id)
+
+
+async def get_issue_version(issue_id: int) -> Optional[Dict[str, Any]]:
+    """
+    What changes when the issue's messages or activity change.
+
+    One query: the newest message and activity ids (each one index probe)
+    and the owning org. None if no such issue.
+    """
+    query = f"""
+        SELECT (SELECT MAX(id) FROM issue_messages WHERE issue_id = i.id) as last_message_id,
+               (SELECT MAX(id) FROM agent_activity WHERE issue_id = i.id) as last_activity_id,
+               {ISSUE_ORG} as org_id
         FROM issues i
         LEFT JOIN tenants t ON t.id = i.tenant_id
         LEFT JOIN properties p ON p.id = i.property_id
@@ -97,11 +154,32 @@ async def update_issue_status(
             RETURNING *
         """
         row = await execute_returning(query, issue_id, status)
+    if row:
+        await _sync_routes(issue_id, status)
+        await _sync_timers(issue_id, status, row["priority"])
     return dict(row) if row else None
 
 
+async def _sync_routes(issue_id: int, status: str) -> None:
+    """Keep the contact routing table in step with the issue's status."""
+    if status in TERMINAL_ISSUE_STATUSES:
+        await whatsapp_conversations.clear_issue_routes(issue_id)
+    else:
+        await whatsapp_conversations.restore_route(issue_id)
+
+
+async def _sync_timers(issue_id: int, status: str, priority: Optional[str]) -> None:
+    """Start the SLA clock on escalation and stop timers that no longer apply."""
+    if status in RESOLVED_ISSUE_STATUSES:
+        await issue_timers.cancel(issue_id)
+    elif status == "escalated":
+        await issue_timers.start_sla(issue_id, priority)
+    else:
+        await issue_timers.cancel(issue_id, ["sla"])
+
+
 async def set_follow_up_date(issue_id: int, follow_up_date: datetime) -> Optional[Dict[str, Any]]:
-    """Set a follow-up date for an issue."""
+    """Set a follow-up date for an issue; the timer scheduler acts on it when due."""
     query = """
         UPDATE issues
         SET follow_up_date = $2, updated_at = NOW()
@@ -109,11 +187,15 @@ async def set_follow_up_date(issue_id: int, follow_up_date: datetime) -> Optiona
         RETURNING *
     """
     row = await execute_returning(query, issue_id, follow_up_date)
+    if row:
+        await issue_timers.schedule(issue_id, "follow_up", follow_up_date)
     return dict(row) if row else None
 
 
 async def close_issue(issue_id: int) -> Optional[Dict[str, Any]]:
     """Close an issue."""
+    await whatsapp_conversations.clear_issue_routes(issue_id)
+    await issue_timers.cancel(issue_id)
     try:
         query = """
             UPDATE issues
@@ -194,6 +276,8 @@ async def update_issue_priority(issue_id: int, priority: str) -> Optional[Dict[s
         RETURNING *
     """
     row = await execute_returning(query, issue_id, priority)
+    if row:
+        await issue_timers.reprioritise_sla(issue_id, priority)
     return dict(row) if row else None
 
 
@@ -206,4 +290,7 @@ async def assign_issue(issue_id: int, assigned_to: str) -> Optional[Dict[str, An
         RETURNING *
     """
     row = await execute_returning(query, issue_id, assigned_to)
+    if row:
+        # Someone has picked it up
+        await issue_timers.cancel(issue_id, ["sla"])
     return dict(row) if row else None
@@ -0,0 +1,197 @@
+"""Agent job queue database operations."""
+import json
+from typing import Optional, Dict, Any, List
+from app.db.database import fetch_one, fetch_all, execute_returning, execute
+
+LANES = ["priority", "standard"]
+
+
+class AgentJobs:
+    """Postgres-backed queue for agent invocations."""
+
+    async def enqueue(
+        self,
+        issue_id: int,
+        kind: str,
+        payload: Optional[Dict[str, Any]] = None,
+        lane: str = "standard",
+        max_attempts: int = 3,
+    ) -> Dict[str, Any]:
+        """Add a job to the queue."""
+        query = """
+            INSERT INTO agent_jobs (issue_id, kind, payload, lane, max_attempts)
+            VALUES ($1, $2, $3, $4, $5)
+            RETURNING *
+        """
+        payload_str = json.dumps(payload) if payload else None
+        row = await execute_returning(query, issue_id, kind, payload_str, lane, max_attempts)
+        return dict(row)
+
+    async def enqueue_with_message(
+        self,
+        issue_id: int,
+        kind: str,
+        content: str,
+        provider_message_id: Optional[str],
+        payload: Optional[Dict[str, Any]] = None,
+        lane: str = "standard",
+        max_attempts: int = 3,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record an inbound tenant message and queue the job answering it, in one statement.
+
+        Either both rows exist or neither does, so an event that dies after
+        recording its message still has its agent turn queued. A redelivered
+        provider message inserts nothing and returns None.
+        """
+        query = """
+            WITH recorded AS (
+                INSERT INTO issue_messages (issue_id, role, content, provider_message_id)
+                VALUES ($1, 'tenant', $2, $3)
+                ON CONFLICT (provider_message_id) WHERE provider_message_id IS NOT NULL DO NOTHING
+                RETURNING id
+            )
+            INSERT INTO agent_jobs (issue_id, kind, payload, lane, max_attempts)
+            SELECT $1, $4, $5, $6, $7 FROM recorded
+            RETURNING *
+        """
+        payload_str = json.dumps(payload) if payload else None
+        row = await execute_returning(
+            query, issue_id, content, provider_message_id or None, kind, payload_str, lane, max_attempts
+        )
+        return dict(row) if row else None
+
+    async def claim(self, lanes: List[str], visibility_seconds: int) -> Optional[Dict[str, Any]]:
+        """
+        Claim the next runnable job from the given lanes.
+
+        Lanes are tried in the order given, so listing "priority" first
+        drains urgent work before standard work. SKIP LOCKED lets several
+        workers (and instances) claim concurrently without blocking.
+        """
+        query = """
+            UPDATE agent_jobs
+            SET status = 'running',
+                attempts = attempts + 1,
+                started_at = NOW(),
+                locked_until = NOW() + make_interval(secs => $2)
+            WHERE id = (
+                SELECT id FROM agent_jobs
+                WHERE status = 'queued' AND lane = $1 AND run_after <= NOW()
+                ORDER BY run_after, id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING *
+        """
+        for lane in lanes:
+            row = await execute_returning(query, lane, visibility_seconds)
+            if row:
+                job = dict(row)
+                if job.get("payload"):
+                    job["payload"] = json.loads(job["payload"])
+                return job
+        return None
+
+    async def heartbeat(self, job_id: int, attempts: int, visibility_seconds: int) -> bool:
+        """
+        Push back a running job's visibility timeout.
+
+        Returns False if the claim (this attempt) has been lost to the sweeper.
+        """
+        query = """
+            UPDATE agent_jobs
+            SET locked_until = NOW() + make_interval(secs => $3)
+            WHERE id = $1 AND status = 'running' AND attempts = $2
+        """
+        result = await execute(query, job_id, attempts, visibility_seconds)
+        return bool(result) and result.split()[-1] != "0"
+
+    async def complete(self, job_id: int, attempts: int) -> bool:
+        """Mark a job as done, if this attempt still owns it."""
+        query = """
+            UPDATE agent_jobs
+            SET status = 'done', finished_at = NOW(), locked_until = NULL
+            WHERE id = $1 AND status = 'running' AND attempts = $2
+        """
+        result = await execute(query, job_id, attempts)
+        return bool(result) and result.split()[-1] != "0"
+
+    async def fail(self, job_id: int, attempts: int, error: str, backoff_seconds: int) -> Optional[Dict[str, Any]]:
+        """
+        Record a failed attempt, if this attempt still owns the job.
+
+        The job is retried after a backoff until max_attempts is reached,
+        then dead-lettered.
+        """
+        query = """
+            UPDATE agent_jobs
+            SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+                run_after = NOW() + make_interval(secs => $4 * attempts),
+                finished_at = CASE WHEN attempts >= max_attempts THEN NOW() ELSE NULL END,
+                locked_until = NULL,
+                last_error = $3
+            WHERE id = $1 AND status = 'running' AND attempts = $2
+            RETURNING *
+        """
+        row = await execute_returning(query, job_id, attempts, error[:2000], backoff_seconds)
+        return dict(row) if row else None
+
+    async def release_expired(self) -> int:
+        """Requeue running jobs whose visibility timeout has passed (crashed workers)."""
+        query = """
+            UPDATE agent_jobs
+            SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+                locked_until = NULL,
+                last_error = COALESCE(last_error, 'visibility timeout expired')
+            WHERE status = 'running' AND locked_until < NOW()
+        """
+        result = await execute(query)
+        # asyncpg returns e.g. "UPDATE 3"
+        return int(result.split()[-1]) if result else 0
+
+    async def retry_dead(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Put a dead-lettered job back on the queue."""
+        query = """
+            UPDATE agent_jobs
+            SET status = 'queued', attempts = 0, run_after = NOW(), finished_at = NULL
+            WHERE id = $1 AND status = 'dead'
+            RETURNING *
+        """
+        row = await execute_returning(query, job_id)
+        return dict(row) if row else None
+
+    async def get_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Get a job by ID."""
+        row = await fetch_one("SELECT * FROM agent_jobs WHERE id = $1", job_id)
+        return dict(row) if row else None
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth and age per lane, plus dead-letter count."""
+        rows = await fetch_all("""
+            SELECT lane,
+                   COUNT(*) FILTER (WHERE status = 'queued') as depth,
+                   COUNT(*) FILTER (WHERE status = 'running') as running,
+                   COUNT(*) FILTER (WHERE status = 'dead') as dead,
+                   EXTRACT(EPOCH FROM (NOW() - MIN(created_at) FILTER (WHERE status = 'queued'))) as oldest_age_seconds
+            FROM agent_jobs
+            WHERE status IN ('queued', 'running', 'dead')
+            GROUP BY lane
+        """)
+        by_lane = {lane: {"depth": 0, "running": 0, "dead": 0, "oldest_age_seconds": 0} for lane in LANES}
+        for row in rows:
+            by_lane[row["lane"]] = {
+                "depth": row["depth"],
+                "running": row["running"],
+                "dead": row["dead"],
+                "oldest_age_seconds": round(row["oldest_age_seconds"] or 0, 1),
+            }
+        return {
+            "lanes": by_lane,
+            "total_depth": sum(lane["depth"] for lane in by_lane.values()),
+            "total_dead": sum(lane["dead"] for lane in by_lane.values()),
+        }
+
+
+# Singleton instance
+agent_jobs = AgentJobs()
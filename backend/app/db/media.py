@@ -0,0 +1,198 @@
+"""Issue media (WhatsApp attachments) database operations."""
+import asyncio
+from typing import Optional, Dict, Any, List
+from app.config import MEDIA_MAX_ATTEMPTS
+from app.db.database import fetch_one, fetch_all, execute_returning, execute
+from app.db.scoped import ISSUE_ORG, Scoped, fetch_scoped, fetch_scoped_all
+
+
+class IssueMedia:
+    """Attachments queued for download and their stored blobs."""
+
+    def __init__(self):
+        # Set on enqueue so media workers in this process wake at once
+        self.enqueued = asyncio.Event()
+
+    async def enqueue(
+        self,
+        issue_id: int,
+        provider: str,
+        provider_message_id: Optional[str],
+        attachments: List[Dict[str, Any]],
+        max_attempts: int = MEDIA_MAX_ATTEMPTS,
+    ) -> List[int]:
+        """
+        Queue attachments for download.
+
+        All rows go in with one INSERT, each linked to the issue message
+        recorded for the same provider message id. Attachments already
+        queued for that message (a redelivered webhook) are skipped.
+        Returns the new ids.
+        """
+        rows = await fetch_all("""
+            INSERT INTO issue_media (
+                issue_id, message_id, provider, provider_message_id,
+                source_url, content_type, file_name, max_attempts
+            )
+            SELECT $1,
+                   (SELECT id FROM issue_messages WHERE provider_message_id = $3),
+                   $2, $3, a.url, a.content_type, a.file_name, $7
+            FROM unnest($4::text[], $5::text[], $6::text[]) WITH ORDINALITY AS a(url, content_type, file_name, n)
+            ORDER BY a.n
+            ON CONFLICT (provider, provider_message_id, source_url)
+            WHERE provider_message_id IS NOT NULL DO NOTHING
+            RETURNING id
+        """,
+            issue_id,
+            provider,
+            provider_message_id,
+            [attachment["url"] for attachment in attachments],
+            [attachment.get("content_type") for attachment in attachments],
+            [attachment.get("file_name") for attachment in attachments],
+            max_attempts,
+        )
+        ids = [row["id"] for row in rows]
+        if ids:
+            self.enqueued.set()
+        return ids
+
+    async def claim(self, visibility_seconds: int) -> Optional[Dict[str, Any]]:
+        """Claim the oldest pending attachment (or one whose download timed out)."""
+        query = """
+            UPDATE issue_media
+            SET status = 'downloading',
+                attempts = attempts + 1,
+                locked_until = NOW() + make_interval(secs => $1)
+            WHERE id = (
+                SELECT id FROM issue_media
+                WHERE (status = 'pending' AND available_at <= NOW())
+                   OR (status = 'downloading' AND locked_until < NOW())
+                ORDER BY id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING *
+        """
+        row = await execute_returning(query, visibility_seconds)
+        return dict(row) if row else None
+
+    async def find_stored(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """A stored blob with this content hash, if any."""
+        row = await fetch_one("""
+            SELECT storage_key, thumbnail_key, size_bytes, content_type
+            FROM issue_media
+            WHERE sha256 = $1 AND status = 'stored'
+            LIMIT 1
+        """, sha256)
+        return dict(row) if row else None
+
+    async def mark_stored(
+        self,
+        media_id: int,
+        sha256: str,
+        size_bytes: int,
+        storage_key: str,
+        thumbnail_key: Optional[str],
+        content_type: Optional[str],
+    ) -> None:
+        """Record a stored attachment, backfilling the message link if it was missing."""
+        query = """
+            UPDATE issue_media
+            SET status = 'stored', stored_at = NOW(), locked_until = NULL, last_error = NULL,
+                sha256 = $2, size_bytes = $3, storage_key = $4, thumbnail_key = $5,
+                content_type = COALESCE($6, content_type),
+                message_id = COALESCE(
+                    message_id,
+                    (SELECT id FROM issue_messages m WHERE m.provider_message_id = issue_media.provider_message_id)
+                )
+            WHERE id = $1
+        """
+        await execute(query, media_id, sha256, size_bytes, storage_key, thumbnail_key, content_type)
+
+    async def reject(self, media_id: int, reason: str, size_bytes: Optional[int] = None) -> None:
+        """Give up on an attachment we will never accept (too large, not found)."""
+        query = """
+            UPDATE issue_media
+            SET status = 'rejected', locked_until = NULL, last_error = $2,
+                size_bytes = COALESCE($3, size_bytes)
+            WHERE id = $1
+        """
+        await execute(query, media_id, reason[:2000], size_bytes)
+
+    async def fail(self, media_id: int, error: str, retry_in_seconds: float) -> Optional[Dict[str, Any]]:
+        """Record a failed download; retried after the delay until max_attempts."""
+        query = """
+            UPDATE issue_media
+            SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+                available_at = NOW() + make_interval(secs => $3),
+                locked_until = NULL,
+                last_error = $2
+            WHERE id = $1
+            RETURNING id, status, attempts, issue_id
+        """
+        row = await execute_returning(query, media_id, error[:2000], retry_in_seconds)
+        return dict(row) if row else None
+
+    async def get_for_issue(self, issue_id: int) -> List[Dict[str, Any]]:
+        """Attachments on an issue, oldest first."""
+        rows = await fetch_all("""
+            SELECT id, message_id, content_type, file_name, status, size_bytes,
+                   sha256, storage_key, thumbnail_key, last_error, created_at, stored_at
+            FROM issue_media
+            WHERE issue_id = $1
+            ORDER BY id
+        """, issue_id)
+        return [dict(row) for row in rows]
+
+    async def get_for_issue_for_org(self, issue_id: int, org_id: int) -> Scoped:
+        """Attachments on an issue (as get_for_issue), only if the issue belongs to the org."""
+        return await fetch_scoped_all(f"""
+            SELECT m.id, m.message_id, m.content_type, m.file_name, m.status, m.size_bytes,
+                   m.sha256, m.storage_key, m.thumbnail_key, m.last_error, m.created_at, m.stored_at,
+                   COALESCE({ISSUE_ORG} = $2, FALSE) as in_org
+            FROM issues i
+            LEFT JOIN tenants t ON t.id = i.tenant_id
+            LEFT JOIN properties p ON p.id = i.property_id
+            LEFT JOIN issue_media m ON m.issue_id = i.id AND {ISSUE_ORG} = $2
+            WHERE i.id = $1
+            ORDER BY m.id
+        """, issue_id, org_id)
+
+    async def get_media(self, issue_id: int, media_id: int) -> Optional[Dict[str, Any]]:
+        """One attachment, scoped to its issue."""
+        row = await fetch_one("""
+            SELECT * FROM issue_media WHERE id = $1 AND issue_id = $2
+        """, media_id, issue_id)
+        return dict(row) if row else None
+
+    async def get_media_for_org(self, issue_id: int, media_id: int, org_id: int) -> Scoped:
+        """One attachment (as get_media), only if its issue belongs to the org."""
+        return await fetch_scoped(f"""
+            SELECT m.*, COALESCE({ISSUE_ORG} = $3, FALSE) as in_org
+            FROM issues i
+            LEFT JOIN tenants t ON t.id = i.tenant_id
+            LEFT JOIN properties p ON p.id = i.property_id
+            LEFT JOIN issue_media m ON m.issue_id = i.id AND m.id = $2 AND {ISSUE_ORG} = $3
+            WHERE i.id = $1
+        """, issue_id, media_id, org_id)
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Backlog size and age."""
+        row = await fetch_one("""
+            SELECT COUNT(*) FILTER (WHERE status = 'pending') as pending,
+                   COUNT(*) FILTER (WHERE status = 'downloading') as downloading,
+                   COUNT(*) FILTER (WHERE status = 'failed') as failed,
+                   EXTRACT(EPOCH FROM (NOW() - MIN(created_at) FILTER (WHERE status = 'pending'))) as oldest_pending_seconds
+            FROM issue_media
+            WHERE status IN ('pending', 'downloading', 'failed')
+        """)
+        return {
+            "pending": row["pending"] if row else 0,
+            "downloading": row["downloading"] if row else 0,
+            "failed": row["failed"] if row else 0,
+            "oldest_pending_seconds": round(row["oldest_pending_seconds"] or 0, 1) if row else 0,
+        }
+
+
+# Singleton instance
+issue_media = IssueMedia()
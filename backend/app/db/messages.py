@@ -1,7 +1,7 @@
 """Issue messages database operations."""
 import json
 from typing import Optional, List, Dict, Any
-from app.db.database import fetch_all, execute_returning
+from app.db.database import fetch_one, fetch_all, execute_returning
 
 
 async def add_message(
@@ -9,18 +9,40 @@ async def add_message(
     role: str,
     content: str,
     metadata: Optional[Dict[str, Any]] = None,
-) -> Dict[str, Any]:
-    """Add a message to an issue conversation."""
+    provider_message_id: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Add a message to an issue conversation.
+
+    With a provider_message_id (Twilio MessageSid, Respond.io message id) the
+    insert is idempotent: a redelivered message returns None.
+    """
+    metadata_str = json.dumps(metadata) if metadata else None
+    if provider_message_id:
+        query = """
+            INSERT INTO issue_messages (issue_id, role, content, metadata, provider_message_id)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (provider_message_id) WHERE provider_message_id IS NOT NULL DO NOTHING
+            RETURNING *
+        """
+        row = await execute_returning(query, issue_id, role, content, metadata_str, provider_message_id)
+        return dict(row) if row else None
+
     query = """
         INSERT INTO issue_messages (issue_id, role, content, metadata)
         VALUES ($1, $2, $3, $4)
         RETURNING *
     """
-    metadata_str = json.dumps(metadata) if metadata else None
     row = await execute_returning(query, issue_id, role, content, metadata_str)
     return dict(row)
 
 
+async def get_provider_message_issue_id(provider_message_id: str) -> Optional[int]:
+    """The issue an inbound provider message was recorded on, or None if it hasn't been."""
+    query = "SELECT issue_id FROM issue_messages WHERE provider_message_id = $1"
+    row = await fetch_one(query, provider_message_id)
+    return row["issue_id"] if row else None
+
+
 async def get_messages(issue_id: int) -> List[Dict[str, Any]]:
     """Get all messages for an issue."""
     query = """
@@ -38,12 +60,17 @@ async def get_messages(issue_id: int) -> List[Dict[str, Any]]:
     return messages
 
 
-async def get_conversation_context(issue_id: int) -> str:
-    """Get the conversation as a formatted string for the agent."""
-    messages = await get_messages(issue_id)
+def format_conversation(messages: List[Dict[str, Any]]) -> str:
+    """Format already-loaded messages as a conversation string for the agent."""
     lines = []
     for msg in messages:
         role = msg["role"].upper()
         content = msg["content"]
         lines.append(f"{role}: {content}")
     return "\n".join(lines)
+
+
+async def get_conversation_context(issue_id: int) -> str:
+    """Get the conversation as a formatted string for the agent."""
+    messages = await get_messages(issue_id)
+    return format_conversation(messages)
@@ -0,0 +1,230 @@
+"""Notification outbox database operations."""
+import asyncio
+import json
+from typing import Optional, Dict, Any, List
+from app.config import (
+    NOTIFICATION_DIGEST_MINUTES,
+    NOTIFICATION_URGENT_PRIORITIES,
+    NOTIFICATION_MAX_ATTEMPTS,
+)
+from app.db.database import fetch_one, fetch_all, execute_returning, execute
+from app.db.scoped import ISSUE_ORG
+
+CONTACT_ROLES = {"property_manager", "landlord"}
+CONTACT_CHANNELS = {"email", "whatsapp"}
+
+# The tenant already received these as WhatsApp messages in the conversation
+TENANT_DELIVERED_ACTIONS = {"sent_message"}
+
+
+def is_urgent(action: str, details: Optional[Dict[str, Any]]) -> bool:
+    """SLA breaches and escalations at an urgent priority skip the digest."""
+    if action == "sla_breached":
+        return True
+    return action == "escalated" and (details or {}).get("priority") in NOTIFICATION_URGENT_PRIORITIES
+
+
+class NotificationOutbox:
+    """Per-recipient notifications waiting to be sent as digests."""
+
+    def __init__(self):
+        # Set when an urgent notification is queued so the dispatcher wakes at once
+        self.urgent_enqueued = asyncio.Event()
+
+    async def enqueue_for_activity(self, activity: Dict[str, Any]) -> int:
+        """
+        Fan an activity's would_notify targets out to their recipients.
+
+        property_manager and landlord resolve to the issue's org contacts,
+        tenant to the issue's tenant on WhatsApp. One INSERT ... SELECT;
+        returns the number of notifications queued.
+        """
+        roles = [role.strip() for role in (activity.get("would_notify") or "").split(",") if role.strip()]
+        if activity["action"] in TENANT_DELIVERED_ACTIONS and "tenant" in roles:
+            roles.remove("tenant")
+        if not roles or not activity.get("issue_id"):
+            return 0
+
+        details = activity.get("details")
+        if isinstance(details, str):
+            details = json.loads(details)
+        urgent = is_urgent(activity["action"], details)
+
+        result = await execute(f"""
+            WITH issue AS (
+                SELECT i.id, i.title, i.tenant_id, {ISSUE_ORG} as org_id
+                FROM issues i
+                LEFT JOIN properties p ON p.id = i.property_id
+                LEFT JOIN tenants t ON t.id = i.tenant_id
+                WHERE i.id = $2
+            ),
+            recipients AS (
+                SELECT c.role, c.channel, c.address
+                FROM notification_contacts c
+                JOIN issue ON c.org_id = issue.org_id
+                WHERE c.is_active AND c.role = ANY($5::text[])
+                UNION
+                SELECT 'tenant', 'whatsapp', t.phone
+                FROM tenants t
+                JOIN issue ON t.id = issue.tenant_id
+                WHERE 'tenant' = ANY($5::text[]) AND t.phone IS NOT NULL AND t.phone <> ''
+            )
+            INSERT INTO notifications (
+                activity_id, issue_id, role, channel, address, action, summary,
+                urgent, max_attempts, available_at
+            )
+            SELECT $1, issue.id, r.role, r.channel, r.address, $3,
+                   jsonb_build_object('issue_title', issue.title, 'details', $4::jsonb),
+                   $6, $8, NOW() + make_interval(secs => CASE WHEN $6 THEN 0 ELSE $7 END)
+            FROM recipients r CROSS JOIN issue
+        """,
+            activity.get("id"),
+            activity["issue_id"],
+            activity["action"],
+            json.dumps(details or {}),
+            roles,
+            urgent,
+            NOTIFICATION_DIGEST_MINUTES * 60,
+            NOTIFICATION_MAX_ATTEMPTS,
+        )
+        queued = int(result.split()[-1]) if result else 0
+        if queued and urgent:
+            self.urgent_enqueued.set()
+        return queued
+
+    async def claim_digests(self, limit: int, visibility_seconds: int) -> List[Dict[str, Any]]:
+        """
+        Claim everything pending for the recipients with the oldest due notifications.
+
+        Once one notification for a recipient is due, all of their pending
+        notifications (due or not) are taken together and sent as one digest.
+        """
+        rows = await fetch_all("""
+            WITH due AS (
+                SELECT channel, address FROM notifications
+                WHERE status = 'pending' AND available_at <= NOW()
+                ORDER BY available_at
+                FOR UPDATE SKIP LOCKED
+                LIMIT $1
+            )
+            UPDATE notifications n
+            SET status = 'sending',
+                attempts = attempts + 1,
+                locked_until = NOW() + make_interval(secs => $2)
+            FROM (SELECT DISTINCT channel, address FROM due) recipient
+            WHERE n.channel = recipient.channel AND n.address = recipient.address
+            AND n.status = 'pending'
+            RETURNING n.*
+        """, limit, visibility_seconds)
+        notifications = []
+        for row in rows:
+            notification = dict(row)
+            notification["summary"] = json.loads(notification["summary"])
+            notifications.append(notification)
+        return notifications
+
+    async def requeue_stale(self) -> int:
+        """Return digests whose sender died mid-send to the queue."""
+        result = await execute("""
+            UPDATE notifications
+            SET status = 'pending', locked_until = NULL
+            WHERE status = 'sending' AND locked_until < NOW()
+        """)
+        return int(result.split()[-1]) if result else 0
+
+    async def mark_sent(self, notification_ids: List[int]) -> None:
+        await execute("""
+            UPDATE notifications
+            SET status = 'sent', sent_at = NOW(), locked_until = NULL, last_error = NULL
+            WHERE id = ANY($1::bigint[])
+        """, notification_ids)
+
+    async def fail(self, notification_ids: List[int], error: str, retry_in_seconds: Optional[float]) -> int:
+        """
+        Record a failed digest.
+
+        retry_in_seconds=None means the error is permanent; otherwise the
+        rows are retried after that delay until max_attempts. Returns how
+        many rows were parked as failed.
+        """
+        rows = await fetch_all("""
+            UPDATE notifications
+            SET status = CASE
+                    WHEN $3::float8 IS NULL OR attempts >= max_attempts THEN 'failed'
+                    ELSE 'pending'
+                END,
+                available_at = NOW() + make_interval(secs => COALESCE($3::float8, 0)),
+                locked_until = NULL,
+                last_error = $2
+            WHERE id = ANY($1::bigint[])
+            RETURNING status
+        """, notification_ids, error[:2000], retry_in_seconds)
+        return sum(1 for row in rows if row["status"] == "failed")
+
+    async def replay_failed(self, notification_ids: Optional[List[int]] = None) -> int:
+        """Put failed notifications (all, or the given ids) back in the queue."""
+        result = await execute("""
+            UPDATE notifications
+            SET status = 'pending', attempts = 0, available_at = NOW(), last_error = NULL
+            WHERE status = 'failed'
+            AND ($1::bigint[] IS NULL OR id = ANY($1::bigint[]))
+        """, notification_ids)
+        return int(result.split()[-1]) if result else 0
+
+    async def get_failed(self, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = await fetch_all("""
+            SELECT id, issue_id, role, channel, address, action, attempts, last_error, created_at
+            FROM notifications
+            WHERE status = 'failed'
+            ORDER BY id DESC
+            LIMIT $1
+        """, limit)
+        return [dict(row) for row in rows]
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Backlog size, recipients waiting on a digest, and age."""
+        row = await fetch_one("""
+            SELECT COUNT(*) FILTER (WHERE status = 'pending') as pending,
+                   COUNT(DISTINCT (channel, address)) FILTER (WHERE status = 'pending') as pending_recipients,
+                   COUNT(*) FILTER (WHERE status = 'sending') as sending,
+                   COUNT(*) FILTER (WHERE status = 'failed') as failed,
+                   EXTRACT(EPOCH FROM (NOW() - MIN(created_at) FILTER (WHERE status = 'pending'))) as oldest_pending_seconds
+            FROM notifications
+            WHERE status IN ('pending', 'sending', 'failed')
+        """)
+        return {
+            "pending": row["pending"] if row else 0,
+            "pending_recipients": row["pending_recipients"] if row else 0,
+            "sending": row["sending"] if row else 0,
+            "failed": row["failed"] if row else 0,
+            "oldest_pending_seconds": round(row["oldest_pending_seconds"] or 0, 1) if row else 0,
+        }
+
+    async def add_contact(self, org_id: int, role: str, channel: str, address: str) -> Dict[str, Any]:
+        """Add (or reactivate) a notification contact for an org."""
+        row = await execute_returning("""
+            INSERT INTO notification_contacts (org_id, role, channel, address)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (org_id, role, channel, address) DO UPDATE SET is_active = TRUE
+            RETURNING *
+        """, org_id, role, channel, address)
+        return dict(row)
+
+    async def get_contacts(self, org_id: int) -> List[Dict[str, Any]]:
+        rows = await fetch_all("""
+            SELECT * FROM notification_contacts
+            WHERE org_id = $1 AND is_active
+            ORDER BY role, channel, id
+        """, org_id)
+        return [dict(row) for row in rows]
+
+    async def remove_contact(self, org_id: int, contact_id: int) -> bool:
+        result = await execute("""
+            UPDATE notification_contacts SET is_active = FALSE
+            WHERE id = $1 AND org_id = $2 AND is_active
+        """, contact_id, org_id)
+        return bool(result) and int(result.split()[-1]) > 0
+
+
+# Singleton instance
+notification_outbox = NotificationOutbox()
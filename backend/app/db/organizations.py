@@ -1,11 +1,19 @@
 """Database operations for organizations."""
+import asyncio
 from typing import Optional, Dict, Any
 from app.db.database import fetch_one, fetch_all, execute_returning
+from app.db.cache import org_id_cache
+
+DEFAULT_ORG_NAME = "Organization"
 
 
 class Organizations:
     """CRUD operations for organizations."""
 
+    def __init__(self):
+        # clerk_org_id -> lookup in progress, so concurrent first requests share one
+        self._resolving: Dict[str, "asyncio.Task[int]"] = {}
+
     async def get_by_clerk_id(self, clerk_org_id: str) -> Optional[Dict[str, Any]]:
         """Get organization by Clerk org ID."""
         query = """
@@ -26,11 +34,51 @@ class Organizations:
         return dict(row)
 
     async def get_or_create(self, clerk_org_id: str, name: str) -> Dict[str, Any]:
-        """Get existing org or create new one."""
-        existing = await self.get_by_clerk_id(clerk_org_id)
-        if existing:
-            return existing
-        return await self.create(clerk_org_id, name)
+        """
+        Get existing org or create new one.
+
+        The insert arbitrates on the clerk_org_id unique constraint, so
+        concurrent first requests (in any process) end up with the same org.
+        An existing org is left untouched and read back.
+        """
+        query = """
+            INSERT INTO organizations (clerk_org_id, name, created_at, updated_at)
+            VALUES ($1, $2, NOW(), NOW())
+            ON CONFLICT (clerk_org_id) DO NOTHING
+            RETURNING *
+        """
+        row = await execute_returning(query, clerk_org_id, name)
+        if not row:
+            row = await fetch_one("SELECT * FROM organizations WHERE clerk_org_id = $1", clerk_org_id)
+        org = dict(row)
+        org_id_cache.set(clerk_org_id, org["id"])
+        return org
+
+    async def resolve_id(self, clerk_org_id: str) -> int:
+        """
+        Internal org id for a Clerk org, creating the org on first sight.
+
+        Served from the org id cache; on a miss, concurrent callers in this
+        process wait on one lookup instead of each going to the database.
+        """
+        found, org_id = org_id_cache.get(clerk_org_id)
+        if found:
+            return org_id
+
+        lookup = self._resolving.get(clerk_org_id)
+        if lookup is None:
+            lookup = asyncio.create_task(self._lookup_or_create_id(clerk_org_id))
+            self._resolving[clerk_org_id] = lookup
+            lookup.add_done_callback(lambda _: self._resolving.pop(clerk_org_id, None))
+        # A cancelled request must not cancel the lookup others are waiting on
+        return await asyncio.shield(lookup)
+
+    async def _lookup_or_create_id(self, clerk_org_id: str) -> int:
+        row = await fetch_one("SELECT id FROM organizations WHERE clerk_org_id = $1", clerk_org_id)
+        if not row:
+            return (await self.get_or_create(clerk_org_id, DEFAULT_ORG_NAME))["id"]
+        org_id_cache.set(clerk_org_id, row["id"])
+        return row["id"]
 
     async def get_by_id(self, org_id: int) -> Optional[Dict[str, Any]]:
         """Get organization by internal ID."""
@@ -38,6 +86,19 @@ class Organizations:
         row = await fetch_one(query, org_id)
         return dict(row) if row else None
 
+    async def get_id_by_whatsapp_number(self, number: Optional[str]) -> Optional[int]:
+        """Org that owns a WhatsApp sending number, if any is configured."""
+        if not number:
+            return None
+        try:
+            row = await fetch_one(
+                "SELECT id FROM organizations WHERE whatsapp_number = $1", number
+            )
+        except Exception:
+            # whatsapp_number column might not exist yet
+            return None
+        return row["id"] if row else None
+
 
 # Singleton instance
 organizations = Organizations()
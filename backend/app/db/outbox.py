@@ -0,0 +1,154 @@
+"""Outbound message outbox database operations."""
+import asyncio
+import json
+from typing import Optional, Dict, Any, List
+from app.config import OUTBOUND_MAX_ATTEMPTS
+from app.db.database import fetch_one, fetch_all, execute_returning, execute
+
+
+class OutboundMessages:
+    """Durable queue of WhatsApp messages awaiting delivery."""
+
+    def __init__(self):
+        # Set on enqueue so dispatcher workers in this process wake at once
+        self.enqueued = asyncio.Event()
+
+    async def enqueue(
+        self,
+        provider: str,
+        sender: str,
+        recipient: str,
+        payload: Dict[str, Any],
+        issue_id: Optional[int] = None,
+        max_attempts: int = OUTBOUND_MAX_ATTEMPTS,
+    ) -> int:
+        """Queue a message and return its outbox id."""
+        query = """
+            INSERT INTO outbound_messages (provider, sender, recipient, payload, issue_id, max_attempts)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            RETURNING id
+        """
+        row = await execute_returning(
+            query, provider, sender, recipient, json.dumps(payload), issue_id, max_attempts
+        )
+        self.enqueued.set()
+        return row["id"]
+
+    async def claim(self, visibility_seconds: int) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest deliverable message.
+
+        A message is held back while an earlier one to the same recipient is
+        still pending or sending, so a conversation never arrives out of
+        order. Messages left in 'sending' past the visibility timeout are
+        reclaimed.
+        """
+        query = """
+            UPDATE outbound_messages
+            SET status = 'sending',
+                attempts = attempts + 1,
+                locked_until = NOW() + make_interval(secs => $1)
+            WHERE id = (
+                SELECT o.id FROM outbound_messages o
+                WHERE ((o.status = 'pending' AND o.available_at <= NOW())
+                       OR (o.status = 'sending' AND o.locked_until < NOW()))
+                AND NOT EXISTS (
+                    SELECT 1 FROM outbound_messages earlier
+                    WHERE earlier.provider = o.provider
+                    AND earlier.recipient = o.recipient
+                    AND earlier.id < o.id
+                    AND earlier.status IN ('pending', 'sending')
+                )
+                ORDER BY o.id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING *
+        """
+        row = await execute_returning(query, visibility_seconds)
+        if not row:
+            return None
+        message = dict(row)
+        message["payload"] = json.loads(message["payload"])
+        return message
+
+    async def mark_sent(self, message_id: int, provider_message_id: Optional[str]) -> None:
+        """Record a successful delivery."""
+        query = """
+            UPDATE outbound_messages
+            SET status = 'sent', sent_at = NOW(), locked_until = NULL,
+                provider_message_id = $2, last_error = NULL
+            WHERE id = $1
+        """
+        await execute(query, message_id, provider_message_id)
+
+    async def fail(
+        self,
+        message_id: int,
+        error: str,
+        retry_in_seconds: Optional[float],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record a failed attempt.
+
+        retry_in_seconds=None means the error is permanent; otherwise the
+        message is retried after that delay until max_attempts is reached.
+        """
+        query = """
+            UPDATE outbound_messages
+            SET status = CASE
+                    WHEN $3::float8 IS NULL OR attempts >= max_attempts THEN 'failed'
+                    ELSE 'pending'
+                END,
+                available_at = NOW() + make_interval(secs => COALESCE($3::float8, 0)),
+                locked_until = NULL,
+                last_error = $2
+            WHERE id = $1
+            RETURNING id, status, attempts, issue_id
+        """
+        row = await execute_returning(query, message_id, error[:2000], retry_in_seconds)
+        return dict(row) if row else None
+
+    async def replay_failed(self, message_ids: Optional[List[int]] = None) -> int:
+        """Put failed messages (all, or the given ids) back in the queue."""
+        query = """
+            UPDATE outbound_messages
+            SET status = 'pending', attempts = 0, available_at = NOW(), last_error = NULL
+            WHERE status = 'failed'
+            AND ($1::bigint[] IS NULL OR id = ANY($1::bigint[]))
+        """
+        result = await execute(query, message_ids)
+        self.enqueued.set()
+        return int(result.split()[-1]) if result else 0
+
+    async def get_failed(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent messages that could not be delivered."""
+        rows = await fetch_all("""
+            SELECT id, provider, recipient, issue_id, attempts, last_error, created_at
+            FROM outbound_messages
+            WHERE status = 'failed'
+            ORDER BY id DESC
+            LIMIT $1
+        """, limit)
+        return [dict(row) for row in rows]
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Backlog size and age."""
+        row = await fetch_one("""
+            SELECT COUNT(*) FILTER (WHERE status = 'pending') as pending,
+                   COUNT(*) FILTER (WHERE status = 'sending') as sending,
+                   COUNT(*) FILTER (WHERE status = 'failed') as failed,
+                   EXTRACT(EPOCH FROM (NOW() - MIN(created_at) FILTER (WHERE status = 'pending'))) as oldest_pending_seconds
+            FROM outbound_messages
+            WHERE status IN ('pending', 'sending', 'failed')
+        """)
+        return {
+            "pending": row["pending"] if row else 0,
+            "sending": row["sending"] if row else 0,
+            "failed": row["failed"] if row else 0,
+            "oldest_pending_seconds": round(row["oldest_pending_seconds"] or 0, 1) if row else 0,
+        }
+
+
+# Singleton instance
+outbound_messages = OutboundMessages()
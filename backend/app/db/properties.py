@@ -1,6 +1,8 @@
 """Database operations for properties."""
-from typing import Optional, Dict, Any, List
-from app.db.database import fetch_one, fetch_all, execute_returning, execute
+from typing import Optional, Dict, Any, List, Tuple
+from app.db.database import fetch_one, fetch_all, execute_returning, execute, get_db
+from app.db.property_index import property_index
+from app.db.scoped import Scoped, fetch_scoped, fetch_scoped_all
 
 
 class Properties:
@@ -19,6 +21,8 @@ class Properties:
             RETURNING *
         """
         row = await execute_returning(query, org_id, name, address)
+        property_index.upsert(dict(row))
+        await property_index.invalidate(row["id"])
         return dict(row)
 
     async def get_by_id(self, property_id: int) -> Optional[Dict[str, Any]]:
@@ -27,24 +31,91 @@ class Properties:
         row = await fetch_one(query, property_id)
         return dict(row) if row else None
 
-    async def get_by_org(self, org_id: int, clerk_org_id: str = None) -> List[Dict[str, Any]]:
-        """Get all properties for an organization.
+    async def get_by_org(
+        self,
+        org_id: int,
+        clerk_org_id: str = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Get an organization's properties by name, all of them unless limit is given.
 
         Supports both:
         - org_id (integer FK to organizations table) - Railway model
         - owner_id (Clerk org ID string) - Drizzle model
+
+        tenant_count and active_issue_count come from property_counters,
+        which triggers keep in step with tenant and issue writes.
         """
         query = """
             SELECT p.*,
-                   COALESCE((SELECT COUNT(*) FROM tenants t WHERE t.property_id = p.id AND (t.is_active = TRUE OR t.is_active IS NULL)), 0) as tenant_count,
-                   COALESCE((SELECT COUNT(*) FROM issues i WHERE i.property_id = p.id AND i.status NOT IN ('closed', 'resolved_by_agent')), 0) as active_issue_count
+                   COALESCE(c.tenant_count, 0) as tenant_count,
+                   COALESCE(c.active_issue_count, 0) as active_issue_count
             FROM properties p
+            LEFT JOIN property_counters c ON c.property_id = p.id
             WHERE p.org_id = $1 OR p.owner_id = $2
-            ORDER BY p.name
+            ORDER BY p.name, p.id
+            LIMIT $3 OFFSET $4
         """
-        rows = await fetch_all(query, org_id, clerk_org_id)
+        rows = await fetch_all(query, org_id, clerk_org_id, limit, offset)
         return [dict(row) for row in rows]
 
+    async def reconcile_counters(self, after_id: int, batch_size: int) -> Tuple[Optional[int], int, int]:
+        """
+        Recount tenants and active issues for the next batch of properties.
+
+        The batch's counter rows are locked before counting, so trigger
+        updates from concurrent writes wait and apply on top of the fresh
+        counts instead of being overwritten. Returns the last property id
+        in the batch (None when done), how many properties were checked and
+        how many of their counters had drifted.
+        """
+        async with get_db() as conn:
+            async with conn.transaction():
+                ids = [row["id"] for row in await conn.fetch(
+                    "SELECT id FROM properties WHERE id > $1 ORDER BY id LIMIT $2", after_id, batch_size
+                )]
+                if not ids:
+                    return None, 0, 0
+                await conn.execute("""
+                    INSERT INTO property_counters (property_id)
+                    SELECT unnest($1::int[])
+                    ON CONFLICT DO NOTHING
+                """, ids)
+                await conn.execute("""
+                    SELECT 1 FROM property_counters
+                    WHERE property_id = ANY($1::int[])
+                    ORDER BY property_id
+                    FOR UPDATE
+                """, ids)
+                drifted = await conn.fetch("""
+                    WITH actual AS (
+                        SELECT id as property_id,
+                               COALESCE(t.count, 0) as tenant_count,
+                               COALESCE(i.count, 0) as active_issue_count
+                        FROM unnest($1::int[]) as id
+                        LEFT JOIN (
+                            SELECT property_id, COUNT(*) as count FROM tenants
+                            WHERE property_id = ANY($1::int[]) AND COALESCE(is_active, TRUE)
+                            GROUP BY property_id
+                        ) t ON t.property_id = id
+                        LEFT JOIN (
+                            SELECT property_id, COUNT(*) as count FROM issues
+                            WHERE property_id = ANY($1::int[]) AND status NOT IN ('closed', 'resolved_by_agent')
+                            GROUP BY property_id
+                        ) i ON i.property_id = id
+                    )
+                    UPDATE property_counters c
+                    SET tenant_count = actual.tenant_count,
+                        active_issue_count = actual.active_issue_count,
+                        reconciled_at = NOW()
+                    FROM actual
+                    WHERE c.property_id = actual.property_id
+                    AND (c.tenant_count, c.active_issue_count) IS DISTINCT FROM (actual.tenant_count, actual.active_issue_count)
+                    RETURNING c.property_id
+                """, ids)
+                return ids[-1], len(ids), len(drifted)
+
     async def update(
         self,
         property_id: int,
@@ -81,12 +152,96 @@ class Properties:
             RETURNING *
         """
         row = await execute_returning(query, *params)
+        if row:
+            property_index.upsert(dict(row))
+            await property_index.invalidate(property_id)
         return dict(row) if row else None
 
+    async def get_for_org(self, property_id: int, org_id: int) -> Scoped:
+        """Get a property if it belongs to the org (one query tells missing from forbidden)."""
+        query = """
+            SELECT p.*, COALESCE(p.org_id = $2, FALSE) as in_org
+            FROM properties p
+            WHERE p.id = $1
+        """
+        return await fetch_scoped(query, property_id, org_id)
+
+    async def update_for_org(
+        self,
+        property_id: int,
+        org_id: int,
+        name: Optional[str] = None,
+        address: Optional[str] = None,
+    ) -> Scoped:
+        """Update a property, only if it belongs to the org."""
+        updates = []
+        params = []
+        for column, value in (("name", name), ("address", address)):
+            if value is not None:
+                params.append(value)
+                updates.append(f"{column} = ${len(params)}")
+        if not updates:
+            return await self.get_for_org(property_id, org_id)
+
+        params.extend([property_id, org_id])
+        property_param, org_param = len(params) - 1, len(params)
+        query = f"""
+            WITH target AS (
+                SELECT id, org_id FROM properties WHERE id = ${property_param}
+            ), changed AS (
+                UPDATE properties p
+                SET {', '.join(updates)}, updated_at = NOW()
+                FROM target
+                WHERE p.id = target.id AND target.org_id = ${org_param}
+                RETURNING p.*
+            )
+            SELECT changed.*, COALESCE(target.org_id = ${org_param}, FALSE) as in_org
+            FROM target LEFT JOIN changed ON TRUE
+        """
+        result = await fetch_scoped(query, *params)
+        if result.value:
+            property_index.upsert(dict(result.value))
+            await property_index.invalidate(property_id)
+        return result
+
+    async def delete_for_org(self, property_id: int, org_id: int) -> Scoped:
+        """Delete a property (cascading to tenants and issues), only if it belongs to the org."""
+        query = """
+            WITH target AS (
+                SELECT id, org_id FROM properties WHERE id = $1
+            ), deleted AS (
+                DELETE FROM properties p
+                USING target
+                WHERE p.id = target.id AND target.org_id = $2
+                RETURNING p.id
+            )
+            SELECT deleted.id, COALESCE(target.org_id = $2, FALSE) as in_org
+            FROM target LEFT JOIN deleted ON TRUE
+        """
+        result = await fetch_scoped(query, property_id, org_id)
+        if result.value:
+            property_index.remove(property_id)
+            await property_index.invalidate(property_id)
+        return result
+
+    async def get_tenants_for_org(self, property_id: int, org_id: int) -> Scoped:
+        """Active tenants of a property, only if the property belongs to the org."""
+        query = """
+            SELECT t.*, COALESCE(p.org_id = $2, FALSE) as in_org
+            FROM properties p
+            LEFT JOIN tenants t
+                ON t.property_id = p.id AND t.is_active = TRUE AND p.org_id = $2
+            WHERE p.id = $1
+            ORDER BY t.name
+        """
+        return await fetch_scoped_all(query, property_id, org_id)
+
     async def delete(self, property_id: int) -> bool:
         """Delete a property (cascade deletes tenants and issues)."""
         query = "DELETE FROM properties WHERE id = $1"
         await execute(query, property_id)
+        property_index.remove(property_id)
+        await property_index.invalidate(property_id)
         return True
 
 
@@ -0,0 +1,278 @@
+"""In-process fuzzy index for matching property names and addresses.
+
+Unregistered WhatsApp senders reply with something like "Hi I'm Sam, flat 2
+Oak Hse, 14 Mill Rd". Properties are indexed by normalized tokens (lower
+case, punctuation stripped, common street abbreviations expanded); message
+tokens are matched exactly or, for typos and spelling variants, by trigram
+similarity against the token vocabulary. Candidates are scored by how much
+of a property's name or address (IDF-weighted) the message covers.
+
+Postings are kept per org and every lookup is scoped to one org, so it only
+touches (and can only return) that org's properties. Property writes in this process update the index
+directly; other workers are told through the cache bus and refetch the
+changed rows lazily on their next search.
+"""
+import math
+import re
+from collections import defaultdict
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+from app.db.database import fetch_all
+from app.db.cache import cache_bus
+
+ABBREVIATIONS = {
+    "st": "street", "rd": "road", "ave": "avenue", "av": "avenue", "ln": "lane",
+    "dr": "drive", "ct": "court", "cres": "crescent", "pl": "place", "sq": "square",
+    "hse": "house", "bldg": "building", "apt": "apartment", "apts": "apartments",
+    "gdns": "gardens", "terr": "terrace", "tce": "terrace", "cl": "close",
+}
+
+# Chat filler that should never pull in candidates
+QUERY_STOPWORDS = {
+    "hi", "hello", "hey", "im", "i", "am", "my", "name", "is", "its", "it", "this",
+    "the", "a", "an", "at", "in", "on", "of", "and", "live", "living", "from",
+    "thanks", "thank", "you", "please", "yes", "no", "ok", "number", "property",
+}
+
+TOKEN_SIMILARITY = 0.4
+# Cap on postings walked to generate candidates; the rarest tokens go first
+CANDIDATE_BUDGET = 5000
+# Candidates (by accumulated evidence) that get a full coverage score
+SHORTLIST_SIZE = 200
+MATCH_THRESHOLD = 0.6
+
+
+def normalize_tokens(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens with abbreviations expanded."""
+    if not text:
+        return []
+    words = re.findall(r"[a-z0-9]+", text.lower().replace("'", ""))
+    return [ABBREVIATIONS.get(w, w) for w in words]
+
+
+def trigrams(token: str) -> Set[str]:
+    """Padded character trigrams, pg_trgm style."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PropertyIndex:
+    """Token and trigram index over property names and addresses."""
+
+    name = "property_index"
+
+    def __init__(self):
+        self._properties: Dict[int, Dict[str, Any]] = {}
+        # token -> org_id -> property ids
+        self._postings: Dict[str, Dict[Optional[int], Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self._df: Dict[str, int] = defaultdict(int)
+        # trigram -> vocabulary tokens containing it (digit-free tokens only)
+        self._trigram_vocab: Dict[str, Set[str]] = defaultdict(set)
+        self._dirty: Set[int] = set()
+        self._loaded = False
+        self.lookups = 0
+
+    async def _fetch(self, property_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        if property_ids is None:
+            rows = await fetch_all("SELECT id, org_id, name, address FROM properties")
+        else:
+            rows = await fetch_all(
+                "SELECT id, org_id, name, address FROM properties WHERE id = ANY($1::int[])",
+                property_ids,
+            )
+        return [dict(row) for row in rows]
+
+    async def ensure_fresh(self):
+        """Load everything on first use, then refetch rows changed elsewhere."""
+        if not self._loaded:
+            self._dirty.clear()
+            for row in await self._fetch():
+                self._add(row)
+            self._loaded = True
+        elif self._dirty:
+            dirty, self._dirty = list(self._dirty), set()
+            for row in await self._fetch(dirty):
+                self._add(row)
+
+    def upsert(self, row: Dict[str, Any]):
+        """Index a property that was just created or edited in this process."""
+        if self._loaded:
+            self._add(row)
+
+    def remove(self, property_id: int):
+        """Drop a property that was just deleted in this process."""
+        self._remove(property_id)
+
+    def _add(self, row: Dict[str, Any]):
+        self._remove(row["id"])
+        name_tokens = normalize_tokens(row.get("name"))
+        address_tokens = normalize_tokens(row.get("address"))
+        entry = {
+            "id": row["id"],
+            "org_id": row.get("org_id"),
+            "name": row.get("name"),
+            "address": row.get("address"),
+            "name_tokens": name_tokens,
+            "address_tokens": address_tokens,
+        }
+        self._properties[row["id"]] = entry
+        for token in set(name_tokens) | set(address_tokens):
+            if not self._postings[token]:
+                if not token.isdigit():
+                    for gram in trigrams(token):
+                        self._trigram_vocab[gram].add(token)
+            self._postings[token][entry["org_id"]].add(row["id"])
+            self._df[token] += 1
+
+    def _remove(self, property_id: int):
+        entry = self._properties.pop(property_id, None)
+        if not entry:
+            return
+        for token in set(entry["name_tokens"]) | set(entry["address_tokens"]):
+            self._postings[token][entry["org_id"]].discard(property_id)
+            self._df[token] -= 1
+            if self._df[token] <= 0:
+                del self._postings[token]
+                del self._df[token]
+                for gram in trigrams(token):
+                    self._trigram_vocab[gram].discard(token)
+
+    def delete(self, key):
+        """Cache-bus hook: drop the property and refetch it on next search."""
+        property_id = int(key)
+        self._remove(property_id)
+        self._dirty.add(property_id)
+
+    def clear(self):
+        """Cache-bus hook: invalidations may have been missed, reload fully."""
+        self._properties.clear()
+        self._postings.clear()
+        self._df.clear()
+        self._trigram_vocab.clear()
+        self._dirty.clear()
+        self._loaded = False
+
+    async def invalidate(self, property_id: int):
+        """Tell other workers a property changed."""
+        await cache_bus.publish(self.name, [str(property_id)])
+
+    def _match_token(self, token: str) -> List[Tuple[str, float]]:
+        """Vocabulary tokens similar to a query token, with similarity."""
+        if token in self._df:
+            return [(token, 1.0)]
+        if token.isdigit() or len(token) < 3:
+            return []
+        grams = trigrams(token)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigram_vocab.get(gram, ()):
+                shared[candidate] += 1
+        matches = []
+        for candidate, count in shared.items():
+            similarity = count / (len(grams) + len(candidate) + 1 - count)
+            if similarity >= TOKEN_SIMILARITY:
+                matches.append((candidate, similarity))
+        return matches
+
+    def _idf(self, token: str) -> float:
+        return math.log((1 + len(self._properties)) / (1 + self._df.get(token, 0))) + 1
+
+    def _coverage(self, tokens: List[str], matched: Dict[str, float], idf: Dict[str, float]) -> float:
+        """IDF-weighted share of a property's tokens found in the message."""
+        if not tokens:
+            return 0.0
+        weights = [idf[t] if t in idf else self._idf(t) for t in tokens]
+        total = sum(weights)
+        found = sum(w * matched.get(t, 0.0) for t, w in zip(tokens, weights))
+        return found / total if total else 0.0
+
+    async def search(self, text: str, org_id: Optional[int], k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Top-k of the org's properties mentioned in a message, best first.
+
+        Returns [{id, name, address, org_id, score}] with score in 0..1.
+        Without an org there are no candidates: properties are never offered
+        across organisations.
+        """
+        if org_id is None:
+            return []
+        await self.ensure_fresh()
+        self.lookups += 1
+
+        matched: Dict[str, float] = {}
+        for token in set(normalize_tokens(text)) - QUERY_STOPWORDS:
+            for vocab_token, similarity in self._match_token(token):
+                matched[vocab_token] = max(matched.get(vocab_token, 0.0), similarity)
+        if not matched:
+            return []
+
+        idf = {token: self._idf(token) for token in matched}
+
+        def postings(token: str) -> Set[int]:
+            return self._postings.get(token, {}).get(org_id, set())
+
+        # Rarest tokens first; once the budget is spent, common tokens only
+        # contribute to the final scoring of candidates already found
+        evidence: Dict[int, float] = defaultdict(float)
+        walked = 0
+        for token in sorted(matched, key=lambda t: self._df.get(t, 0)):
+            ids = postings(token)
+            if evidence and walked + len(ids) > CANDIDATE_BUDGET:
+                break
+            weight = idf[token] * matched[token]
+            for property_id in ids:
+                evidence[property_id] += weight
+            walked += len(ids)
+
+        shortlist = sorted(evidence, key=evidence.get, reverse=True)[:SHORTLIST_SIZE]
+        scored = []
+        for property_id in shortlist:
+            entry = self._properties[property_id]
+            score = max(
+                self._coverage(entry["name_tokens"], matched, idf),
+                self._coverage(entry["address_tokens"], matched, idf),
+            )
+            if score > 0:
+                scored.append((score, evidence[property_id], entry))
+        # Equal coverage: prefer the property the message says more about
+        scored.sort(key=lambda item: (-item[0], -item[1], item[2]["name"] or ""))
+        return [
+            {
+                "id": entry["id"],
+                "name": entry["name"],
+                "address": entry["address"],
+                "org_id": entry["org_id"],
+                "score": round(score, 3),
+            }
+            for score, _, entry in scored[:k]
+        ]
+
+    async def best_match(self, text: str, org_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        """The top candidate if it clears the match threshold."""
+        results = await self.search(text, org_id, k=1)
+        if results and results[0]["score"] >= MATCH_THRESHOLD:
+            return results[0]
+        return None
+
+    async def list_properties(self, org_id: Optional[int], limit: int = 5) -> List[Dict[str, Any]]:
+        """The org's first properties by name, for prompting an unmatched sender (none without an org)."""
+        if org_id is None:
+            return []
+        await self.ensure_fresh()
+        entries = [e for e in self._properties.values() if e["org_id"] == org_id]
+        entries.sort(key=lambda e: e["name"] or "")
+        return [
+            {"id": e["id"], "name": e["name"], "address": e["address"], "org_id": e["org_id"]}
+            for e in entries[:limit]
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "properties": len(self._properties),
+            "vocabulary": len(self._df),
+            "lookups": self.lookups,
+        }
+
+
+# Singleton instance
+property_index = cache_bus.register(PropertyIndex())
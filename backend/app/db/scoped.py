@@ -0,0 +1,64 @@
+"""Org-scoped queries: ownership is checked in the statement itself.
+
+A scoped query returns no rows when the target doesn't exist and otherwise
+selects an in_org flag alongside the result columns, which are only
+populated when the target belongs to the org. Writes put the ownership
+test in the UPDATE/DELETE's WHERE clause and left-join the changed row
+onto the target, so one round trip both acts and says why it didn't.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List
+from app.db.database import fetch_one, fetch_all
+
+# An issue's (or tenant's) org: the property's, else the tenant's own
+# (tenants who registered over WhatsApp only get an org through their
+# property). Every query that attributes an issue or tenant to an
+# org uses this, with the property joined as p and the tenant as t.
+ISSUE_ORG = "COALESCE(p.org_id, t.org_id)"
+
+
+@dataclass
+class Scoped:
+    """Result of an org-scoped query: the value, or whether the target was missing or another org's."""
+    value: Any = None
+    found: bool = True
+    forbidden: bool = False
+
+
+NOT_FOUND = Scoped(found=False)
+FORBIDDEN = Scoped(forbidden=True)
+
+
+async def fetch_scoped(query: str, *args) -> Scoped:
+    """Run a scoped single-row query; the in_org flag is dropped from the row."""
+    row = await fetch_one(query, *args)
+    if row is None:
+        return NOT_FOUND
+    record = dict(row)
+    if not record.pop("in_org"):
+        return FORBIDDEN
+    if record.get("id") is None:
+        # Owned, but gone by the time the write ran
+        return NOT_FOUND
+    return Scoped(record)
+
+
+async def fetch_scoped_all(query: str, *args) -> Scoped:
+    """
+    Run a scoped query for a parent's children.
+
+    The parent is left-joined to its children, so it yields one row with a
+    NULL id when it has none.
+    """
+    rows = await fetch_all(query, *args)
+    if not rows:
+        return NOT_FOUND
+    if not rows[0]["in_org"]:
+        return FORBIDDEN
+    children: List[Dict[str, Any]] = []
+    for row in rows:
+        record = dict(row)
+        record.pop("in_org")
+        if record.get("id") is not None:
+            children.append(record)
+    return Scoped(children)
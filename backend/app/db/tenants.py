@@ -1,7 +1,9 @@
 """Database operations for tenants."""
 import re
-from typing import Optional, Dict, Any, List
-from app.db.database import fetch_one, fetch_all, execute_returning, execute
+from typing import Optional, Dict, Any, List, Tuple
+from app.db.database import fetch_one, fetch_all, execute_returning
+from app.db.cache import tenant_phone_cache
+from app.db.scoped import Scoped, fetch_scoped
 
 
 def normalize_phone(phone: str) -> str:
@@ -51,6 +53,8 @@ class Tenants:
             RETURNING *
         """
         row = await execute_returning(query, org_id, name, property_id, email, normalized_phone)
+        # Clears a cached miss for this number
+        await tenant_phone_cache.invalidate(normalized_phone)
         return dict(row)
 
     async def get_by_id(self, tenant_id: int) -> Optional[Dict[str, Any]]:
@@ -95,6 +99,36 @@ class Tenants:
         rows = await fetch_all(query, property_id)
         return [dict(row) for row in rows]
 
+    def _changes(
+        self,
+        name: Optional[str],
+        email: Optional[str],
+        phone: Optional[str],
+        property_id: Optional[int],
+    ) -> Tuple[List[str], List[Any]]:
+        """SET clauses ($1..$n) and their params for the fields being changed."""
+        updates = []
+        params = []
+        for column, value in (
+            ("name", name),
+            ("email", email),
+            ("phone", normalize_phone(phone) if phone is not None else None),
+            ("property_id", property_id),
+        ):
+            if value is not None:
+                params.append(value)
+                updates.append(f"{column} = ${len(params)}")
+        return updates, params
+
+    async def _invalidate_phones(self, tenant: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop the cached lookups for a changed tenant's old and new numbers."""
+        previous_phone = tenant.pop("previous_phone")
+        await tenant_phone_cache.invalidate(
+            normalize_phone(previous_phone) if previous_phone else None,
+            tenant["phone"],
+        )
+        return tenant
+
     async def update(
         self,
         tenant_id: int,
@@ -104,45 +138,69 @@ class Tenants:
         property_id: Optional[int] = None,
     ) -> Optional[Dict[str, Any]]:
         """Update a tenant."""
-        updates = []
-        params = []
-        param_count = 0
-        
-        if name is not None:
-            param_count += 1
-            updates.append(f"name = ${param_count}")
-            params.append(name)
-        
-        if email is not None:
-            param_count += 1
-            updates.append(f"email = ${param_count}")
-            params.append(email)
-        
-        if phone is not None:
-            param_count += 1
-            updates.append(f"phone = ${param_count}")
-            params.append(normalize_phone(phone))
-        
-        if property_id is not None:
-            param_count += 1
-            updates.append(f"property_id = ${param_count}")
-            params.append(property_id)
-        
+        updates, params = self._changes(name, email, phone, property_id)
         if not updates:
             return await self.get_by_id(tenant_id)
-        
-        param_count += 1
-        updates.append("updated_at = NOW()")
+
         params.append(tenant_id)
-        
+        # Return the previous phone too, so both numbers are invalidated
         query = f"""
-            UPDATE tenants
-            SET {', '.join(updates)}
-            WHERE id = ${param_count}
-            RETURNING *
+            UPDATE tenants t
+            SET {', '.join(updates)}, updated_at = NOW()
+            FROM (SELECT phone FROM tenants WHERE id = ${len(params)}) previous
+            WHERE t.id = ${len(params)}
+            RETURNING t.*, previous.phone as previous_phone
         """
         row = await execute_returning(query, *params)
-        return dict(row) if row else None
+        if not row:
+            return None
+        return await self._invalidate_phones(dict(row))
+
+    async def get_for_org(self, tenant_id: int, org_id: int) -> Scoped:
+        """Get a tenant if it belongs to the org (one query tells missing from forbidden)."""
+        query = """
+            SELECT t.*, p.name as property_name, p.address as property_address,
+                   COALESCE(t.org_id = $2, FALSE) as in_org
+            FROM tenants t
+            LEFT JOIN properties p ON p.id = t.property_id
+            WHERE t.id = $1
+        """
+        return await fetch_scoped(query, tenant_id, org_id)
+
+    async def update_for_org(
+        self,
+        tenant_id: int,
+        org_id: int,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        phone: Optional[str] = None,
+        property_id: Optional[int] = None,
+    ) -> Scoped:
+        """Update a tenant, only if it belongs to the org."""
+        updates, params = self._changes(name, email, phone, property_id)
+        if not updates:
+            return await self.get_for_org(tenant_id, org_id)
+
+        params.extend([tenant_id, org_id])
+        tenant_param, org_param = len(params) - 1, len(params)
+        # target is the pre-update row, which also gives the previous phone
+        query = f"""
+            WITH target AS (
+                SELECT id, org_id, phone FROM tenants WHERE id = ${tenant_param}
+            ), changed AS (
+                UPDATE tenants t
+                SET {', '.join(updates)}, updated_at = NOW()
+                FROM target
+                WHERE t.id = target.id AND target.org_id = ${org_param}
+                RETURNING t.*, target.phone as previous_phone
+            )
+            SELECT changed.*, COALESCE(target.org_id = ${org_param}, FALSE) as in_org
+            FROM target LEFT JOIN changed ON TRUE
+        """
+        result = await fetch_scoped(query, *params)
+        if result.value:
+            await self._invalidate_phones(result.value)
+        return result
 
     async def soft_delete(self, tenant_id: int) -> bool:
         """Soft delete a tenant (keep for history)."""
@@ -150,10 +208,33 @@ class Tenants:
             UPDATE tenants
             SET is_active = FALSE, updated_at = NOW()
             WHERE id = $1
+            RETURNING phone
         """
-        await execute(query, tenant_id)
+        row = await execute_returning(query, tenant_id)
+        if row and row["phone"]:
+            await tenant_phone_cache.invalidate(normalize_phone(row["phone"]))
         return True
 
+    async def soft_delete_for_org(self, tenant_id: int, org_id: int) -> Scoped:
+        """Soft delete a tenant, only if it belongs to the org."""
+        query = """
+            WITH target AS (
+                SELECT id, org_id FROM tenants WHERE id = $1
+            ), changed AS (
+                UPDATE tenants t
+                SET is_active = FALSE, updated_at = NOW()
+                FROM target
+                WHERE t.id = target.id AND target.org_id = $2
+                RETURNING t.id, t.phone
+            )
+            SELECT changed.*, COALESCE(target.org_id = $2, FALSE) as in_org
+            FROM target LEFT JOIN changed ON TRUE
+        """
+        result = await fetch_scoped(query, tenant_id, org_id)
+        if result.value and result.value["phone"]:
+            await tenant_phone_cache.invalidate(normalize_phone(result.value["phone"]))
+        return result
+
 
 # Singleton instance
 tenants = Tenants()
@@ -0,0 +1,162 @@
+"""Follow-up and SLA timer database operations."""
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+from app.config import SLA_HOURS, TIMER_MAX_ATTEMPTS
+from app.db.database import fetch_one, fetch_all, execute_returning, execute
+
+TIMER_KINDS = ("follow_up", "sla")
+
+# A failed or stale timer goes back to pending unless it has been
+# rescheduled meanwhile (only one pending timer per issue and kind)
+_REQUEUE_STATUS = """
+    CASE
+        WHEN EXISTS (
+            SELECT 1 FROM issue_timers p
+            WHERE p.issue_id = issue_timers.issue_id AND p.kind = issue_timers.kind
+            AND p.status = 'pending'
+        ) THEN 'cancelled'
+        WHEN attempts >= {max_attempts} THEN 'failed'
+        ELSE 'pending'
+    END
+"""
+
+
+def sla_hours(priority: Optional[str]) -> float:
+    """How long an escalated issue at this priority may wait for someone to pick it up."""
+    return SLA_HOURS.get(priority or "medium", SLA_HOURS.get("medium", 72.0))
+
+
+class IssueTimers:
+    """Pending follow-ups and SLA clocks, claimed by the timer scheduler."""
+
+    async def schedule(self, issue_id: int, kind: str, due_at: datetime) -> Dict[str, Any]:
+        """Set (or move) the issue's pending timer of this kind."""
+        row = await execute_returning("""
+            INSERT INTO issue_timers (issue_id, kind, due_at)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (issue_id, kind) WHERE status = 'pending'
+            DO UPDATE SET due_at = EXCLUDED.due_at, attempts = 0, last_error = NULL
+            RETURNING *
+        """, issue_id, kind, due_at)
+        return dict(row)
+
+    async def start_sla(self, issue_id: int, priority: Optional[str]) -> None:
+        """Start the SLA clock; an issue escalated again keeps its original clock."""
+        await execute("""
+            INSERT INTO issue_timers (issue_id, kind, due_at)
+            VALUES ($1, 'sla', NOW() + make_interval(secs => $2))
+            ON CONFLICT (issue_id, kind) WHERE status = 'pending' DO NOTHING
+        """, issue_id, sla_hours(priority) * 3600)
+
+    async def reprioritise_sla(self, issue_id: int, priority: Optional[str]) -> None:
+        """Move a running SLA clock's deadline to the new priority's allowance."""
+        await execute("""
+            UPDATE issue_timers
+            SET due_at = started_at + make_interval(secs => $2)
+            WHERE issue_id = $1 AND kind = 'sla' AND status = 'pending'
+        """, issue_id, sla_hours(priority) * 3600)
+
+    async def cancel(self, issue_id: int, kinds: Optional[List[str]] = None) -> int:
+        """Cancel the issue's pending timers (all kinds, or the given ones)."""
+        result = await execute("""
+            UPDATE issue_timers SET status = 'cancelled'
+            WHERE issue_id = $1 AND status = 'pending'
+            AND ($2::text[] IS NULL OR kind = ANY($2::text[]))
+        """, issue_id, kinds)
+        return int(result.split()[-1]) if result else 0
+
+    async def claim_due(self, limit: int, visibility_seconds: int) -> List[Dict[str, Any]]:
+        """
+        Claim up to limit due timers.
+
+        Rows come off the due_at index in order; SKIP LOCKED means another
+        instance claiming at the same time gets different rows, and the
+        status flip in the same statement means a claimed timer is never
+        handed out twice.
+        """
+        rows = await fetch_all("""
+            UPDATE issue_timers
+            SET status = 'firing',
+                attempts = attempts + 1,
+                locked_until = NOW() + make_interval(secs => $2)
+            WHERE id IN (
+                SELECT id FROM issue_timers
+                WHERE status = 'pending' AND due_at <= NOW()
+                ORDER BY due_at
+                FOR UPDATE SKIP LOCKED
+                LIMIT $1
+            )
+            RETURNING *
+        """, limit, visibility_seconds)
+        return [dict(row) for row in rows]
+
+    async def finish(self, timer_id: int, status: str = "fired", note: Optional[str] = None) -> None:
+        """Record a claimed timer as fired, or cancelled if it no longer applied."""
+        await execute("""
+            UPDATE issue_timers
+            SET status = $2, fired_at = NOW(), locked_until = NULL, last_error = $3
+            WHERE id = $1
+        """, timer_id, status, note)
+
+    async def fail(self, timer_id: int, error: str, retry_in_seconds: float) -> Optional[Dict[str, Any]]:
+        """Retry a timer whose action failed, until TIMER_MAX_ATTEMPTS."""
+        row = await execute_returning(f"""
+            UPDATE issue_timers
+            SET status = {_REQUEUE_STATUS.format(max_attempts="$2")},
+                due_at = NOW() + make_interval(secs => $3),
+                locked_until = NULL,
+                last_error = $4
+            WHERE id = $1
+            RETURNING *
+        """, timer_id, TIMER_MAX_ATTEMPTS, retry_in_seconds, error[:2000])
+        return dict(row) if row else None
+
+    async def requeue_stale(self) -> int:
+        """Return timers whose scheduler died mid-fire to the queue."""
+        result = await execute(f"""
+            UPDATE issue_timers
+            SET status = {_REQUEUE_STATUS.format(max_attempts="$1")}, locked_until = NULL
+            WHERE status = 'firing' AND locked_until < NOW()
+        """, TIMER_MAX_ATTEMPTS)
+        return int(result.split()[-1]) if result else 0
+
+    async def next_due_at(self) -> Optional[datetime]:
+        """When the earliest pending timer is due (one index probe)."""
+        row = await fetch_one("SELECT MIN(due_at) as due_at FROM issue_timers WHERE status = 'pending'")
+        return row["due_at"] if row else None
+
+    async def get_for_issue(self, issue_id: int) -> List[Dict[str, Any]]:
+        rows = await fetch_all("""
+            SELECT * FROM issue_timers
+            WHERE issue_id = $1
+            ORDER BY created_at DESC
+        """, issue_id)
+        return [dict(row) for row in rows]
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Pending timers by kind, how many are overdue, and how late the oldest is."""
+        rows = await fetch_all("""
+            SELECT kind,
+                   COUNT(*) FILTER (WHERE status = 'pending') as pending,
+                   COUNT(*) FILTER (WHERE status = 'pending' AND due_at <= NOW()) as overdue,
+                   COUNT(*) FILTER (WHERE status = 'firing') as firing,
+                   COUNT(*) FILTER (WHERE status = 'failed') as failed,
+                   EXTRACT(EPOCH FROM (NOW() - MIN(due_at) FILTER (WHERE status = 'pending' AND due_at <= NOW()))) as max_lateness_seconds
+            FROM issue_timers
+            WHERE status IN ('pending', 'firing', 'failed')
+            GROUP BY kind
+        """)
+        metrics = {kind: {"pending": 0, "overdue": 0, "firing": 0, "failed": 0, "max_lateness_seconds": 0} for kind in TIMER_KINDS}
+        for row in rows:
+            metrics[row["kind"]] = {
+                "pending": row["pending"],
+                "overdue": row["overdue"],
+                "firing": row["firing"],
+                "failed": row["failed"],
+                "max_lateness_seconds": round(row["max_lateness_seconds"] or 0, 1),
+            }
+        return metrics
+
+
+# Singleton instance
+issue_timers = IssueTimers()
@@ -0,0 +1,168 @@
+"""Agent token usage and cost accounting."""
+from typing import Optional, List, Dict, Any
+from app.db.database import fetch_one, fetch_all, execute
+from app.db.scoped import ISSUE_ORG
+
+# USD per million tokens
+MODEL_PRICING = {
+    "claude-sonnet-4-20250514": {"input": 3.00, "output": 15.00, "cache_write": 3.75, "cache_read": 0.30},
+    "claude-3-5-haiku-20241022": {"input": 0.80, "output": 4.00, "cache_write": 1.00, "cache_read": 0.08},
+}
+DEFAULT_PRICING = MODEL_PRICING["claude-sonnet-4-20250514"]
+
+
+def estimate_cost(
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    cache_creation_tokens: int = 0,
+    cache_read_tokens: int = 0,
+) -> float:
+    """Estimate the USD cost of a single model call."""
+    pricing = MODEL_PRICING.get(model, DEFAULT_PRICING)
+    return (
+        input_tokens * pricing["input"]
+        + output_tokens * pricing["output"]
+        + cache_creation_tokens * pricing["cache_write"]
+        + cache_read_tokens * pricing["cache_read"]
+    ) / 1_000_000
+
+
+async def record_usage(
+    issue_id: int,
+    model: str,
+    turn_index: int,
+    input_tokens: int,
+    output_tokens: int,
+    cache_creation_tokens: int,
+    cache_read_tokens: int,
+    latency_ms: int,
+    stop_reason: Optional[str],
+    tier: Optional[str] = None,
+    route_reason: Optional[str] = None,
+) -> None:
+    """Record one messages.create call. The issue's org is resolved in the same statement."""
+    query = f"""
+        INSERT INTO agent_usage
+        (issue_id, org_id, model, turn_index, input_tokens, output_tokens,
+         cache_creation_tokens, cache_read_tokens, latency_ms, stop_reason, cost_usd,
+         tier, route_reason)
+        SELECT $1, (
+            SELECT {ISSUE_ORG}
+            FROM issues i
+            LEFT JOIN tenants t ON t.id = i.tenant_id
+            LEFT JOIN properties p ON p.id = i.property_id
+            WHERE i.id = $1
+        ), $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12
+    """
+    cost = estimate_cost(model, input_tokens, output_tokens, cache_creation_tokens, cache_read_tokens)
+    await execute(
+        query, issue_id, model, turn_index, input_tokens, output_tokens,
+        cache_creation_tokens, cache_read_tokens, latency_ms, stop_reason, cost,
+        tier, route_reason,
+    )
+
+
+async def is_over_budget(issue_id: int) -> bool:
+    """Check whether the issue's org has spent its monthly LLM budget."""
+    try:
+        row = await fetch_one(f"""
+            SELECT o.monthly_llm_budget_usd as budget,
+                   COALESCE((
+                       SELECT SUM(u.cost_usd) FROM agent_usage u
+                       WHERE u.org_id = o.id
+                       AND u.created_at >= date_trunc('month', NOW())
+                   ), 0) as spent
+            FROM issues i
+            LEFT JOIN tenants t ON t.id = i.tenant_id
+            LEFT JOIN properties p ON p.id = i.property_id
+            JOIN organizations o ON o.id = {ISSUE_ORG}
+            WHERE i.id = $1
+        """, issue_id)
+    except Exception:
+        # Usage table or budget column might not exist yet - never block the agent
+        return False
+    if not row or row["budget"] is None:
+        return False
+    return row["spent"] >= row["budget"]
+
+
+async def get_issue_usage(issue_id: int) -> Dict[str, Any]:
+    """Totals and per-call rows for one issue."""
+    rows = await fetch_all("""
+        SELECT model, turn_index, input_tokens, output_tokens, cache_creation_tokens,
+               cache_read_tokens, latency_ms, stop_reason, cost_usd, tier, route_reason, created_at
+        FROM agent_usage
+        WHERE issue_id = $1
+        ORDER BY id
+    """, issue_id)
+    calls = [dict(row) for row in rows]
+    return {
+        "issue_id": issue_id,
+        "calls": len(calls),
+        "input_tokens": sum(c["input_tokens"] for c in calls),
+        "output_tokens": sum(c["output_tokens"] for c in calls),
+        "cache_read_tokens": sum(c["cache_read_tokens"] for c in calls),
+        "latency_ms": sum(c["latency_ms"] for c in calls),
+        "cost_usd": float(sum(c["cost_usd"] for c in calls)),
+        "details": calls,
+    }
+
+
+async def get_daily_usage(org_id: Optional[int] = None, days: int = 30) -> List[Dict[str, Any]]:
+    """Usage rolled up per org, model and day."""
+    query = """
+        SELECT org_id, model, date_trunc('day', created_at)::date as day,
+               COUNT(*) as calls,
+               COUNT(DISTINCT issue_id) as issues,
+               SUM(input_tokens) as input_tokens,
+               SUM(output_tokens) as output_tokens,
+               SUM(cache_read_tokens) as cache_read_tokens,
+               ROUND(AVG(latency_ms)) as avg_latency_ms,
+               SUM(cost_usd) as cost_usd
+        FROM agent_usage
+        WHERE created_at >= NOW() - make_interval(days => $1)
+        AND ($2::int IS NULL OR org_id = $2)
+        GROUP BY org_id, model, day
+        ORDER BY day DESC, org_id, model
+    """
+    rows = await fetch_all(query, days, org_id)
+    return [{**dict(row), "cost_usd": float(row["cost_usd"] or 0)} for row in rows]
+
+
+async def get_cost_summary() -> Dict[str, Any]:
+    """Total LLM spend and spend per issue resolved by the agent."""
+    try:
+        row = await fetch_one("""
+            SELECT COALESCE(SUM(cost_usd), 0) as total_cost,
+                   (SELECT COUNT(*) FROM issues WHERE status = 'resolved_by_agent') as resolved
+            FROM agent_usage
+        """)
+    except Exception:
+        # Usage table might not exist yet
+        return {"llm_cost_usd": 0, "cost_per_resolved_issue_usd": 0}
+    total = float(row["total_cost"]) if row else 0
+    resolved = row["resolved"] if row else 0
+    return {
+        "llm_cost_usd": round(total, 4),
+        "cost_per_resolved_issue_usd": round(total / resolved, 4) if resolved else 0,
+    }
+
+
+async def get_routing_outcomes(days: int = 30) -> List[Dict[str, Any]]:
+    """Latency, cost and issue outcome per routing tier and reason."""
+    rows = await fetch_all("""
+        SELECT u.tier, u.route_reason, u.model,
+               COUNT(*) as calls,
+               COUNT(DISTINCT u.issue_id) as issues,
+               ROUND(AVG(u.latency_ms)) as avg_latency_ms,
+               SUM(u.cost_usd) as cost_usd,
+               COUNT(DISTINCT u.issue_id) FILTER (WHERE i.status = 'resolved_by_agent') as resolved_issues,
+               COUNT(DISTINCT u.issue_id) FILTER (WHERE i.status = 'escalated') as escalated_issues
+        FROM agent_usage u
+        JOIN issues i ON i.id = u.issue_id
+        WHERE u.created_at >= NOW() - make_interval(days => $1)
+        GROUP BY u.tier, u.route_reason, u.model
+        ORDER BY calls DESC
+    """, days)
+    return [{**dict(row), "cost_usd": float(row["cost_usd"] or 0)} for row in rows]
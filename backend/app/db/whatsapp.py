@@ -2,6 +2,11 @@
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from app.db.database import fetch_one, fetch_all, execute_returning, execute
+from app.db.cache import tenant_phone_cache, contact_route_cache
+from app.db.tenants import normalize_phone
+
+# Issue statuses that end routing - the next message starts a new issue
+TERMINAL_ISSUE_STATUSES = ("closed", "resolved_by_agent", "escalated", "resolved")
 
 
 class WhatsAppConversations:
@@ -17,35 +22,75 @@ class WhatsAppConversations:
         """
         Create a new WhatsApp conversation record.
 
-        Links a Respond.io contact to a tenant and issue.
+        Links a Respond.io contact to a tenant and issue, and makes it the
+        contact's route in the same statement.
         """
         query = """
-            INSERT INTO whatsapp_conversations
-            (contact_id, phone, tenant_id, issue_id, status, created_at, updated_at)
-            VALUES ($1, $2, $3, $4, 'active', NOW(), NOW())
-            RETURNING *
+            WITH conversation AS (
+                INSERT INTO whatsapp_conversations
+                (contact_id, phone, tenant_id, issue_id, status, created_at, updated_at)
+                VALUES ($1, $2, $3, $4, 'active', NOW(), NOW())
+                RETURNING *
+            ), route AS (
+                INSERT INTO whatsapp_routes (contact_id, conversation_id, issue_id, tenant_id, phone)
+                SELECT contact_id, id, issue_id, tenant_id, phone FROM conversation
+                ON CONFLICT (contact_id) DO UPDATE
+                SET conversation_id = EXCLUDED.conversation_id,
+                    issue_id = EXCLUDED.issue_id,
+                    tenant_id = EXCLUDED.tenant_id,
+                    phone = EXCLUDED.phone,
+                    updated_at = NOW()
+            )
+            SELECT * FROM conversation
         """
         row = await execute_returning(query, contact_id, phone, tenant_id, issue_id)
+        await contact_route_cache.invalidate(contact_id)
         return dict(row)
 
     async def get_active_conversation(self, contact_id: str) -> Optional[Dict[str, Any]]:
         """
         Get the active conversation for a contact.
 
-        A contact can only have one active conversation at a time.
+        A contact can only have one active conversation at a time. This is
+        a single key lookup on the routing table, fronted by a cache; the
+        route carries the conversation id as "id" plus issue and tenant ids.
         """
+        found, route = contact_route_cache.get(contact_id)
+        if found:
+            return dict(route) if route else None
+
         query = """
-            SELECT wc.*, i.status as issue_status
-            FROM whatsapp_conversations wc
-            JOIN issues i ON i.id = wc.issue_id
-            WHERE wc.contact_id = $1
-            AND wc.status = 'active'
-            AND i.status NOT IN ('closed', 'resolved_by_agent', 'escalated', 'resolved')
-            ORDER BY wc.created_at DESC
-            LIMIT 1
+            SELECT conversation_id as id, contact_id, issue_id, tenant_id, phone
+            FROM whatsapp_routes
+            WHERE contact_id = $1
         """
         row = await fetch_one(query, contact_id)
-        return dict(row) if row else None
+        route = dict(row) if row else None
+        contact_route_cache.set(contact_id, route)
+        return dict(route) if route else None
+
+    async def restore_route(self, issue_id: int) -> None:
+        """Route the contact back to a reopened issue, unless they've moved on."""
+        query = """
+            INSERT INTO whatsapp_routes (contact_id, conversation_id, issue_id, tenant_id, phone)
+            SELECT contact_id, id, issue_id, tenant_id, phone
+            FROM whatsapp_conversations
+            WHERE issue_id = $1 AND status = 'active'
+            ORDER BY created_at DESC
+            LIMIT 1
+            ON CONFLICT (contact_id) DO NOTHING
+            RETURNING contact_id
+        """
+        row = await execute_returning(query, issue_id)
+        if row:
+            await contact_route_cache.invalidate(row["contact_id"])
+
+    async def clear_issue_routes(self, issue_id: int) -> None:
+        """Stop routing contacts to an issue (it reached a terminal status)."""
+        rows = await fetch_all(
+            "DELETE FROM whatsapp_routes WHERE issue_id = $1 RETURNING contact_id", issue_id
+        )
+        await contact_route_cache.invalidate(*[row["contact_id"] for row in rows])
 
     async def get_conversation_by_issue(self, issue_id: int) -> Optional[Dict[str, Any]]:
         """Get the WhatsApp conversation for an issue."""
@@ -67,6 +112,11 @@ class WhatsAppConversations:
             RETURNING *
         """
         row = await execute_returning(query, conversation_id)
+        removed = await fetch_all(
+            "DELETE FROM whatsapp_routes WHERE conversation_id = $1 RETURNING contact_id",
+            conversation_id,
+        )
+        await contact_route_cache.invalidate(*[r["contact_id"] for r in removed])
         return dict(row) if row else None
 
     async def close_conversation_by_issue(self, issue_id: int) -> bool:
@@ -77,32 +127,41 @@ class WhatsAppConversations:
             WHERE issue_id = $1
         """
         await execute(query, issue_id)
+        await self.clear_issue_routes(issue_id)
         return True
 
     async def get_tenant_by_phone(self, phone: Optional[str]) -> Optional[Dict[str, Any]]:
         """
         Find a tenant by their phone number.
 
-        Returns tenant with their property_id for issue creation.
+        Returns tenant with their property_id for issue creation. Results,
+        including misses, are cached by E.164 number; tenant writes
+        invalidate the entry.
         """
         if not phone:
             return None
 
+        key = normalize_phone(phone)
+        found, tenant = tenant_phone_cache.get(key)
+        if found:
+            return dict(tenant) if tenant else None
+
         # Normalize phone number (remove spaces, ensure + prefix)
         normalized = phone.replace(" ", "").replace("-", "")
         if not normalized.startswith("+"):
             normalized = "+" + normalized
 
         query = """
-            SELECT t.*, p.name as property_name
+            SELECT t.*, p.name as property_name, p.org_id as property_org_id
             FROM tenants t
             LEFT JOIN properties p ON p.id = t.property_id
-            WHERE t.phone = $1
-            OR t.phone = $2
+            WHERE t.phone = ANY($1::text[])
             LIMIT 1
         """
-        row = await fetch_one(query, phone, normalized)
-        return dict(row) if row else None
+        row = await fetch_one(query, list({phone, normalized, key}))
+        tenant = dict(row) if row else None
+        tenant_phone_cache.set(key, tenant)
+        return dict(tenant) if tenant else None
 
     async def create_pending_registration(
         self,
@@ -1,9 +1,10 @@
 """Integrations for FixMate."""
-from .respondio import RespondIOClient, respondio_client
+from .respondio import RespondIOClient, ContactUpdate, respondio_client
 from .twilio_whatsapp import TwilioWhatsAppClient, twilio_client
 
 __all__ = [
     "RespondIOClient",
+    "ContactUpdate",
     "respondio_client",
     "TwilioWhatsAppClient",
     "twilio_client",
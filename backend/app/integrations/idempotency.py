@@ -0,0 +1,61 @@
+"""Deduplication of inbound webhook deliveries.
+
+Twilio and Respond.io retry a webhook when the ack is slow, so the same
+message can arrive several times. A bounded in-memory TTL set catches
+retries to this process before any DB or LLM work; the unique index on
+issue_messages.provider_message_id catches the rest (other workers,
+restarts) at insert time.
+"""
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import INBOUND_DEDUPE_TTL_SECONDS, INBOUND_DEDUPE_MAX_ENTRIES
+
+
+class TTLSet:
+    """Insertion-ordered set whose entries expire, capped at max_entries."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self.duplicates = 0
+
+    def _evict(self, now: float):
+        """Drop expired entries from the front, then trim to size."""
+        while self._entries:
+            key, expires_at = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def check_and_add(self, key: Optional[str]) -> bool:
+        """
+        Record a key; return True if it was already present (a duplicate).
+
+        Empty keys are never treated as duplicates.
+        """
+        if not key:
+            return False
+        now = time.monotonic()
+        self._evict(now)
+        expires_at = self._entries.get(key)
+        if expires_at and expires_at > now:
+            self.duplicates += 1
+            return True
+        self._entries[key] = now + self.ttl_seconds
+        self._entries.move_to_end(key)
+        return False
+
+    def discard(self, key: Optional[str]):
+        """Forget a key, e.g. when processing failed and a retry should go through."""
+        if key:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton instance
+inbound_dedupe = TTLSet(INBOUND_DEDUPE_TTL_SECONDS, INBOUND_DEDUPE_MAX_ENTRIES)
@@ -0,0 +1,164 @@
+"""Storage for WhatsApp attachments.
+
+Downloads are streamed chunk by chunk into a temp file while the content
+hash is computed, so memory use stays at one chunk however large the file.
+Blobs are stored under their SHA-256, which makes storage content
+addressed: the same photo sent twice is kept once.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import Optional, Tuple
+
+import httpx
+
+from app.config import (
+    MEDIA_STORAGE_BACKEND,
+    MEDIA_STORAGE_DIR,
+    MEDIA_S3_BUCKET,
+    MEDIA_S3_PREFIX,
+    MEDIA_CHUNK_BYTES,
+)
+
+
+class MediaTooLarge(Exception):
+    """The attachment exceeds the configured size cap."""
+
+    def __init__(self, size_bytes: int, max_bytes: int):
+        super().__init__(f"Attachment is {size_bytes} bytes; the limit is {max_bytes}")
+        self.size_bytes = size_bytes
+
+
+def blob_key(sha256: str) -> str:
+    return f"{sha256[:2]}/{sha256}"
+
+
+def thumbnail_key(sha256: str) -> str:
+    return f"thumbs/{sha256[:2]}/{sha256}.jpg"
+
+
+async def stream_to_file(
+    response: httpx.Response,
+    path: str,
+    max_bytes: int,
+    chunk_size: int = MEDIA_CHUNK_BYTES,
+) -> Tuple[str, int]:
+    """
+    Write a streamed response body to path, hashing as it goes.
+
+    Stops reading as soon as the cap is passed (a missing or lying
+    Content-Length can't get around it). Returns (sha256 hex, size).
+    """
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise MediaTooLarge(int(declared), max_bytes)
+
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as f:
+        async for chunk in response.aiter_bytes(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise MediaTooLarge(size, max_bytes)
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest(), size
+
+
+def make_thumbnail(source_path: str, dest_path: str, size: int) -> bool:
+    """
+    Write a JPEG thumbnail of an image; False if it can't be made.
+
+    Runs in a worker process so decoding a large photo never blocks the
+    event loop or grows the web process.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+    try:
+        with Image.open(source_path) as image:
+            # Let the JPEG decoder downscale while reading
+            image.draft("RGB", (size, size))
+            image.thumbnail((size, size))
+            image.convert("RGB").save(dest_path, "JPEG", quality=80)
+        return True
+    except Exception:
+        return False
+
+
+class LocalMediaStorage:
+    """Blobs as files under MEDIA_STORAGE_DIR."""
+
+    def __init__(self, root: str = MEDIA_STORAGE_DIR):
+        self.root = root
+
+    def temp_path(self) -> str:
+        """A temp file on the same filesystem, so storing it is a rename."""
+        temp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(temp_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=temp_dir)
+        os.close(fd)
+        return path
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    async def put(self, path: str, key: str, content_type: Optional[str] = None) -> None:
+        """Move a finished temp file into place."""
+        dest = self.local_path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(path, dest)
+
+
+class S3MediaStorage:
+    """Blobs in an S3 bucket (boto3 is imported on first use)."""
+
+    def __init__(self, bucket: str = MEDIA_S3_BUCKET, prefix: str = MEDIA_S3_PREFIX):
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = None
+
+    def _s3(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("s3")
+        return self._client
+
+    def temp_path(self) -> str:
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        return path
+
+    def local_path(self, key: str) -> Optional[str]:
+        return None
+
+    async def put(self, path: str, key: str, content_type: Optional[str] = None) -> None:
+        """Upload from disk (multipart for large files), then drop the temp file."""
+        extra = {"ContentType": content_type} if content_type else None
+        try:
+            await asyncio.to_thread(
+                self._s3().upload_file, path, self.bucket, self.prefix + key, ExtraArgs=extra
+            )
+        finally:
+            discard(path)
+
+    def presigned_url(self, key: str, expires_in: int = 300, disposition: Optional[str] = None) -> str:
+        params = {"Bucket": self.bucket, "Key": self.prefix + key}
+        if disposition:
+            params["ResponseContentDisposition"] = disposition
+        return self._s3().generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+
+def discard(path: Optional[str]):
+    """Remove a temp file if it is still there."""
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# Singleton instance
+media_storage = S3MediaStorage() if MEDIA_STORAGE_BACKEND == "s3" else LocalMediaStorage()
@@ -0,0 +1,95 @@
+"""Delivery channels for notification digests.
+
+A channel takes a batch of digests and returns, per digest, None on
+success or the SendError that stopped it. Channels are looked up by the
+notification's channel name; register_channel adds or replaces one.
+"""
+import asyncio
+import smtplib
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+from app.config import (
+    SMTP_HOST,
+    SMTP_PORT,
+    SMTP_USERNAME,
+    SMTP_PASSWORD,
+    SMTP_USE_TLS,
+    NOTIFICATION_EMAIL_FROM,
+)
+from app.integrations.outbound import SendError
+from app.integrations.twilio_whatsapp import twilio_client
+
+
+@dataclass
+class Digest:
+    """One message to one recipient, covering one or more notifications."""
+    address: str
+    subject: str
+    body: str
+
+
+class EmailChannel:
+    """SMTP; each batch shares one connection."""
+
+    name = "email"
+
+    def _send_batch(self, digests: List[Digest]) -> List[Optional[SendError]]:
+        try:
+            smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+            if SMTP_USE_TLS:
+                smtp.starttls()
+            if SMTP_USERNAME:
+                smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+        except (OSError, smtplib.SMTPException) as e:
+            error = SendError(f"SMTP connect failed: {e}", retryable=True)
+            return [error] * len(digests)
+
+        outcomes: List[Optional[SendError]] = []
+        with smtp:
+            for digest in digests:
+                message = EmailMessage()
+                message["From"] = NOTIFICATION_EMAIL_FROM
+                message["To"] = digest.address
+                message["Subject"] = digest.subject
+                message.set_content(digest.body)
+                try:
+                    smtp.send_message(message)
+                    outcomes.append(None)
+                except smtplib.SMTPRecipientsRefused as e:
+                    outcomes.append(SendError(f"Recipient refused: {e}", retryable=False))
+                except (OSError, smtplib.SMTPException) as e:
+                    outcomes.append(SendError(str(e), retryable=True))
+        return outcomes
+
+    async def send_batch(self, digests: List[Digest]) -> List[Optional[SendError]]:
+        # smtplib is blocking
+        return await asyncio.to_thread(self._send_batch, digests)
+
+
+class WhatsAppChannel:
+    """Twilio WhatsApp, through the outbound outbox (rate limited and retried there)."""
+
+    name = "whatsapp"
+
+    async def send_batch(self, digests: List[Digest]) -> List[Optional[SendError]]:
+        outcomes: List[Optional[SendError]] = []
+        for digest in digests:
+            result = await twilio_client.send_message(digest.address, f"*{digest.subject}*\n\n{digest.body}")
+            if result.get("sent") or result.get("queued"):
+                outcomes.append(None)
+            else:
+                outcomes.append(SendError(result.get("error") or "WhatsApp send failed", retryable=True))
+        return outcomes
+
+
+NOTIFICATION_CHANNELS: Dict[str, object] = {
+    "email": EmailChannel(),
+    "whatsapp": WhatsAppChannel(),
+}
+
+
+def register_channel(name: str, channel) -> None:
+    """Add or replace a channel (anything with async send_batch(digests))."""
+    NOTIFICATION_CHANNELS[name] = channel
@@ -0,0 +1,103 @@
+"""Shared pieces for outbound WhatsApp delivery."""
+import asyncio
+import random
+import time
+from typing import Optional, List
+
+# Twilio rejects WhatsApp bodies over 1600 characters; Respond.io allows more
+WHATSAPP_MAX_MESSAGE_LENGTH = 1600
+
+
+class SendError(Exception):
+    """
+    A provider rejected or failed a send.
+
+    retryable is True for throttling (429), provider errors (5xx) and
+    network failures; throttled marks a 429, and retry_after carries the
+    provider's hint when given.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        retryable: bool,
+        retry_after: Optional[float] = None,
+        throttled: bool = False,
+    ):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.throttled = throttled
+
+
+def is_retryable_status(status: Optional[int]) -> bool:
+    """Throttling and server errors are worth retrying; other 4xx are not."""
+    return status is None or status == 429 or status >= 500
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header in seconds (the HTTP-date form is ignored)."""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def backoff_seconds(attempts: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff from `base` up to `cap`, with jitter, never shorter than the provider's hint."""
+    delay = min(base * (2 ** max(attempts - 1, 0)), cap) * random.uniform(0.8, 1.2)
+    return max(delay, retry_after or 0)
+
+
+def coalesce_messages(texts: List[str], max_length: int = WHATSAPP_MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Pack consecutive messages into as few WhatsApp bodies as fit.
+
+    Messages are joined with a blank line in their original order; one
+    that is too long on its own is sent as-is and left to the provider.
+    """
+    bodies: List[str] = []
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        if bodies and len(bodies[-1]) + 2 + len(text) <= max_length:
+            bodies[-1] = f"{bodies[-1]}\n\n{text}"
+        else:
+            bodies.append(text)
+    return bodies
+
+
+class TokenBucket:
+    """Async token bucket: `rate` sends per second with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait for a token; callers are served in arrival order."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Back off the whole sender after the provider throttled us."""
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
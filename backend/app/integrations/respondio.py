@@ -1,9 +1,46 @@
 """Respond.io API client for WhatsApp messaging."""
+import asyncio
 import os
+import random
 import httpx
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from app.config import (
+    DATABASE_URL,
+    RESPONDIO_MAX_CONNECTIONS,
+    RESPONDIO_MAX_KEEPALIVE_CONNECTIONS,
+    RESPONDIO_KEEPALIVE_EXPIRY_SECONDS,
+    RESPONDIO_CONTACT_CACHE_TTL_SECONDS,
+    RESPONDIO_CONTACT_CACHE_MAX_ENTRIES,
+    RESPONDIO_BATCH_CONCURRENCY,
+    RESPONDIO_BATCH_MAX_ATTEMPTS,
+)
+from app.db.cache import TTLCache
+from app.db.outbox import outbound_messages
+from app.integrations.outbound import SendError, is_retryable_status, parse_retry_after
+
+
+@dataclass
+class ContactUpdate:
+    """Tags to add and custom fields to set on one contact."""
+    contact_id: str
+    tags: List[str] = field(default_factory=list)
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+def coalesce_updates(updates: List[ContactUpdate]) -> Dict[str, ContactUpdate]:
+    """Merge updates per contact: tags de-duplicated in order, later field values win."""
+    merged: Dict[str, ContactUpdate] = {}
+    for update in updates:
+        target = merged.setdefault(update.contact_id, ContactUpdate(update.contact_id))
+        for tag in update.tags:
+            if tag not in target.tags:
+                target.tags.append(tag)
+        target.fields.update(update.fields)
+    return merged
+
 
 class RespondIOClient:
     """Client for Respond.io API to send/receive WhatsApp messages."""
@@ -11,11 +48,50 @@ class RespondIOClient:
     def __init__(self):
         self.api_key = os.getenv("RESPONDIO_API_KEY", "")
         self.workspace_id = os.getenv("RESPONDIO_WORKSPACE_ID", "")
-        self.base_url = "https://api.respond.io/v2"
+        self.base_url = os.getenv("RESPONDIO_BASE_URL", "https://api.respond.io/v2")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
+        # One pooled client per process (keep-alive, HTTP/2 when h2 is
+        # installed), created on first use and closed from the app lifespan
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.contact_cache = TTLCache(
+            "respondio_contacts",
+            RESPONDIO_CONTACT_CACHE_TTL_SECONDS,
+            0,
+            RESPONDIO_CONTACT_CACHE_MAX_ENTRIES,
+        )
+
+    def _http(self) -> httpx.AsyncClient:
+        """The shared client, recreated if the event loop changed (scripts, tests)."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            try:
+                import h2  # noqa: F401
+                http2 = True
+            except ImportError:
+                http2 = False
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                http2=http2,
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=RESPONDIO_MAX_CONNECTIONS,
+                    max_keepalive_connections=RESPONDIO_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=RESPONDIO_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        """Close pooled connections (app shutdown)."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
 
     def is_configured(self) -> bool:
         """Check if Respond.io is properly configured."""
@@ -26,64 +102,96 @@ class RespondIOClient:
         contact_id: str,
         message: str,
         channel_id: Optional[str] = None,
+        issue_id: Optional[int] = None,
     ) -> dict:
         """
         Send a message to a contact via Respond.io.
 
+        The message is queued in the outbox and delivered by the outbound
+        dispatcher (rate limited, retried); without a database it is sent
+        directly.
+
         Args:
             contact_id: The Respond.io contact ID
             message: The message text to send
             channel_id: Optional specific channel (defaults to WhatsApp)
+            issue_id: Issue to log the delivery outcome against
 
         Returns:
-            API response dict
+            Dict with queue (or send) status
         """
         if not self.is_configured():
             return {"error": "Respond.io not configured", "sent": False}
 
-        url = f"{self.base_url}/contact/{contact_id}/message"
+        payload = {"body": message, "channel_id": channel_id}
+        if DATABASE_URL:
+            outbound_id = await outbound_messages.enqueue(
+                "respondio", self.workspace_id, contact_id, payload, issue_id
+            )
+            return {"sent": False, "queued": True, "outbound_id": outbound_id}
 
-        payload = {
+        try:
+            return {"sent": True, **await self.deliver(contact_id, payload)}
+        except SendError as e:
+            return {"sent": False, "error": str(e)}
+
+    async def deliver(self, contact_id: str, payload: Dict[str, Any]) -> dict:
+        """
+        Make the API call for one queued message.
+
+        Raises SendError, marked retryable for 429/5xx and network failures
+        and carrying any Retry-After hint.
+        """
+        url = f"/contact/{contact_id}/message"
+
+        body = {
             "message": {
                 "type": "text",
-                "text": message,
+                "text": payload["body"],
             }
         }
 
-        if channel_id:
-            payload["channelId"] = channel_id
+        if payload.get("channel_id"):
+            body["channelId"] = payload["channel_id"]
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url,
-                    headers=self.headers,
-                    json=payload,
-                    timeout=10.0,
-                )
-                response.raise_for_status()
-                return {"sent": True, "response": response.json()}
-            except httpx.HTTPError as e:
-                return {"sent": False, "error": str(e)}
+        try:
+            response = await self._http().post(url, json=body)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            raise SendError(
+                str(e),
+                retryable=is_retryable_status(e.response.status_code),
+                retry_after=parse_retry_after(e.response.headers.get("Retry-After")),
+                throttled=e.response.status_code == 429,
+            )
+        except httpx.HTTPError as e:
+            raise SendError(str(e), retryable=True)
+
+        data = response.json()
+        message_id = data.get("messageId") if isinstance(data, dict) else None
+        return {"message_id": str(message_id) if message_id else None, "response": data}
+
+    async def _get_cached(self, key: str, url: str) -> Optional[dict]:
+        """GET a contact resource through the TTL cache; errors are not cached."""
+        found, contact = self.contact_cache.get(key)
+        if found:
+            return contact
+
+        try:
+            response = await self._http().get(url)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            return None
+        contact = response.json()
+        self.contact_cache.set(key, contact)
+        return contact
 
     async def get_contact(self, contact_id: str) -> Optional[dict]:
         """Get contact details from Respond.io."""
         if not self.is_configured():
             return None
 
-        url = f"{self.base_url}/contact/{contact_id}"
-
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    url,
-                    headers=self.headers,
-                    timeout=10.0,
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError:
-                return None
+        return await self._get_cached(f"id:{contact_id}", f"/contact/{contact_id}")
 
     async def get_contact_by_phone(self, phone: str) -> Optional[dict]:
         """
@@ -95,40 +203,27 @@ class RespondIOClient:
         if not self.is_configured():
             return None
 
-        url = f"{self.base_url}/contact/phone:{phone}"
+        return await self._get_cached(f"phone:{phone}", f"/contact/phone:{phone}")
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    url,
-                    headers=self.headers,
-                    timeout=10.0,
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError:
-                return None
+    def _forget_contact(self, contact_id: str):
+        """Drop a contact we just changed; phone-keyed entries expire with the TTL."""
+        self.contact_cache.delete(f"id:{contact_id}")
 
     async def add_contact_tag(self, contact_id: str, tag: str) -> bool:
         """Add a tag to a contact for organization."""
         if not self.is_configured():
             return False
 
-        url = f"{self.base_url}/contact/{contact_id}/tag"
+        url = f"/contact/{contact_id}/tag"
         payload = {"tag": tag}
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url,
-                    headers=self.headers,
-                    json=payload,
-                    timeout=10.0,
-                )
-                response.raise_for_status()
-                return True
-            except httpx.HTTPError:
-                return False
+        try:
+            response = await self._http().post(url, json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            return False
+        self._forget_contact(contact_id)
+        return True
 
     async def update_contact_custom_field(
         self,
@@ -143,25 +238,98 @@ class RespondIOClient:
         if not self.is_configured():
             return False
 
-        url = f"{self.base_url}/contact/{contact_id}"
+        url = f"/contact/{contact_id}"
         payload = {
             "customFields": {
                 field_name: value,
             }
         }
 
-        async with httpx.AsyncClient() as client:
+        try:
+            response = await self._http().put(url, json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            return False
+        self._forget_contact(contact_id)
+        return True
+
+    async def _request_with_retry(self, method: str, url: str, payload: Any, max_attempts: int) -> int:
+        """Make one call, retrying 429/5xx/network errors; returns attempts used."""
+        for attempt in range(1, max_attempts + 1):
             try:
-                response = await client.put(
-                    url,
-                    headers=self.headers,
-                    json=payload,
-                    timeout=10.0,
-                )
+                response = await self._http().request(method, url, json=payload)
                 response.raise_for_status()
-                return True
+                return attempt
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if not is_retryable_status(status) or attempt == max_attempts:
+                    raise
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
             except httpx.HTTPError:
-                return False
+                if attempt == max_attempts:
+                    raise
+                retry_after = None
+            delay = min(0.5 * (2 ** (attempt - 1)), 10) * random.uniform(0.8, 1.2)
+            await asyncio.sleep(max(delay, retry_after or 0))
+        return max_attempts
+
+    async def _apply_update(self, update: ContactUpdate, max_attempts: int) -> Dict[str, Any]:
+        """All fields in one PUT, then each tag; stops at the first hard failure."""
+        outcome = {
+            "contact_id": update.contact_id,
+            "ok": True,
+            "fields_updated": False,
+            "tags_applied": [],
+            "requests": 0,
+            "error": None,
+        }
+        try:
+            if update.fields:
+                outcome["requests"] += await self._request_with_retry(
+                    "PUT", f"/contact/{update.contact_id}", {"customFields": update.fields}, max_attempts
+                )
+                outcome["fields_updated"] = True
+            for tag in update.tags:
+                outcome["requests"] += await self._request_with_retry(
+                    "POST", f"/contact/{update.contact_id}/tag", {"tag": tag}, max_attempts
+                )
+                outcome["tags_applied"].append(tag)
+        except httpx.HTTPError as e:
+            outcome["ok"] = False
+            outcome["error"] = str(e)
+        if outcome["fields_updated"] or outcome["tags_applied"]:
+            self._forget_contact(update.contact_id)
+        return outcome
+
+    async def update_contacts(
+        self,
+        updates: List[ContactUpdate],
+        concurrency: int = RESPONDIO_BATCH_CONCURRENCY,
+        max_attempts: int = RESPONDIO_BATCH_MAX_ATTEMPTS,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Apply many tag and custom-field updates.
+
+        Updates are coalesced per contact (one request for all of a
+        contact's fields), contacts are processed through a bounded
+        concurrency window, and throttled or failed calls are retried with
+        backoff. Returns the outcome for each contact id.
+        """
+        merged = coalesce_updates(updates)
+        if not self.is_configured():
+            return {
+                contact_id: {"contact_id": contact_id, "ok": False, "error": "Respond.io not configured"}
+                for contact_id in merged
+            }
+
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def run(update: ContactUpdate) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._apply_update(update, max_attempts)
+
+        outcomes = await asyncio.gather(*(run(update) for update in merged.values()))
+        return {outcome["contact_id"]: outcome for outcome in outcomes}
 
 
 # Singleton instance
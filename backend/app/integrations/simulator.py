@@ -0,0 +1,146 @@
+"""Local stand-ins for messaging provider APIs.
+
+Serve these with uvicorn and point RESPONDIO_BASE_URL / TWILIO_API_BASE_URL
+at them to benchmark or load-test without touching the real services.
+Latency, a request rate limit (answered with 429 + Retry-After) and a
+random 5xx rate are configurable, and every request is counted. Outbound
+sends are recorded per recipient so a load generator can measure
+end-to-end reply latency.
+"""
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class SimulatorSettings:
+    """Knobs shared by the simulated endpoints."""
+
+    def __init__(self, latency_ms: float = 50, rate_limit_per_second: float = 0, error_rate: float = 0):
+        self.latency_ms = latency_ms
+        self.rate_limit_per_second = rate_limit_per_second
+        self.error_rate = error_rate
+        self.requests: Counter = Counter()
+        self.throttled = 0
+        self.errors = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._send_waiters: Dict[str, List[asyncio.Future]] = defaultdict(list)
+
+    def record_send(self, recipient: str):
+        """Resolve anyone waiting for a message to this recipient."""
+        for waiter in self._send_waiters.pop(recipient, []):
+            if not waiter.done():
+                waiter.set_result(time.perf_counter())
+
+    def wait_for_send(self, recipient: str) -> asyncio.Future:
+        """Future resolved with the perf_counter time of the next send to recipient."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._send_waiters[recipient].append(waiter)
+        return waiter
+
+    def over_limit(self) -> bool:
+        """Fixed one-second window rate limit."""
+        if not self.rate_limit_per_second:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1:
+            self._window_start, self._window_count = now, 0
+        self._window_count += 1
+        return self._window_count > self.rate_limit_per_second
+
+    async def respond(self, route: str, body: Dict[str, Any], status_code: int = 200) -> JSONResponse:
+        """Apply latency, throttling and errors, then answer."""
+        self.requests[route] += 1
+        if self.over_limit():
+            self.throttled += 1
+            return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "1"})
+        await asyncio.sleep(self.latency_ms / 1000 * random.uniform(0.8, 1.2))
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            return JSONResponse({"error": "upstream error"}, status_code=503)
+        return JSONResponse(body, status_code=status_code)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": dict(self.requests),
+            "total_requests": sum(self.requests.values()),
+            "throttled": self.throttled,
+            "errors": self.errors,
+        }
+
+
+def create_respondio_app(settings: SimulatorSettings) -> FastAPI:
+    """Respond.io v2 contact and message endpoints used by RespondIOClient."""
+    app = FastAPI(title="Respond.io simulator")
+    contacts: Dict[str, Dict[str, Any]] = {}
+    message_ids = iter(range(1, 10 ** 9))
+
+    def contact(contact_id: str) -> Dict[str, Any]:
+        return contacts.setdefault(contact_id, {"id": contact_id, "tags": [], "customFields": {}})
+
+    @app.get("/contact/{contact_id}")
+    async def get_contact(contact_id: str):
+        return await settings.respond("get_contact", contact(contact_id))
+
+    @app.put("/contact/{contact_id}")
+    async def update_contact(contact_id: str, request: Request):
+        payload = await request.json()
+        contact(contact_id)["customFields"].update(payload.get("customFields", {}))
+        return await settings.respond("update_contact", {"id": contact_id})
+
+    @app.post("/contact/{contact_id}/tag")
+    async def add_tag(contact_id: str, request: Request):
+        payload = await request.json()
+        if payload.get("tag") not in contact(contact_id)["tags"]:
+            contact(contact_id)["tags"].append(payload.get("tag"))
+        return await settings.respond("add_tag", {"id": contact_id})
+
+    @app.post("/contact/{contact_id}/message")
+    async def send_message(contact_id: str):
+        response = await settings.respond("send_message", {"contactId": contact_id, "messageId": next(message_ids)})
+        if response.status_code == 200:
+            settings.record_send(contact_id)
+        return response
+
+    @app.get("/_stats")
+    async def stats():
+        return settings.get_stats()
+
+    return app
+
+
+def create_twilio_app(settings: SimulatorSettings) -> FastAPI:
+    """The Twilio Messages endpoint used by the Twilio SDK."""
+    app = FastAPI(title="Twilio simulator")
+
+    @app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+    async def create_message(account_sid: str, request: Request):
+        form = await request.form()
+        to_number = str(form.get("To", ""))
+        body = {
+            "sid": "SM" + uuid.uuid4().hex,
+            "account_sid": account_sid,
+            "from": form.get("From"),
+            "to": to_number,
+            "body": form.get("Body"),
+            "status": "queued",
+            "num_segments": "1",
+            "direction": "outbound-api",
+        }
+        response = await settings.respond("send_message", body, status_code=201)
+        if response.status_code == 201:
+            # Waiters key on the bare phone number
+            settings.record_send(to_number.replace("whatsapp:", ""))
+        return response
+
+    @app.get("/_stats")
+    async def stats():
+        return settings.get_stats()
+
+    return app
@@ -1,9 +1,15 @@
 """Twilio WhatsApp client for sandbox testing."""
+import asyncio
 import os
 from dotenv import load_dotenv
 from twilio.rest import Client
 from twilio.request_validator import RequestValidator
-from typing import Optional
+from twilio.base.exceptions import TwilioRestException
+from typing import Optional, Dict, Any
+
+from app.config import DATABASE_URL
+from app.db.outbox import outbound_messages
+from app.integrations.outbound import SendError, is_retryable_status
 
 # Load .env before reading environment variables
 load_dotenv()
@@ -20,6 +26,9 @@ class TwilioWhatsAppClient:
         if self.is_configured():
             self.client = Client(self.account_sid, self.auth_token)
             self.validator = RequestValidator(self.auth_token)
+            # Local simulator for load tests
+            if os.getenv("TWILIO_API_BASE_URL"):
+                self.client.api.base_url = os.getenv("TWILIO_API_BASE_URL")
         else:
             self.client = None
             self.validator = None
@@ -45,72 +54,90 @@ class TwilioWhatsAppClient:
         self,
         to_number: str,
         message: str,
+        issue_id: Optional[int] = None,
     ) -> dict:
         """
         Send a WhatsApp message via Twilio.
 
+        The message is queued in the outbox and delivered by the outbound
+        dispatcher (rate limited, retried); without a database it is sent
+        directly.
+
         Args:
             to_number: Recipient's phone number in E.164 format (e.g., +447123456789)
             message: The message text to send
+            issue_id: Issue to log the delivery outcome against
 
         Returns:
-            Dict with send status and message SID
+            Dict with queue (or send) status
         """
-        if not self.is_configured():
-            return {"error": "Twilio not configured", "sent": False}
-
-        try:
-            # Twilio WhatsApp requires 'whatsapp:' prefix
-            from_whatsapp = f"whatsapp:{self.whatsapp_number}"
-            to_whatsapp = f"whatsapp:{to_number}"
-            print(f"[TWILIO] Sending from={from_whatsapp} to={to_whatsapp}", flush=True)
-
-            msg = self.client.messages.create(
-                body=message,
-                from_=from_whatsapp,
-                to=to_whatsapp,
-            )
-
-            return {
-                "sent": True,
-                "message_sid": msg.sid,
-                "status": msg.status,
-            }
-        except Exception as e:
-            return {"sent": False, "error": str(e)}
+        return await self._send(to_number, {"body": message}, issue_id)
 
     async def send_template_message(
         self,
         to_number: str,
         template_sid: str,
         variables: Optional[dict] = None,
+        issue_id: Optional[int] = None,
     ) -> dict:
         """
         Send a template message (for messages outside 24h window).
 
         Note: Sandbox doesn't require templates, but production does.
         """
+        payload = {"template_sid": template_sid, "variables": variables or {}}
+        return await self._send(to_number, payload, issue_id)
+
+    async def _send(self, to_number: str, payload: Dict[str, Any], issue_id: Optional[int]) -> dict:
         if not self.is_configured():
             return {"error": "Twilio not configured", "sent": False}
 
+        if DATABASE_URL:
+            outbound_id = await outbound_messages.enqueue(
+                "twilio", self.whatsapp_number, to_number, payload, issue_id
+            )
+            return {"sent": False, "queued": True, "outbound_id": outbound_id}
+
         try:
-            from_whatsapp = f"whatsapp:{self.whatsapp_number}"
-            to_whatsapp = f"whatsapp:{to_number}"
+            return {"sent": True, **await self.deliver(to_number, payload)}
+        except SendError as e:
+            return {"sent": False, "error": str(e)}
+
+    async def deliver(self, to_number: str, payload: Dict[str, Any]) -> dict:
+        """
+        Make the API call for one queued message.
+
+        The Twilio SDK is synchronous, so the request runs in a worker
+        thread. Raises SendError, marked retryable for 429/5xx and network
+        failures.
+        """
+        # Twilio WhatsApp requires 'whatsapp:' prefix
+        from_whatsapp = f"whatsapp:{self.whatsapp_number}"
+        to_whatsapp = f"whatsapp:{to_number}"
+        print(f"[TWILIO] Sending from={from_whatsapp} to={to_whatsapp}", flush=True)
+
+        if "template_sid" in payload:
+            params = {
+                "content_sid": payload["template_sid"],
+                "content_variables": payload.get("variables") or {},
+            }
+        else:
+            params = {"body": payload["body"]}
 
-            msg = self.client.messages.create(
-                content_sid=template_sid,
-                content_variables=variables or {},
+        try:
+            msg = await asyncio.to_thread(
+                self.client.messages.create,
                 from_=from_whatsapp,
                 to=to_whatsapp,
+                **params,
             )
-
-            return {
-                "sent": True,
-                "message_sid": msg.sid,
-                "status": msg.status,
-            }
+        except TwilioRestException as e:
+            raise SendError(str(e), retryable=is_retryable_status(e.status), throttled=e.status == 429)
         except Exception as e:
-            return {"sent": False, "error": str(e)}
+            # Connection errors and timeouts
+            raise SendError(str(e), retryable=True)
+
+        return {"message_sid": msg.sid, "status": msg.status}
 
 
 # Singleton instance
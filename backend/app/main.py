@@ -1,4 +1,6 @@
 """FixMate Backend - FastAPI Application."""
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -7,11 +9,52 @@ from app.api.webhooks import router as webhooks_router
 from app.api.properties import router as properties_router
 from app.api.tenants import router as tenants_router
 from app.api.organizations import router as organizations_router
+from app.api.broadcasts import router as broadcasts_router
+from app.config import DATABASE_URL, NOTIFICATIONS_ENABLED
+from app.workers.agent_worker import agent_worker_pool
+from app.workers.inbox_worker import inbox_worker_pool
+from app.workers.outbound_dispatcher import outbound_dispatcher
+from app.workers.media_worker import media_worker_pool
+from app.workers.broadcast_worker import broadcast_worker
+from app.workers.notification_dispatcher import notification_dispatcher
+from app.workers.timer_scheduler import timer_scheduler
+from app.workers.counter_reconciler import counter_reconciler
+from app.db.cache import cache_bus
+from app.integrations import respondio_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers with the app and drain them on shutdown."""
+    if DATABASE_URL:
+        cache_bus.start()
+        agent_worker_pool.start()
+        inbox_worker_pool.start()
+        outbound_dispatcher.start()
+        media_worker_pool.start()
+        broadcast_worker.start()
+        timer_scheduler.start()
+        counter_reconciler.start()
+        if NOTIFICATIONS_ENABLED:
+            notification_dispatcher.start()
+    yield
+    await counter_reconciler.stop()
+    await timer_scheduler.stop()
+    await notification_dispatcher.stop()
+    await broadcast_worker.stop()
+    await inbox_worker_pool.stop()
+    await media_worker_pool.stop()
+    await agent_worker_pool.stop()
+    await outbound_dispatcher.stop()
+    await cache_bus.stop()
+    await respondio_client.aclose()
+
 
 app = FastAPI(
     title="FixMate API",
     description="AI-powered property maintenance management",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS for frontend
@@ -35,6 +78,7 @@ app.include_router(webhooks_router, prefix="/api")
 app.include_router(properties_router)  # Already has /api/properties prefix
 app.include_router(tenants_router)  # Already has /api/tenants prefix
 app.include_router(organizations_router)  # Already has /api/organizations prefix
+app.include_router(broadcasts_router)  # Already has /api/broadcasts prefix
 
 
 @app.get("/")
@@ -0,0 +1,262 @@
+"""Worker pool that drains the agent job queue.
+
+API endpoints enqueue agent invocations and return 202 straight away; these
+workers claim jobs from the agent_jobs table and run the triage agent with
+retries and dead-lettering. Some workers are reserved for the priority lane
+so urgent and emergency issues never wait behind routine ones.
+
+Jobs for inbound WhatsApp messages carry reply_via in their payload; their
+replies go back to the issue's WhatsApp conversation, and a tenant whose
+job is dead-lettered is told someone will follow up.
+
+A running job's visibility timeout is extended while it runs, so a long
+agent run is never handed to a second worker; completing or failing a job
+only counts if the claim is still this worker's.
+"""
+import asyncio
+import traceback
+from typing import Optional, Dict, Any, List
+
+from app.config import (
+    AGENT_WORKERS,
+    AGENT_PRIORITY_WORKERS,
+    AGENT_JOB_MAX_ATTEMPTS,
+    AGENT_JOB_VISIBILITY_SECONDS,
+    AGENT_JOB_POLL_SECONDS,
+)
+from app.db import activity
+from app.db.jobs import agent_jobs
+from app.agents import TriageAgent
+from app.agents.triage_agent import is_emergency
+from app.agents.issue_actor import issue_actors
+
+RETRY_BACKOFF_SECONDS = 10
+
+# Extend a running job's visibility this many times per timeout
+HEARTBEATS_PER_VISIBILITY = 3
+
+AGENT_ERROR_REPLY = (
+    "Sorry, I'm having trouble right now. Your property manager has been notified "
+    "and will get back to you soon."
+)
+
+
+def choose_lane(issue: Optional[Dict[str, Any]], text: str = "") -> str:
+    """Urgent issues and anything that mentions a safety risk go in the priority lane."""
+    if issue and issue.get("priority") == "urgent":
+        return "priority"
+    if is_emergency(text) or (issue and is_emergency(f"{issue.get('title', '')} {issue.get('description', '')}")):
+        return "priority"
+    return "standard"
+
+
+async def enqueue_new_issue(issue: Dict[str, Any], reply_via: Optional[str] = None) -> Dict[str, Any]:
+    """Queue the initial triage run for a new issue."""
+    return await agent_jobs.enqueue(
+        issue["id"],
+        "new_issue",
+        {"reply_via": reply_via} if reply_via else None,
+        lane=choose_lane(issue),
+        max_attempts=AGENT_JOB_MAX_ATTEMPTS,
+    )
+
+
+async def enqueue_tenant_response(issue: Dict[str, Any], tenant_message: str) -> Dict[str, Any]:
+    """Queue an agent turn for a tenant message that is already recorded."""
+    return await agent_jobs.enqueue(
+        issue["id"],
+        "tenant_response",
+        {"message": tenant_message},
+        lane=choose_lane(issue, tenant_message),
+        max_attempts=AGENT_JOB_MAX_ATTEMPTS,
+    )
+
+
+async def enqueue_inbound_message(
+    issue: Dict[str, Any],
+    kind: str,
+    content: str,
+    provider_message_id: Optional[str],
+    tenant_message: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Record an inbound WhatsApp message and queue the agent turn answering it.
+
+    kind is new_issue for the message that opened the issue, tenant_response
+    otherwise (tenant_message is what the agent is given; defaults to
+    content). The reply goes back over WhatsApp. Returns None for a
+    redelivered message.
+    """
+    payload = {"reply_via": "whatsapp"}
+    if kind == "tenant_response":
+        payload["message"] = tenant_message or content
+    return await agent_jobs.enqueue_with_message(
+        issue["id"],
+        kind,
+        content,
+        provider_message_id,
+        payload,
+        lane=choose_lane(issue, tenant_message or content),
+        max_attempts=AGENT_JOB_MAX_ATTEMPTS,
+    )
+
+
+async def deliver_reply(issue_id: int, result) -> None:
+    """Send an agent run's messages to the issue's WhatsApp conversation."""
+    from app.api.webhooks import send_agent_response_for_issue
+
+    await send_agent_response_for_issue(issue_id, result.outbound_messages)
+
+
+async def enqueue_follow_up(issue: Dict[str, Any]) -> Dict[str, Any]:
+    """Queue the agent's check-in for a follow-up that has come due."""
+    return await agent_jobs.enqueue(
+        issue["id"],
+        "follow_up",
+        lane=choose_lane(issue),
+        max_attempts=AGENT_JOB_MAX_ATTEMPTS,
+    )
+
+
+class AgentWorkerPool:
+    """Fixed-size pool of asyncio workers polling the agent job queue."""
+
+    def __init__(
+        self,
+        workers: int = AGENT_WORKERS,
+        priority_workers: int = AGENT_PRIORITY_WORKERS,
+    ):
+        self.workers = max(workers, 1)
+        self.priority_workers = min(priority_workers, self.workers - 1) if self.workers > 1 else 0
+        self.triage_agent = TriageAgent()
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+        self.processed = 0
+        self.failed = 0
+
+    async def run_job(self, job: Dict[str, Any]) -> None:
+        """Dispatch a claimed job to the agent."""
+        payload = job.get("payload") or {}
+        if job["kind"] == "new_issue":
+            result = await self.triage_agent.handle_new_issue(job["issue_id"])
+            if payload.get("reply_via"):
+                await deliver_reply(job["issue_id"], result)
+        elif job["kind"] == "tenant_response":
+            # The message was recorded when the job was enqueued; going through
+            # the issue actor keeps runs serialised and coalesces follow-ups
+            # (a coalesced run replies once, not once per job)
+            reply = await issue_actors.submit(
+                job["issue_id"],
+                payload.get("message", ""),
+                self.triage_agent.handle_tenant_response,
+                after_run=deliver_reply if payload.get("reply_via") else None,
+                record_message=False,
+            )
+            await reply
+        elif job["kind"] == "follow_up":
+            result = await self.triage_agent.handle_follow_up(job["issue_id"])
+            await deliver_reply(job["issue_id"], result)
+        else:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+
+    async def _heartbeat(self, job: Dict[str, Any]):
+        """Keep extending a running job's visibility timeout until cancelled."""
+        interval = max(AGENT_JOB_VISIBILITY_SECONDS / HEARTBEATS_PER_VISIBILITY, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await agent_jobs.heartbeat(job["id"], job["attempts"], AGENT_JOB_VISIBILITY_SECONDS):
+                    print(f"[AGENT WORKER] Lost claim on job {job['id']} (attempt {job['attempts']})", flush=True)
+                    return
+            except Exception as e:
+                print(f"[AGENT WORKER] Heartbeat failed for job {job['id']}: {e}", flush=True)
+
+    async def _worker(self, lanes: List[str]):
+        """Claim and run jobs until the pool is stopped."""
+        while not self._stopping.is_set():
+            try:
+                job = await agent_jobs.claim(lanes, AGENT_JOB_VISIBILITY_SECONDS)
+            except Exception as e:
+                print(f"[AGENT WORKER] Claim failed: {e}", flush=True)
+                job = None
+
+            if not job:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=AGENT_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            try:
+                await self.run_job(job)
+                heartbeat.cancel()
+                if not await agent_jobs.complete(job["id"], job["attempts"]):
+                    print(f"[AGENT WORKER] Job {job['id']} finished after its claim was lost", flush=True)
+                self.processed += 1
+            except Exception as e:
+                heartbeat.cancel()
+                self.failed += 1
+                traceback.print_exc()
+                failed = await agent_jobs.fail(job["id"], job["attempts"], str(e), RETRY_BACKOFF_SECONDS)
+                if failed and failed["status"] == "dead":
+                    await activity.log_activity(
+                        job["issue_id"],
+                        "agent_error",
+                        {"error": str(e), "job_id": job["id"], "attempts": failed["attempts"], "dead_lettered": True}
+                    )
+                    if (job.get("payload") or {}).get("reply_via"):
+                        await self._apologise(job["issue_id"])
+
+    async def _apologise(self, issue_id: int):
+        """Tell a WhatsApp tenant their message won't get an agent reply."""
+        from app.api.webhooks import send_agent_response_for_issue
+
+        try:
+            await send_agent_response_for_issue(issue_id, [AGENT_ERROR_REPLY])
+        except Exception as e:
+            print(f"[AGENT WORKER] Could not tell issue {issue_id}'s tenant about the failure: {e}", flush=True)
+
+    async def _sweeper(self):
+        """Requeue jobs abandoned by crashed workers."""
+        while not self._stopping.is_set():
+            try:
+                released = await agent_jobs.release_expired()
+                if released:
+                    print(f"[AGENT WORKER] Requeued {released} expired jobs", flush=True)
+            except Exception as e:
+                print(f"[AGENT WORKER] Sweep failed: {e}", flush=True)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=AGENT_JOB_VISIBILITY_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the workers on the running event loop."""
+        self._stopping.clear()
+        for i in range(self.workers):
+            lanes = ["priority"] if i < self.priority_workers else ["priority", "standard"]
+            self._tasks.append(asyncio.create_task(self._worker(lanes)))
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        """Let in-flight jobs finish, then stop."""
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth and age per lane plus this process's pool counters."""
+        metrics = await agent_jobs.get_metrics()
+        metrics["pool"] = {
+            "workers": self.workers,
+            "priority_workers": self.priority_workers,
+            "running": bool(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+        return metrics
+
+
+# Singleton instance
+agent_worker_pool = AgentWorkerPool()
@@ -0,0 +1,111 @@
+"""Broadcast fan-out worker.
+
+A broadcast's recipients are resolved when it is created. This worker
+releases them into the outbound outbox a batch at a time: at most
+BROADCAST_RATE_PER_SECOND recipients per second, and never more than
+BROADCAST_MAX_IN_FLIGHT unsent messages per broadcast. The outbound
+dispatcher then delivers them like any other message, so interactive
+replies to the same sender wait behind a short queue instead of the
+whole announcement. All state is in the database; a restarted worker
+resumes where the last one stopped.
+"""
+import asyncio
+import time
+import traceback
+from typing import Dict, Any, Optional
+
+from app.config import (
+    BROADCAST_RATE_PER_SECOND,
+    BROADCAST_MAX_IN_FLIGHT,
+    BROADCAST_POLL_SECONDS,
+    BROADCAST_MAX_ATTEMPTS,
+)
+from app.db.broadcasts import broadcasts
+from app.db.outbox import outbound_messages
+from app.integrations import respondio_client, twilio_client
+
+
+def sender_for(provider: str) -> str:
+    """The rate-limit key the outbound dispatcher uses for this provider."""
+    if provider == "respondio":
+        return respondio_client.workspace_id
+    return twilio_client.whatsapp_number
+
+
+class BroadcastWorker:
+    """Single task releasing broadcast recipients into the outbox."""
+
+    def __init__(
+        self,
+        rate_per_second: float = BROADCAST_RATE_PER_SECOND,
+        max_in_flight: int = BROADCAST_MAX_IN_FLIGHT,
+    ):
+        self.rate_per_second = rate_per_second
+        self.max_in_flight = max(max_in_flight, 1)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._allowance = 0.0
+        self.released = 0
+        self.completed = 0
+
+    async def tick(self, elapsed: float):
+        """Release this tick's share of recipients across running broadcasts."""
+        # Unused allowance carries over, capped at one second's worth
+        self._allowance = min(self._allowance + elapsed * self.rate_per_second, max(self.rate_per_second, 1))
+        running = await broadcasts.get_running()
+
+        for index, broadcast in enumerate(running):
+            share = int(self._allowance / (len(running) - index))
+            room = self.max_in_flight - await broadcasts.in_flight(broadcast["id"])
+            limit = min(share, room)
+            if limit > 0:
+                released = await broadcasts.release(
+                    broadcast["id"], sender_for(broadcast["provider"]), limit, BROADCAST_MAX_ATTEMPTS
+                )
+                if released:
+                    self._allowance -= released
+                    self.released += released
+                    outbound_messages.enqueued.set()
+            if await broadcasts.complete_if_done(broadcast["id"]):
+                self.completed += 1
+                print(f"[BROADCAST] Broadcast {broadcast['id']} completed", flush=True)
+
+    async def _run(self):
+        last = time.monotonic()
+        while not self._stopping.is_set():
+            now = time.monotonic()
+            try:
+                await self.tick(now - last)
+            except Exception as e:
+                print(f"[BROADCAST] Tick failed: {e}", flush=True)
+                traceback.print_exc()
+            last = now
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=BROADCAST_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the worker on the running event loop."""
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Finish the current tick, then stop."""
+        self._stopping.set()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "released": self.released,
+            "completed": self.completed,
+            "rate_per_second": self.rate_per_second,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+# Singleton instance
+broadcast_worker = BroadcastWorker()
@@ -0,0 +1,97 @@
+"""Property counter reconciler.
+
+property_counters holds each property's active tenant and issue counts for
+the properties list, maintained by triggers on tenants and issues. This
+worker periodically recounts every property in id-ordered batches and
+corrects any drift (rows written with triggers disabled, restores, manual
+fixes). An advisory lock keeps it to one instance per round.
+"""
+import asyncio
+import time
+import traceback
+from typing import Dict, Any, Optional
+
+from app.config import (
+    COUNTER_RECONCILE_INTERVAL_SECONDS,
+    COUNTER_RECONCILE_BATCH_SIZE,
+)
+from app.db.database import get_db
+from app.db.properties import properties
+
+# First key of the two-int advisory lock (see issue_actor.ISSUE_LOCK_NAMESPACE)
+RECONCILE_LOCK_NAMESPACE = 72002
+
+
+class CounterReconciler:
+    """Single task recounting property counters on an interval."""
+
+    def __init__(self, batch_size: int = COUNTER_RECONCILE_BATCH_SIZE):
+        self.batch_size = max(batch_size, 1)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self.rounds = 0
+        self.properties_checked = 0
+        self.drift_corrected = 0
+        self.last_round_seconds: Optional[float] = None
+
+    async def reconcile(self) -> Optional[int]:
+        """Recount every property; returns counters corrected, or None if another instance holds the lock."""
+        async with get_db() as lock_conn:
+            if not await lock_conn.fetchval("SELECT pg_try_advisory_lock($1, 0)", RECONCILE_LOCK_NAMESPACE):
+                return None
+            try:
+                started = time.monotonic()
+                corrected = 0
+                after_id = 0
+                while not self._stopping.is_set():
+                    last_id, checked, drifted = await properties.reconcile_counters(after_id, self.batch_size)
+                    if last_id is None:
+                        break
+                    self.properties_checked += checked
+                    corrected += drifted
+                    after_id = last_id
+                self.rounds += 1
+                self.drift_corrected += corrected
+                self.last_round_seconds = round(time.monotonic() - started, 2)
+                if corrected:
+                    print(f"[COUNTERS] Corrected {corrected} drifted property counters", flush=True)
+                return corrected
+            finally:
+                await lock_conn.execute("SELECT pg_advisory_unlock($1, 0)", RECONCILE_LOCK_NAMESPACE)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await self.reconcile()
+            except Exception as e:
+                print(f"[COUNTERS] Reconcile failed: {e}", flush=True)
+                traceback.print_exc()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=COUNTER_RECONCILE_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the reconciler on the running event loop."""
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop after the current batch."""
+        self._stopping.set()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "rounds": self.rounds,
+            "properties_checked": self.properties_checked,
+            "drift_corrected": self.drift_corrected,
+            "last_round_seconds": self.last_round_seconds,
+        }
+
+
+# Singleton instance
+counter_reconciler = CounterReconciler()
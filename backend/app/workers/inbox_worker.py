@@ -0,0 +1,123 @@
+"""Drain workers for the webhook inbox.
+
+Webhook handlers only store the raw event and ack. These workers claim
+events with SKIP LOCKED and run the same processing the handlers used to
+schedule on BackgroundTasks. Delivery is at-least-once: an event is only
+marked done after processing returns, a worker that dies mid-event leaves
+it to be reclaimed after the visibility timeout, and failures are retried
+with backoff before being parked for replay. Re-processing is safe because
+inbound messages are recorded idempotently by provider message id.
+
+An event is done once its message is recorded: the agent turn answering it
+is queued in agent_jobs by the same statement, and retried there, so a
+crash before the agent replies doesn't lose the turn. One sender's events
+are claimed one at a time, in order (see WebhookInbox.claim).
+"""
+import asyncio
+import traceback
+from typing import Dict, Any, List
+
+from app.config import (
+    INBOX_WORKERS,
+    INBOX_VISIBILITY_SECONDS,
+    INBOX_POLL_SECONDS,
+)
+from app.db.inbox import webhook_inbox
+
+RETRY_BACKOFF_SECONDS = 15
+
+
+async def process_event(event: Dict[str, Any]) -> None:
+    """Dispatch a stored event to its provider's message handler."""
+    from app.api.webhooks import (
+        IncomingMessage,
+        process_twilio_message,
+        process_whatsapp_message,
+    )
+
+    payload = event["payload"]
+    if event["provider"] == "twilio":
+        await process_twilio_message(
+            payload["from"], payload["body"], payload["message_sid"], payload.get("to"), payload.get("media")
+        )
+    elif event["provider"] == "respondio":
+        await process_whatsapp_message(IncomingMessage(**payload))
+    else:
+        raise ValueError(f"Unknown inbox provider: {event['provider']}")
+
+
+async def notify_failure(event: Dict[str, Any]) -> None:
+    """Let the sender know once an event has been given up on."""
+    if event["provider"] == "twilio":
+        from app.api.webhooks import notify_twilio_failure
+        await notify_twilio_failure(event["payload"]["from"])
+
+
+class InboxWorkerPool:
+    """Fixed-size pool of asyncio workers draining the webhook inbox."""
+
+    def __init__(self, workers: int = INBOX_WORKERS):
+        self.workers = max(workers, 1)
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+        self.processed = 0
+        self.failed = 0
+
+    async def _worker(self):
+        """Claim and process events until the pool is stopped."""
+        while not self._stopping.is_set():
+            try:
+                event = await webhook_inbox.claim(INBOX_VISIBILITY_SECONDS)
+            except Exception as e:
+                print(f"[INBOX] Claim failed: {e}", flush=True)
+                event = None
+
+            if not event:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=INBOX_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await process_event(event)
+                await webhook_inbox.complete(event["id"])
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"[INBOX] Event {event['id']} ({event['provider']}) failed: {e}", flush=True)
+                traceback.print_exc()
+                try:
+                    outcome = await webhook_inbox.fail(event["id"], str(e), RETRY_BACKOFF_SECONDS)
+                    if outcome and outcome["status"] == "failed":
+                        await notify_failure(event)
+                except Exception as fail_error:
+                    # Left in 'processing' - reclaimed after the visibility timeout
+                    print(f"[INBOX] Could not record failure: {fail_error}", flush=True)
+
+    def start(self):
+        """Start the workers on the running event loop."""
+        self._stopping.clear()
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        """Let in-flight events finish, then stop."""
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Inbox backlog plus this process's worker counters."""
+        metrics = await webhook_inbox.get_metrics()
+        metrics["pool"] = {
+            "workers": self.workers,
+            "running": bool(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+        return metrics
+
+
+# Singleton instance
+inbox_worker_pool = InboxWorkerPool()
@@ -0,0 +1,232 @@
+"""Media workers for WhatsApp attachments.
+
+Inbound handlers only record an attachment's provider URL. These workers
+claim queued attachments with SKIP LOCKED, stream each download to a temp
+file in fixed-size chunks (size capped, hashed on the way), reuse an
+already-stored blob with the same hash, and otherwise store the file plus
+a thumbnail for images. Thumbnails are made in a small process pool, so
+image decoding never blocks the event loop or inflates the web process.
+Throttled and failed downloads are retried with backoff; oversized or
+missing files are rejected.
+"""
+import asyncio
+import importlib.util
+import multiprocessing
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from app.config import (
+    MEDIA_WORKERS,
+    MEDIA_THUMBNAIL_WORKERS,
+    MEDIA_THUMBNAIL_SIZE,
+    MEDIA_MAX_BYTES,
+    MEDIA_VISIBILITY_SECONDS,
+    MEDIA_POLL_SECONDS,
+)
+from app.db import activity
+from app.db.media import issue_media
+from app.integrations import twilio_client
+from app.integrations.media_storage import (
+    MediaTooLarge,
+    blob_key,
+    thumbnail_key,
+    make_thumbnail,
+    stream_to_file,
+    discard,
+    media_storage,
+)
+from app.integrations.outbound import backoff_seconds, is_retryable_status, parse_retry_after
+
+BACKOFF_SECONDS = 10
+MAX_BACKOFF_SECONDS = 600
+
+
+class MediaWorkerPool:
+    """Fixed-size pool of asyncio workers downloading queued attachments."""
+
+    def __init__(self, workers: int = MEDIA_WORKERS, thumbnail_workers: int = MEDIA_THUMBNAIL_WORKERS):
+        self.workers = max(workers, 1)
+        self.thumbnail_workers = thumbnail_workers
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+        self._http: Optional[httpx.AsyncClient] = None
+        self._thumbnailer: Optional[ProcessPoolExecutor] = None
+        self.stored = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.retried = 0
+        self.failed = 0
+        self.bytes_downloaded = 0
+
+    def _auth(self, media: Dict[str, Any]):
+        """Twilio media URLs need the account credentials; Respond.io links are signed."""
+        if media["provider"] == "twilio" and twilio_client.is_configured():
+            return (twilio_client.account_sid, twilio_client.auth_token)
+        return None
+
+    async def _thumbnail(self, source_path: str) -> Optional[str]:
+        """Make a thumbnail in the process pool; returns its temp path."""
+        if self._thumbnailer is None:
+            return None
+        dest_path = media_storage.temp_path()
+        made = await asyncio.get_running_loop().run_in_executor(
+            self._thumbnailer, make_thumbnail, source_path, dest_path, MEDIA_THUMBNAIL_SIZE
+        )
+        if not made:
+            discard(dest_path)
+            return None
+        return dest_path
+
+    async def ingest(self, media: Dict[str, Any]):
+        """Download, dedupe and store one claimed attachment."""
+        path = media_storage.temp_path()
+        thumb_path = None
+        try:
+            try:
+                async with self._http.stream("GET", media["source_url"], auth=self._auth(media)) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get("Content-Type", "").split(";")[0] or None
+                    sha256, size = await stream_to_file(response, path, MEDIA_MAX_BYTES)
+            except MediaTooLarge as e:
+                self.rejected += 1
+                await issue_media.reject(media["id"], str(e), e.size_bytes)
+                await activity.log_activity(
+                    media["issue_id"],
+                    "media_rejected",
+                    {"media_id": media["id"], "reason": str(e)}
+                )
+                return
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if not is_retryable_status(status):
+                    self.rejected += 1
+                    await issue_media.reject(media["id"], f"Download failed with HTTP {status}")
+                    return
+                await self._retry(media, str(e), parse_retry_after(e.response.headers.get("Retry-After")))
+                return
+            except httpx.HTTPError as e:
+                await self._retry(media, str(e) or type(e).__name__)
+                return
+
+            self.bytes_downloaded += size
+            content_type = content_type or media.get("content_type")
+
+            existing = await issue_media.find_stored(sha256)
+            if existing:
+                self.deduplicated += 1
+                await issue_media.mark_stored(
+                    media["id"], sha256, size, existing["storage_key"], existing["thumbnail_key"], content_type
+                )
+                return
+
+            thumb_key = None
+            if (content_type or "").startswith("image/"):
+                thumb_path = await self._thumbnail(path)
+                if thumb_path:
+                    await media_storage.put(thumb_path, thumbnail_key(sha256), "image/jpeg")
+                    thumb_key = thumbnail_key(sha256)
+            await media_storage.put(path, blob_key(sha256), content_type)
+
+            await issue_media.mark_stored(media["id"], sha256, size, blob_key(sha256), thumb_key, content_type)
+            self.stored += 1
+            await activity.log_activity(
+                media["issue_id"],
+                "media_stored",
+                {"media_id": media["id"], "content_type": content_type, "size_bytes": size}
+            )
+        finally:
+            discard(path)
+            discard(thumb_path)
+
+    async def _retry(self, media: Dict[str, Any], error: str, retry_after: float = None):
+        retry_in = backoff_seconds(media["attempts"], BACKOFF_SECONDS, MAX_BACKOFF_SECONDS, retry_after)
+        outcome = await issue_media.fail(media["id"], error, retry_in)
+        if outcome and outcome["status"] == "failed":
+            self.failed += 1
+            print(f"[MEDIA] Attachment {media['id']} failed permanently: {error}", flush=True)
+        else:
+            self.retried += 1
+            print(f"[MEDIA] Attachment {media['id']} download retrying: {error}", flush=True)
+
+    async def _wait_for_work(self):
+        """Sleep until an attachment is queued here, the poll interval passes, or we stop."""
+        issue_media.enqueued.clear()
+        enqueued = asyncio.create_task(issue_media.enqueued.wait())
+        stopping = asyncio.create_task(self._stopping.wait())
+        await asyncio.wait({enqueued, stopping}, timeout=MEDIA_POLL_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+        enqueued.cancel()
+        stopping.cancel()
+
+    async def _worker(self):
+        """Claim and ingest attachments until the pool is stopped."""
+        while not self._stopping.is_set():
+            try:
+                media = await issue_media.claim(MEDIA_VISIBILITY_SECONDS)
+            except Exception as e:
+                print(f"[MEDIA] Claim failed: {e}", flush=True)
+                media = None
+
+            if not media:
+                await self._wait_for_work()
+                continue
+
+            try:
+                await self.ingest(media)
+            except Exception as e:
+                # The attachment is reclaimed after the visibility timeout
+                print(f"[MEDIA] Error handling attachment {media['id']}: {e}", flush=True)
+                traceback.print_exc()
+
+    def start(self):
+        """Start the workers (and thumbnail processes, if Pillow is installed)."""
+        self._stopping.clear()
+        self._http = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+        if self.thumbnail_workers > 0 and importlib.util.find_spec("PIL"):
+            # spawn, not fork: never copy the event loop and its sockets
+            self._thumbnailer = ProcessPoolExecutor(
+                max_workers=self.thumbnail_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            print("[MEDIA] Pillow not installed; thumbnails disabled", flush=True)
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        """Let in-flight downloads finish, then stop."""
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._thumbnailer is not None:
+            self._thumbnailer.shutdown(wait=True)
+            self._thumbnailer = None
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Media backlog plus this process's worker counters."""
+        metrics = await issue_media.get_metrics()
+        metrics["workers"] = {
+            "workers": self.workers,
+            "running": bool(self._tasks),
+            "thumbnails": self._thumbnailer is not None,
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "retried": self.retried,
+            "failed": self.failed,
+            "bytes_downloaded": self.bytes_downloaded,
+            "max_bytes": MEDIA_MAX_BYTES,
+        }
+        return metrics
+
+
+# Singleton instance
+media_worker_pool = MediaWorkerPool()
@@ -0,0 +1,179 @@
+"""Notification digest dispatcher.
+
+Activity logged with would_notify targets is queued per recipient in the
+notifications outbox. This dispatcher claims recipients whose oldest
+notification is due, takes everything pending for them, and sends it as
+one digest per recipient, so a chatty issue produces one email instead of
+twenty. Urgent escalations are due immediately and wake the dispatcher.
+Digests are sent in batches per channel; failures are retried with
+backoff and parked for replay once out of attempts.
+"""
+import asyncio
+import traceback
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config import (
+    NOTIFICATION_BATCH_SIZE,
+    NOTIFICATION_VISIBILITY_SECONDS,
+    NOTIFICATION_POLL_SECONDS,
+    OUTBOUND_BACKOFF_SECONDS,
+)
+from app.db.notifications import notification_outbox
+from app.integrations.notify_channels import Digest, NOTIFICATION_CHANNELS
+from app.integrations.outbound import SendError, backoff_seconds
+from app.workers.outbound_dispatcher import MAX_BACKOFF_SECONDS
+
+
+def describe(notification: Dict[str, Any]) -> str:
+    """One line for a notification in a digest."""
+    details = notification["summary"].get("details") or {}
+    action = notification["action"]
+    if action == "escalated":
+        return f"Escalated ({details.get('priority', 'unknown')} priority): {details.get('reason', '')}"
+    if action == "resolved_by_agent":
+        return f"Resolved by FixMate: {details.get('solution', '')}"
+    if action in ("tradesperson_assigned", "issue_assigned"):
+        return f"Assigned to {details.get('assigned_to', 'a tradesperson')}"
+    if action == "status_updated":
+        return f"Status changed to {str(details.get('new_status', '')).replace('_', ' ')}"
+    if action == "issue_closed":
+        return "Issue closed"
+    if action == "sla_breached":
+        return f"SLA breached: escalated {details.get('sla_hours', '?')}h ago ({details.get('priority', 'unknown')} priority) and still unassigned"
+    if action == "follow_up_due":
+        return f"Follow-up due (status: {str(details.get('status', '')).replace('_', ' ')})"
+    if action == "sent_message":
+        return f"FixMate replied: {details.get('message_preview', '')}"
+    return action.replace("_", " ").capitalize()
+
+
+def format_digest(notifications: List[Dict[str, Any]]) -> Digest:
+    """Group a recipient's notifications by issue into one message."""
+    by_issue: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for notification in sorted(notifications, key=lambda n: n["id"]):
+        by_issue[notification["issue_id"]].append(notification)
+
+    urgent = any(n["urgent"] for n in notifications)
+    if len(notifications) == 1:
+        only = notifications[0]
+        subject = f"{describe(only)[:80]} - {only['summary'].get('issue_title') or 'Issue #' + str(only['issue_id'])}"
+    else:
+        subject = f"{len(notifications)} updates on {len(by_issue)} issue{'s' if len(by_issue) > 1 else ''}"
+    subject = f"{'URGENT: ' if urgent else ''}FixMate: {subject}"
+
+    sections = []
+    for issue_id, items in by_issue.items():
+        title = items[0]["summary"].get("issue_title") or ""
+        lines = [f"Issue #{issue_id}: {title}".rstrip(": ")]
+        for item in items:
+            lines.append(f"  - {item['created_at']:%d %b %H:%M} {describe(item)}")
+        sections.append("\n".join(lines))
+    return Digest(notifications[0]["address"], subject, "\n\n".join(sections))
+
+
+class NotificationDispatcher:
+    """Single task sending notification digests."""
+
+    def __init__(self, batch_size: int = NOTIFICATION_BATCH_SIZE):
+        self.batch_size = max(batch_size, 1)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self.digests_sent = 0
+        self.notifications_sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def send_round(self) -> int:
+        """Claim a batch of due recipients and send their digests; returns digests attempted."""
+        await notification_outbox.requeue_stale()
+        claimed = await notification_outbox.claim_digests(self.batch_size, NOTIFICATION_VISIBILITY_SECONDS)
+        if not claimed:
+            return 0
+
+        recipients: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        for notification in claimed:
+            recipients[(notification["channel"], notification["address"])].append(notification)
+
+        by_channel: Dict[str, List[List[Dict[str, Any]]]] = defaultdict(list)
+        for (channel, _), notifications in recipients.items():
+            by_channel[channel].append(notifications)
+
+        for channel_name, groups in by_channel.items():
+            channel = NOTIFICATION_CHANNELS.get(channel_name)
+            if channel is None:
+                outcomes = [SendError(f"Unknown channel: {channel_name}", retryable=False)] * len(groups)
+            else:
+                try:
+                    outcomes = await channel.send_batch([format_digest(group) for group in groups])
+                except Exception as e:
+                    outcomes = [SendError(str(e), retryable=True)] * len(groups)
+
+            for group, error in zip(groups, outcomes):
+                ids = [n["id"] for n in group]
+                if error is None:
+                    await notification_outbox.mark_sent(ids)
+                    self.digests_sent += 1
+                    self.notifications_sent += len(ids)
+                    continue
+                attempts = max(n["attempts"] for n in group)
+                retry_in = (
+                    backoff_seconds(attempts, OUTBOUND_BACKOFF_SECONDS, MAX_BACKOFF_SECONDS, error.retry_after)
+                    if error.retryable else None
+                )
+                if await notification_outbox.fail(ids, str(error), retry_in):
+                    self.failed += 1
+                    print(f"[NOTIFY] Digest to {group[0]['address']} via {channel_name} failed: {error}", flush=True)
+                else:
+                    self.retried += 1
+        return len(recipients)
+
+    async def _wait_for_work(self):
+        """Sleep until an urgent notification is queued here, the poll interval passes, or we stop."""
+        notification_outbox.urgent_enqueued.clear()
+        urgent = asyncio.create_task(notification_outbox.urgent_enqueued.wait())
+        stopping = asyncio.create_task(self._stopping.wait())
+        await asyncio.wait({urgent, stopping}, timeout=NOTIFICATION_POLL_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+        urgent.cancel()
+        stopping.cancel()
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                sent = await self.send_round()
+            except Exception as e:
+                print(f"[NOTIFY] Send round failed: {e}", flush=True)
+                traceback.print_exc()
+                sent = 0
+            # A full batch means more may be due; go again straight away
+            if sent < self.batch_size:
+                await self._wait_for_work()
+
+    def start(self):
+        """Start the dispatcher on the running event loop."""
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Finish the current round, then stop."""
+        self._stopping.set()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Notification backlog plus this process's dispatcher counters."""
+        metrics = await notification_outbox.get_metrics()
+        metrics["dispatcher"] = {
+            "running": self._task is not None and not self._task.done(),
+            "digests_sent": self.digests_sent,
+            "notifications_sent": self.notifications_sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "channels": sorted(NOTIFICATION_CHANNELS),
+        }
+        return metrics
+
+
+# Singleton instance
+notification_dispatcher = NotificationDispatcher()
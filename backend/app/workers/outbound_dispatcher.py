@@ -0,0 +1,165 @@
+"""Outbound WhatsApp dispatcher.
+
+Messages are queued in the outbound_messages outbox by the Twilio and
+Respond.io clients. Dispatcher workers claim them (one in flight per
+recipient, so conversations stay in order), wait on a token bucket per
+sender number, and deliver through the provider client. Throttling (429),
+provider errors (5xx) and network failures are retried with exponential
+backoff and jitter, honouring Retry-After; a 429 also pauses that sender.
+Permanent errors and exhausted retries park the message as failed for
+replay. Outcomes are logged to the issue's activity feed.
+"""
+import asyncio
+import traceback
+from typing import Dict, Any, List
+
+from app.config import (
+    OUTBOUND_WORKERS,
+    OUTBOUND_RATE_PER_SECOND,
+    OUTBOUND_BURST,
+    OUTBOUND_VISIBILITY_SECONDS,
+    OUTBOUND_POLL_SECONDS,
+    OUTBOUND_BACKOFF_SECONDS,
+)
+from app.db import activity
+from app.db.outbox import outbound_messages
+from app.integrations import respondio_client, twilio_client
+from app.integrations.outbound import SendError, TokenBucket, backoff_seconds
+
+MAX_BACKOFF_SECONDS = 300
+
+PROVIDERS = {
+    "twilio": twilio_client,
+    "respondio": respondio_client,
+}
+
+
+class OutboundDispatcher:
+    """Fixed-size pool of asyncio workers draining the outbox."""
+
+    def __init__(self, workers: int = OUTBOUND_WORKERS):
+        self.workers = max(workers, 1)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def _bucket(self, provider: str, sender: str) -> TokenBucket:
+        key = f"{provider}:{sender}"
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(OUTBOUND_RATE_PER_SECOND, OUTBOUND_BURST)
+        return self._buckets[key]
+
+    async def _wait_for_work(self):
+        """Sleep until a message is enqueued here, the poll interval passes, or we stop."""
+        outbound_messages.enqueued.clear()
+        enqueued = asyncio.create_task(outbound_messages.enqueued.wait())
+        stopping = asyncio.create_task(self._stopping.wait())
+        await asyncio.wait({enqueued, stopping}, timeout=OUTBOUND_POLL_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+        enqueued.cancel()
+        stopping.cancel()
+
+    async def deliver(self, message: Dict[str, Any]):
+        """Send one claimed message and record the outcome."""
+        client = PROVIDERS.get(message["provider"])
+        bucket = self._bucket(message["provider"], message["sender"])
+
+        try:
+            if client is None:
+                raise SendError(f"Unknown provider: {message['provider']}", retryable=False)
+            await bucket.acquire()
+            result = await client.deliver(message["recipient"], message["payload"])
+        except SendError as e:
+            retry_in = (
+                backoff_seconds(message["attempts"], OUTBOUND_BACKOFF_SECONDS, MAX_BACKOFF_SECONDS, e.retry_after)
+                if e.retryable else None
+            )
+            if e.throttled:
+                # Hold the sender for the backoff even without a Retry-After hint
+                bucket.pause(retry_in)
+            outcome = await outbound_messages.fail(message["id"], str(e), retry_in)
+            if outcome and outcome["status"] == "failed":
+                self.failed += 1
+                print(f"[OUTBOUND] Message {message['id']} failed permanently: {e}", flush=True)
+                if message.get("issue_id"):
+                    await activity.log_activity(
+                        message["issue_id"],
+                        "whatsapp_send_failed",
+                        {
+                            "recipient": message["recipient"],
+                            "provider": message["provider"],
+                            "attempts": message["attempts"],
+                            "error": str(e),
+                        }
+                    )
+            else:
+                self.retried += 1
+                print(f"[OUTBOUND] Message {message['id']} retrying in {retry_in:.1f}s: {e}", flush=True)
+            return
+
+        provider_message_id = result.get("message_sid") or result.get("message_id")
+        await outbound_messages.mark_sent(message["id"], provider_message_id)
+        self.sent += 1
+        if message.get("issue_id"):
+            await activity.log_activity(
+                message["issue_id"],
+                "whatsapp_message_sent",
+                {
+                    "recipient": message["recipient"],
+                    "provider": message["provider"],
+                    "message_sid": provider_message_id,
+                    "message_preview": (message["payload"].get("body") or "")[:100],
+                }
+            )
+
+    async def _worker(self):
+        """Claim and deliver messages until the dispatcher is stopped."""
+        while not self._stopping.is_set():
+            try:
+                message = await outbound_messages.claim(OUTBOUND_VISIBILITY_SECONDS)
+            except Exception as e:
+                print(f"[OUTBOUND] Claim failed: {e}", flush=True)
+                message = None
+
+            if not message:
+                await self._wait_for_work()
+                continue
+
+            try:
+                await self.deliver(message)
+            except Exception as e:
+                # Bookkeeping failed; the message is reclaimed after the visibility timeout
+                print(f"[OUTBOUND] Error handling message {message['id']}: {e}", flush=True)
+                traceback.print_exc()
+
+    def start(self):
+        """Start the workers on the running event loop."""
+        self._stopping.clear()
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        """Let in-flight sends finish, then stop."""
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Outbox backlog plus this process's dispatcher counters."""
+        metrics = await outbound_messages.get_metrics()
+        metrics["dispatcher"] = {
+            "workers": self.workers,
+            "running": bool(self._tasks),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "rate_per_second": OUTBOUND_RATE_PER_SECOND,
+            "senders": len(self._buckets),
+        }
+        return metrics
+
+
+# Singleton instance
+outbound_dispatcher = OutboundDispatcher()
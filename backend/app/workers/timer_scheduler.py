@@ -0,0 +1,156 @@
+"""Follow-up and SLA timer scheduler.
+
+Timers live in issue_timers with a partial index on due_at, so finding due
+work is an index range scan however many issues there are. Each round
+claims due timers with SKIP LOCKED and flips them to firing in the same
+statement, so any number of instances can run the scheduler without firing
+a timer twice. Between rounds it sleeps until the next timer is due.
+
+A due follow-up queues an agent check-in with the tenant, or tells the
+property manager when the agent can't act (muted, or the issue is with a
+person). A breached SLA notifies the property manager and landlord.
+"""
+import asyncio
+import traceback
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+from app.config import (
+    TIMER_BATCH_SIZE,
+    TIMER_VISIBILITY_SECONDS,
+    TIMER_POLL_SECONDS,
+)
+from app.db import activity, issues
+from app.db.issues import RESOLVED_ISSUE_STATUSES
+from app.db.timers import issue_timers, sla_hours
+from app.workers.agent_worker import enqueue_follow_up
+
+RETRY_BACKOFF_SECONDS = 30
+
+# Someone is already handling these; a follow-up goes to them, not the tenant
+HANDLED_ISSUE_STATUSES = ("escalated", "assigned", "in_progress")
+
+
+class TimerScheduler:
+    """Single task firing due follow-ups and SLA breaches."""
+
+    def __init__(self, batch_size: int = TIMER_BATCH_SIZE):
+        self.batch_size = max(batch_size, 1)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self.fired = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    async def fire(self, timer: Dict[str, Any]) -> str:
+        """Act on one claimed timer; returns the status to record for it."""
+        issue = await issues.get_issue(timer["issue_id"])
+        if not issue:
+            return "cancelled"
+
+        if timer["kind"] == "sla":
+            if issue["status"] != "escalated":
+                return "cancelled"
+            await activity.log_activity(
+                issue["id"],
+                "sla_breached",
+                {
+                    "priority": issue.get("priority"),
+                    "sla_hours": sla_hours(issue.get("priority")),
+                    "escalated_at": timer["started_at"].isoformat(),
+                },
+                would_notify="property_manager,landlord"
+            )
+            return "fired"
+
+        if issue["status"] in RESOLVED_ISSUE_STATUSES:
+            return "cancelled"
+        if issue["status"] in HANDLED_ISSUE_STATUSES or await issues.is_agent_muted(issue["id"]):
+            await activity.log_activity(
+                issue["id"],
+                "follow_up_due",
+                {"follow_up_date": timer["due_at"].isoformat(), "status": issue["status"]},
+                would_notify="property_manager"
+            )
+            return "fired"
+
+        job = await enqueue_follow_up(issue)
+        await activity.log_activity(
+            issue["id"],
+            "follow_up_triggered",
+            {"follow_up_date": timer["due_at"].isoformat(), "job_id": job["id"]}
+        )
+        return "fired"
+
+    async def run_round(self) -> int:
+        """Claim a batch of due timers and fire them; returns how many were claimed."""
+        await issue_timers.requeue_stale()
+        claimed = await issue_timers.claim_due(self.batch_size, TIMER_VISIBILITY_SECONDS)
+        for timer in claimed:
+            try:
+                status = await self.fire(timer)
+                await issue_timers.finish(timer["id"], status)
+                if status == "fired":
+                    self.fired += 1
+                else:
+                    self.cancelled += 1
+            except Exception as e:
+                self.failed += 1
+                traceback.print_exc()
+                failed = await issue_timers.fail(timer["id"], str(e), RETRY_BACKOFF_SECONDS * timer["attempts"])
+                if failed and failed["status"] == "failed":
+                    print(f"[TIMERS] {timer['kind']} timer {timer['id']} for issue {timer['issue_id']} gave up: {e}", flush=True)
+        return len(claimed)
+
+    async def _wait_for_work(self):
+        """Sleep until the next timer is due (at most the poll interval), or we stop."""
+        timeout = TIMER_POLL_SECONDS
+        try:
+            next_due = await issue_timers.next_due_at()
+            if next_due:
+                timeout = min(timeout, max((next_due - datetime.now(timezone.utc)).total_seconds(), 0.1))
+        except Exception as e:
+            print(f"[TIMERS] Next due lookup failed: {e}", flush=True)
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                claimed = await self.run_round()
+            except Exception as e:
+                print(f"[TIMERS] Round failed: {e}", flush=True)
+                traceback.print_exc()
+                claimed = 0
+            # A full batch means more may be due; go again straight away
+            if claimed < self.batch_size:
+                await self._wait_for_work()
+
+    def start(self):
+        """Start the scheduler on the running event loop."""
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Finish the current round, then stop."""
+        self._stopping.set()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Pending and overdue timers plus this process's scheduler counters."""
+        metrics = await issue_timers.get_metrics()
+        metrics["scheduler"] = {
+            "running": self._task is not None and not self._task.done(),
+            "fired": self.fired,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+        }
+        return metrics
+
+
+# Singleton instance
+timer_scheduler = TimerScheduler()
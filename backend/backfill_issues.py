@@ -0,0 +1,50 @@
+"""Backfill issue categories and summaries through the Message Batches API.
+
+Usage:
+    python backfill_issues.py                   # uncategorized issues, live batches API
+    python backfill_issues.py --summaries       # also fill missing ai_summary
+    python backfill_issues.py --stub --limit 50 # dry run with the local batch stub
+
+Safe to interrupt and rerun: unfinished batches are resumed, not resubmitted.
+The stub keeps its batches in --stub-state so stub runs resume the same way.
+Run migrations/005_issue_backfill.sql first.
+"""
+import argparse
+import asyncio
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import anthropic
+from app.agents.batch_backfill import BatchBackfill, BackfillFilter, LocalBatchStub
+
+DEFAULT_STUB_STATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".backfill_stub_batches.json")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stub", action="store_true", help="Use the local batch stub instead of the API")
+    parser.add_argument("--stub-state", default=DEFAULT_STUB_STATE, help="Where the stub keeps submitted batches")
+    parser.add_argument("--summaries", action="store_true", help="Also select issues missing ai_summary")
+    parser.add_argument("--org-id", type=int, help="Only issues for this org")
+    parser.add_argument("--created-after", help="Only issues created on/after this date (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Requests per provider batch")
+    parser.add_argument("--poll-seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    client = LocalBatchStub(args.stub_state) if args.stub else anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    backfill = BatchBackfill(client, chunk_size=args.chunk_size, poll_seconds=args.poll_seconds)
+    totals = await backfill.run(BackfillFilter(
+        missing_category=True,
+        missing_summary=args.summaries,
+        org_id=args.org_id,
+        created_after=args.created_after,
+        limit=args.limit,
+    ))
+    print(f"\nBackfill complete: {totals}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
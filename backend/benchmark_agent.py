@@ -0,0 +1,169 @@
+"""End-to-end benchmark for the triage agent using recorded model responses.
+
+Fixtures for every scenario ship in benchmarks/fixtures, so it runs offline
+out of the box, optionally injecting API latency:
+    python benchmark_agent.py --latency-ms 800
+
+The shipped responses are scripted, and their prompts assume tenant 1 is
+"Alex Morgan" at property 1 "Maple Court, 14 Maple Court, Leeds"; against
+other seed data the follow-up turns fall back to recorded order (--strict
+fails on them instead). Re-record against the live API (needs
+ANTHROPIC_API_KEY) after changing prompts or tools:
+    python benchmark_agent.py --record
+
+Each run creates real issues in DATABASE_URL (use a dev database) for the
+four /api/demo/simulate-issue scenarios plus multi-turn follow-ups, and
+reports wall time, DB round-trips and tool calls per model turn.
+"""
+import argparse
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.db import database, issues, messages
+from app.agents import TriageAgent
+from app.agents.demo_scenarios import DEMO_SCENARIOS
+from app.agents.llm_replay import RecordingClient, ReplayClient
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "benchmarks", "fixtures")
+
+# Tenant follow-ups replayed after the first agent turn
+FOLLOW_UPS = {
+    "washing_machine": [
+        "I checked and the plug was switched off at the wall. It's on now but still nothing.",
+        "Oh, the fuse in the plug had gone. Swapped it and it works now, thanks!",
+    ],
+    "emergency": [],
+    "heating": [
+        "I pressed reset and held it for 10 seconds but it's still showing E119.",
+        "The pressure gauge says 0.5 bar.",
+    ],
+    "plumbing": [
+        "I tried boiling water and it didn't help much.",
+    ],
+}
+
+
+class RoundTripCounter:
+    """Counts DB round-trips by wrapping database.get_connection."""
+
+    def __init__(self):
+        self.count = 0
+        self._original = database.get_connection
+
+    async def _counting_connection(self):
+        self.count += 1
+        return await self._original()
+
+    def install(self):
+        database.get_connection = self._counting_connection
+
+    def uninstall(self):
+        database.get_connection = self._original
+
+
+def instrument_agent(agent: TriageAgent):
+    """Track tool calls per model turn on an agent instance."""
+    turns = []
+    create = agent.client.messages.create
+    execute_tool = agent._execute_tool
+
+    def counting_create(**request):
+        turns.append([])
+        return create(**request)
+
+    async def counting_execute_tool(issue_id, tool_name, tool_input, outbound):
+        if turns:
+            turns[-1].append(tool_name)
+        return await execute_tool(issue_id, tool_name, tool_input, outbound)
+
+    agent.client.messages.create = counting_create
+    agent._execute_tool = counting_execute_tool
+    return turns
+
+
+async def run_scenario(name: str, agent: TriageAgent, counter: RoundTripCounter) -> dict:
+    """Create the demo issue, run the first turn and every scripted follow-up."""
+    scenario = DEMO_SCENARIOS[name]
+    turns = instrument_agent(agent)
+    counter.count = 0
+    started = time.perf_counter()
+
+    issue = await issues.create_issue(
+        tenant_id=1,
+        property_id=1,
+        title=scenario["title"],
+        description=scenario["description"],
+        category=scenario["category"],
+    )
+    await messages.add_message(
+        issue["id"],
+        "tenant",
+        f"Issue reported: {scenario['title']}\n\n{scenario['description']}"
+    )
+    await agent.handle_new_issue(issue["id"])
+
+    for follow_up in FOLLOW_UPS.get(name, []):
+        current = await issues.get_issue(issue["id"])
+        if current and current["status"] in ("escalated", "resolved_by_agent", "closed"):
+            break
+        await agent.handle_tenant_response(issue["id"], follow_up)
+
+    return {
+        "scenario": name,
+        "issue_id": issue["id"],
+        "wall_ms": int((time.perf_counter() - started) * 1000),
+        "db_round_trips": counter.count,
+        "model_turns": len(turns),
+        "tool_calls_per_turn": [len(t) for t in turns],
+        "tools": turns,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", action="store_true", help="Call the live API and save fixtures")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Injected latency per replayed model call")
+    parser.add_argument("--strict", action="store_true", help="Fail on requests that don't match a recording")
+    parser.add_argument("--scenario", action="append", choices=list(DEMO_SCENARIOS), help="Limit to a scenario")
+    args = parser.parse_args()
+
+    counter = RoundTripCounter()
+    counter.install()
+    results = []
+    try:
+        for name in args.scenario or list(DEMO_SCENARIOS):
+            fixture = os.path.join(FIXTURE_DIR, f"{name}.json")
+            if args.record:
+                client = RecordingClient(TriageAgent().client, fixture)
+            elif not os.path.exists(fixture):
+                print(f"[SKIP] {name}: no fixture at {fixture} (run with --record first)")
+                continue
+            else:
+                client = ReplayClient(fixture, latency_ms=args.latency_ms, strict=args.strict)
+
+            result = await run_scenario(name, TriageAgent(client=client), counter)
+            if args.record:
+                client.save()
+            else:
+                result["replay_misses"] = client.misses
+            results.append(result)
+    finally:
+        counter.uninstall()
+
+    print(f"\n{'scenario':<16} {'wall ms':>8} {'db trips':>9} {'turns':>6}  tool calls per turn")
+    for r in results:
+        print(f"{r['scenario']:<16} {r['wall_ms']:>8} {r['db_round_trips']:>9} {r['model_turns']:>6}  {r['tool_calls_per_turn']}")
+        for i, tools in enumerate(r["tools"]):
+            print(f"{'':<16}   turn {i}: {', '.join(tools) or '(none)'}")
+    if results:
+        total_ms = sum(r["wall_ms"] for r in results)
+        total_trips = sum(r["db_round_trips"] for r in results)
+        print(f"\nTotal: {total_ms} ms, {total_trips} DB round-trips across {len(results)} scenarios")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""Benchmark batched Respond.io contact updates against a local simulator.
+
+Simulates a post-import sync: every contact gets its tenant and issue ids
+as custom fields plus a couple of tags, submitted as separate updates the
+way callers produce them. Compares one-call-at-a-time updates with
+RespondIOClient.update_contacts:
+    python benchmark_respondio.py --contacts 300 --latency-ms 80
+    python benchmark_respondio.py --rate-limit 50 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# The simulator stands in for the real API; these must be set before the client is built
+os.environ.setdefault("RESPONDIO_API_KEY", "benchmark")
+os.environ.setdefault("RESPONDIO_WORKSPACE_ID", "benchmark")
+
+import uvicorn
+
+from app.integrations.respondio import RespondIOClient, ContactUpdate
+from app.integrations.simulator import SimulatorSettings, create_respondio_app
+
+
+def build_updates(contacts: int):
+    """Four single-purpose updates per contact, as a naive sync would emit them."""
+    updates = []
+    for i in range(contacts):
+        contact_id = f"contact-{i}"
+        updates.append(ContactUpdate(contact_id, fields={"tenant_id": str(1000 + i)}))
+        updates.append(ContactUpdate(contact_id, fields={"issue_id": str(5000 + i)}))
+        updates.append(ContactUpdate(contact_id, tags=["fixmate"]))
+        updates.append(ContactUpdate(contact_id, tags=["imported", "fixmate"]))
+    return updates
+
+
+async def run_sequential(client: RespondIOClient, updates) -> int:
+    """The old path: one call per tag and per field, one after another."""
+    failures = 0
+    for update in updates:
+        for name, value in update.fields.items():
+            failures += not await client.update_contact_custom_field(update.contact_id, name, value)
+        for tag in update.tags:
+            failures += not await client.add_contact_tag(update.contact_id, tag)
+    return failures
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--rate-limit", type=float, default=0, help="Simulator requests/second before 429s (0 = off)")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of simulator requests failing with 503")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    settings = SimulatorSettings(args.latency_ms, args.rate_limit, args.error_rate)
+    server = uvicorn.Server(uvicorn.Config(
+        create_respondio_app(settings), host="127.0.0.1", port=args.port, log_level="warning"
+    ))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    os.environ["RESPONDIO_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    client = RespondIOClient()
+    updates = build_updates(args.contacts)
+    print(f"{len(updates)} updates for {args.contacts} contacts, "
+          f"simulated latency {args.latency_ms:.0f}ms\n")
+
+    try:
+        if not args.skip_sequential:
+            before = settings.get_stats()["total_requests"]
+            start = time.perf_counter()
+            failures = await run_sequential(client, updates)
+            elapsed = time.perf_counter() - start
+            requests = settings.get_stats()["total_requests"] - before
+            print(f"sequential: {elapsed:7.2f}s  {requests:5d} requests  {failures} failed calls")
+
+        before = settings.get_stats()["total_requests"]
+        start = time.perf_counter()
+        outcomes = await client.update_contacts(updates, concurrency=args.concurrency)
+        elapsed = time.perf_counter() - start
+        requests = settings.get_stats()["total_requests"] - before
+        failed = [o for o in outcomes.values() if not o["ok"]]
+        print(f"batched:    {elapsed:7.2f}s  {requests:5d} requests  "
+              f"{len(outcomes) - len(failed)}/{len(outcomes)} contacts ok")
+        for outcome in failed[:5]:
+            print(f"  {outcome['contact_id']}: {outcome['error']}")
+        print(f"\nsimulator: {settings.get_stats()}")
+    finally:
+        await client.aclose()
+        server.should_exit = True
+        await server_task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,258 @@
+"""Webhook load generator for a running FixMate instance.
+
+Starts local Twilio and Respond.io simulators, then fires correctly signed
+inbound webhooks at the target at a fixed rate and reports webhook ack
+latency percentiles, end-to-end reply latency (webhook sent -> first
+outbound send to that sender arriving at the simulator) and error rates.
+
+Start the app under test against the simulators first, e.g.:
+    TWILIO_ACCOUNT_SID=ACloadtest TWILIO_AUTH_TOKEN=loadtest \\
+    TWILIO_WHATSAPP_NUMBER=+14155238886 TWILIO_API_BASE_URL=http://127.0.0.1:8771 \\
+    RESPONDIO_API_KEY=loadtest RESPONDIO_WORKSPACE_ID=loadtest \\
+    RESPONDIO_WEBHOOK_SECRET=loadtest RESPONDIO_BASE_URL=http://127.0.0.1:8772 \\
+    uvicorn app.main:app --port 8000
+
+then:
+    python loadtest_webhooks.py --rate 20 --duration 60
+
+Senders are drawn from --known-phones (registered tenants; use a dev
+database) and random unknown numbers. Conversations mix new issues,
+quick follow-ups and provider retries of an already-delivered message.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+import httpx
+import uvicorn
+
+from app.integrations.simulator import SimulatorSettings, create_respondio_app, create_twilio_app
+
+TWILIO_TIMEOUT_SECONDS = 15
+
+OPENERS = [
+    "My boiler isn't working, no hot water",
+    "The kitchen tap is dripping constantly",
+    "Washing machine won't turn on",
+    "There's a damp patch on the bedroom ceiling",
+    "The front door lock is really stiff",
+]
+FOLLOW_UPS = [
+    "It's been like this since yesterday",
+    "I tried turning it off and on again",
+    "The display shows an error code",
+    "Photos to follow",
+]
+
+
+def twilio_signature(auth_token: str, url: str, params: Dict[str, str]) -> str:
+    """X-Twilio-Signature: base64 HMAC-SHA1 of the URL plus sorted params."""
+    data = url + "".join(f"{key}{params[key]}" for key in sorted(params))
+    digest = hmac.new(auth_token.encode(), data.encode(), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode()
+
+
+def respondio_signature(secret: str, body: bytes) -> str:
+    """X-Respond-Signature: hex HMAC-SHA256 of the raw body."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+    return (f"p50={pct(0.5):.0f}ms p95={pct(0.95):.0f}ms p99={pct(0.99):.0f}ms "
+            f"max={ordered[-1]:.0f}ms mean={statistics.mean(ordered):.0f}ms")
+
+
+class LoadGenerator:
+    """Drives a conversation mix and collects latency samples."""
+
+    def __init__(self, args, settings: SimulatorSettings):
+        self.args = args
+        self.settings = settings
+        self.http = httpx.AsyncClient(timeout=TWILIO_TIMEOUT_SECONDS)
+        self.ack_ms: List[float] = []
+        self.reply_ms: List[float] = []
+        self.outcomes: Counter = Counter()
+        self.sent_ids: List[Dict[str, Any]] = []
+        self.pending_replies: List[asyncio.Task] = []
+
+    def pick_sender(self) -> str:
+        if self.args.known_phones and random.random() >= self.args.unknown_share:
+            return random.choice(self.args.known_phones)
+        return "+4479" + "".join(random.choice("0123456789") for _ in range(8))
+
+    async def post_twilio(self, phone: str, text: str, message_sid: str) -> Optional[int]:
+        url = f"{self.args.target}/api/webhooks/twilio"
+        params = {
+            "From": f"whatsapp:{phone}",
+            "To": f"whatsapp:{self.args.twilio_number}",
+            "Body": text,
+            "MessageSid": message_sid,
+            "AccountSid": self.args.twilio_account_sid,
+            "NumMedia": "0",
+        }
+        headers = {"X-Twilio-Signature": twilio_signature(self.args.twilio_auth_token, url, params)}
+        response = await self.http.post(url, data=params, headers=headers)
+        return response.status_code
+
+    async def post_respondio(self, contact_id: str, phone: str, text: str, message_id: str) -> Optional[int]:
+        url = f"{self.args.target}/api/webhooks/respondio"
+        body = json.dumps({
+            "event": "message:received",
+            "timestamp": str(int(time.time())),
+            "data": {
+                "contact": {"id": contact_id, "name": "Load Test", "phone": phone},
+                "message": {"id": message_id, "type": "text", "text": text},
+                "channel": {"type": "whatsapp"},
+            },
+        }).encode()
+        headers = {
+            "Content-Type": "application/json",
+            "X-Respond-Signature": respondio_signature(self.args.respondio_secret, body),
+        }
+        response = await self.http.post(url, content=body, headers=headers)
+        return response.status_code
+
+    async def deliver(self, provider: str, sender: str, text: str, message_id: str, expect_reply: bool):
+        """Send one webhook, time the ack and optionally wait for the reply."""
+        reply = self.settings.wait_for_send(sender) if expect_reply else None
+        start = time.perf_counter()
+        try:
+            if provider == "twilio":
+                status = await self.post_twilio(sender, text, message_id)
+            else:
+                status = await self.post_respondio(sender, sender, text, message_id)
+        except httpx.TimeoutException:
+            self.outcomes["ack_timeout"] += 1
+            return
+        except httpx.HTTPError:
+            self.outcomes["ack_error"] += 1
+            return
+        self.ack_ms.append((time.perf_counter() - start) * 1000)
+        self.outcomes["ack_ok" if 200 <= status < 300 else f"ack_{status}"] += 1
+
+        if reply is not None:
+            self.pending_replies.append(asyncio.create_task(self.await_reply(reply, start)))
+
+    async def await_reply(self, reply: asyncio.Future, start: float):
+        try:
+            sent_at = await asyncio.wait_for(reply, timeout=self.args.reply_timeout)
+            self.reply_ms.append((sent_at - start) * 1000)
+            self.outcomes["reply_received"] += 1
+        except asyncio.TimeoutError:
+            self.outcomes["reply_timeout"] += 1
+
+    async def one_event(self):
+        """Pick the next event from the conversation mix."""
+        provider = "twilio" if random.random() < self.args.twilio_share else "respondio"
+        roll = random.random()
+        if self.sent_ids and roll < self.args.retry_share:
+            # Provider redelivers a message we already acked
+            previous = random.choice(self.sent_ids)
+            self.outcomes["redelivery"] += 1
+            await self.deliver(previous["provider"], previous["sender"], previous["text"], previous["id"], False)
+            return
+        if self.sent_ids and roll < self.args.retry_share + self.args.follow_up_share:
+            previous = random.choice(self.sent_ids[-50:])
+            provider, sender, text = previous["provider"], previous["sender"], random.choice(FOLLOW_UPS)
+        else:
+            sender, text = self.pick_sender(), random.choice(OPENERS)
+        message_id = ("SM" + uuid.uuid4().hex) if provider == "twilio" else uuid.uuid4().hex
+        self.sent_ids.append({"provider": provider, "sender": sender, "text": text, "id": message_id})
+        await self.deliver(provider, sender, text, message_id, True)
+
+    async def run(self):
+        interval = 1.0 / self.args.rate
+        deadline = time.perf_counter() + self.args.duration
+        in_flight: List[asyncio.Task] = []
+        next_at = time.perf_counter()
+        while next_at < deadline:
+            in_flight.append(asyncio.create_task(self.one_event()))
+            next_at += interval
+            await asyncio.sleep(max(0, next_at - time.perf_counter()))
+        await asyncio.gather(*in_flight)
+        print(f"Load phase done; waiting up to {self.args.reply_timeout:.0f}s for replies...", flush=True)
+        await asyncio.gather(*self.pending_replies)
+        await self.http.aclose()
+
+    def report(self):
+        sent = sum(v for k, v in self.outcomes.items() if k.startswith("ack"))
+        failed = sent - self.outcomes["ack_ok"]
+        expected_replies = self.outcomes["reply_received"] + self.outcomes["reply_timeout"]
+        print("\n=== Webhook load test ===")
+        print(f"target: {self.args.target}  rate: {self.args.rate}/s  duration: {self.args.duration}s")
+        print(f"webhooks sent: {sent}  (redeliveries: {self.outcomes['redelivery']})")
+        print(f"ack latency:   {percentiles(self.ack_ms)}")
+        print(f"ack errors:    {failed} ({failed / sent:.1%})" if sent else "ack errors:    n/a")
+        slow = sum(1 for ms in self.ack_ms if ms > 1000 * TWILIO_TIMEOUT_SECONDS)
+        print(f"acks over Twilio's {TWILIO_TIMEOUT_SECONDS}s timeout: {slow + self.outcomes['ack_timeout']}")
+        print(f"reply latency: {percentiles(self.reply_ms)}")
+        if expected_replies:
+            print(f"replies:       {self.outcomes['reply_received']}/{expected_replies} "
+                  f"({self.outcomes['reply_timeout']} timed out)")
+        print(f"outcomes:      {dict(self.outcomes)}")
+        print(f"simulator:     {self.settings.get_stats()}")
+
+
+async def serve(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    parser.add_argument("--rate", type=float, default=10, help="Inbound webhooks per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--twilio-share", type=float, default=0.7, help="Fraction of traffic via Twilio")
+    parser.add_argument("--follow-up-share", type=float, default=0.3)
+    parser.add_argument("--retry-share", type=float, default=0.05, help="Provider redeliveries")
+    parser.add_argument("--unknown-share", type=float, default=0.1, help="Senders not registered as tenants")
+    parser.add_argument("--known-phones", nargs="*", default=[], help="Tenant phone numbers in the target DB")
+    parser.add_argument("--reply-timeout", type=float, default=60)
+    parser.add_argument("--provider-latency-ms", type=float, default=150)
+    parser.add_argument("--provider-error-rate", type=float, default=0)
+    parser.add_argument("--provider-rate-limit", type=float, default=0)
+    parser.add_argument("--twilio-port", type=int, default=8771)
+    parser.add_argument("--respondio-port", type=int, default=8772)
+    parser.add_argument("--twilio-account-sid", default="ACloadtest")
+    parser.add_argument("--twilio-auth-token", default="loadtest")
+    parser.add_argument("--twilio-number", default="+14155238886")
+    parser.add_argument("--respondio-secret", default="loadtest")
+    args = parser.parse_args()
+
+    settings = SimulatorSettings(args.provider_latency_ms, args.provider_rate_limit, args.provider_error_rate)
+    servers = [
+        await serve(create_twilio_app(settings), args.twilio_port),
+        await serve(create_respondio_app(settings), args.respondio_port),
+    ]
+    generator = LoadGenerator(args, settings)
+    try:
+        await generator.run()
+    finally:
+        for server in servers:
+            server.should_exit = True
+        await asyncio.sleep(0.2)
+    generator.report()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
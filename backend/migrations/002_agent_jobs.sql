@@ -0,0 +1,28 @@
+-- Durable queue for agent invocations
+-- API endpoints enqueue and return 202; the worker pool claims jobs with
+-- FOR UPDATE SKIP LOCKED so several instances can drain the same table
+
+CREATE TABLE IF NOT EXISTS agent_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    issue_id INTEGER REFERENCES issues(id) ON DELETE CASCADE,
+    kind VARCHAR(50) NOT NULL,              -- new_issue, tenant_response
+    payload JSONB,
+    lane VARCHAR(20) NOT NULL DEFAULT 'standard',  -- priority, standard
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',  -- queued, running, done, dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+-- Claim path: oldest runnable job per lane
+CREATE INDEX IF NOT EXISTS idx_agent_jobs_queued
+ON agent_jobs(lane, run_after) WHERE status = 'queued';
+
+-- Visibility timeout sweep
+CREATE INDEX IF NOT EXISTS idx_agent_jobs_running
+ON agent_jobs(locked_until) WHERE status = 'running';
@@ -0,0 +1,25 @@
+-- Per-call token and latency accounting for the triage agent
+-- One compact row per messages.create call; org_id is denormalised so
+-- per-org and per-day rollups don't need to join through issues
+
+CREATE TABLE IF NOT EXISTS agent_usage (
+    id BIGSERIAL PRIMARY KEY,
+    issue_id INTEGER REFERENCES issues(id) ON DELETE CASCADE,
+    org_id INTEGER,
+    model VARCHAR(100) NOT NULL,
+    turn_index SMALLINT NOT NULL,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_creation_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+    latency_ms INTEGER NOT NULL,
+    stop_reason VARCHAR(30),
+    cost_usd NUMERIC(12, 6) NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_agent_usage_issue_id ON agent_usage(issue_id);
+CREATE INDEX IF NOT EXISTS idx_agent_usage_org_created ON agent_usage(org_id, created_at);
+
+-- Optional monthly LLM budget per org (NULL = unlimited)
+ALTER TABLE organizations ADD COLUMN IF NOT EXISTS monthly_llm_budget_usd NUMERIC(10, 2);
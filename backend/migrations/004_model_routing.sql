@@ -0,0 +1,8 @@
+-- Tiered model routing
+-- Per-org routing policy, e.g.
+--   {"mode": "tiered", "small_model": "claude-3-5-haiku-20241022", "max_failed_attempts": 2}
+ALTER TABLE organizations ADD COLUMN IF NOT EXISTS agent_model_policy JSONB;
+
+-- Routing decision recorded next to each call's latency and cost
+ALTER TABLE agent_usage ADD COLUMN IF NOT EXISTS tier VARCHAR(10);
+ALTER TABLE agent_usage ADD COLUMN IF NOT EXISTS route_reason VARCHAR(50);
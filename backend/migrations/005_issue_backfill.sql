@@ -0,0 +1,24 @@
+-- Offline category/summary backfill via the Message Batches API
+
+-- Short AI-written summary for the dashboard and reports
+ALTER TABLE issues ADD COLUMN IF NOT EXISTS ai_summary TEXT;
+
+-- One row per submitted provider batch, so an interrupted run can resume
+-- polling instead of resubmitting (and paying for) the same issues
+CREATE TABLE IF NOT EXISTS issue_backfill_batches (
+    id SERIAL PRIMARY KEY,
+    provider_batch_id VARCHAR(255) UNIQUE NOT NULL,
+    issue_ids INTEGER[] NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'submitted',  -- submitted, applied, failed
+    succeeded INTEGER DEFAULT 0,
+    errored INTEGER DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    completed_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_issue_backfill_batches_status
+ON issue_backfill_batches(status) WHERE status = 'submitted';
+
+-- Selection path for the default filter
+CREATE INDEX IF NOT EXISTS idx_issues_uncategorized
+ON issues(id) WHERE category IS NULL;
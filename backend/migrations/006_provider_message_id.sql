@@ -0,0 +1,8 @@
+-- Idempotent inbound messages
+-- Twilio (MessageSid) and Respond.io (message.id) retry webhooks on slow
+-- acks; the unique index turns a redelivery into a no-op insert
+
+ALTER TABLE issue_messages ADD COLUMN IF NOT EXISTS provider_message_id VARCHAR(255);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_issue_messages_provider_message_id
+ON issue_messages(provider_message_id) WHERE provider_message_id IS NOT NULL;
@@ -0,0 +1,29 @@
+-- Durable inbox for inbound webhook events
+-- Webhook handlers store the raw event with one INSERT and ack; drain
+-- workers process it with at-least-once semantics
+
+CREATE TABLE IF NOT EXISTS webhook_inbox (
+    id BIGSERIAL PRIMARY KEY,
+    provider VARCHAR(20) NOT NULL,              -- twilio, respondio
+    provider_message_id VARCHAR(255),
+    payload JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',  -- pending, processing, done, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    received_at TIMESTAMPTZ DEFAULT NOW(),
+    processed_at TIMESTAMPTZ
+);
+
+-- Provider retries of an already-stored event are ignored at insert
+CREATE UNIQUE INDEX IF NOT EXISTS idx_webhook_inbox_provider_message
+ON webhook_inbox(provider, provider_message_id) WHERE provider_message_id IS NOT NULL;
+
+-- Drain path: pending events, and processing events whose visibility timeout lapsed
+CREATE INDEX IF NOT EXISTS idx_webhook_inbox_pending
+ON webhook_inbox(available_at) WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_webhook_inbox_processing
+ON webhook_inbox(locked_until) WHERE status = 'processing';
@@ -0,0 +1,30 @@
+-- Contact-to-active-issue routing table
+-- One row per contact that currently has an active conversation, so inbound
+-- routing is a single key lookup instead of a join against issues.
+-- Rows are deleted when routing ends (conversation closed or issue reaches
+-- a terminal status), so the primary key alone keeps one route per contact.
+
+CREATE TABLE IF NOT EXISTS whatsapp_routes (
+    contact_id VARCHAR(255) PRIMARY KEY,
+    conversation_id INTEGER NOT NULL REFERENCES whatsapp_conversations(id) ON DELETE CASCADE,
+    issue_id INTEGER NOT NULL REFERENCES issues(id) ON DELETE CASCADE,
+    tenant_id INTEGER REFERENCES tenants(id),
+    phone VARCHAR(50),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Routes are cleared by issue when its status changes
+CREATE INDEX IF NOT EXISTS idx_whatsapp_routes_issue_id
+ON whatsapp_routes(issue_id);
+
+-- Backfill from the current join: latest active conversation per contact
+-- whose issue is still open
+INSERT INTO whatsapp_routes (contact_id, conversation_id, issue_id, tenant_id, phone)
+SELECT DISTINCT ON (wc.contact_id)
+    wc.contact_id, wc.id, wc.issue_id, wc.tenant_id, wc.phone
+FROM whatsapp_conversations wc
+JOIN issues i ON i.id = wc.issue_id
+WHERE wc.status = 'active'
+AND i.status NOT IN ('closed', 'resolved_by_agent', 'escalated', 'resolved')
+ORDER BY wc.contact_id, wc.created_at DESC
+ON CONFLICT (contact_id) DO NOTHING;
@@ -0,0 +1,8 @@
+-- WhatsApp number per organization
+-- Lets an inbound Twilio message (its To number) be scoped to one org, so
+-- registration only matches that org's properties
+
+ALTER TABLE organizations ADD COLUMN IF NOT EXISTS whatsapp_number VARCHAR(50);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_organizations_whatsapp_number
+ON organizations(whatsapp_number) WHERE whatsapp_number IS NOT NULL;
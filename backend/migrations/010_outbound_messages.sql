@@ -0,0 +1,32 @@
+-- Persistent outbox for WhatsApp sends
+-- Callers enqueue; the outbound dispatcher delivers with per-sender rate
+-- limiting and retries, so sends survive restarts and provider throttling
+
+CREATE TABLE IF NOT EXISTS outbound_messages (
+    id BIGSERIAL PRIMARY KEY,
+    provider VARCHAR(20) NOT NULL,              -- twilio, respondio
+    sender VARCHAR(255) NOT NULL,               -- our number / workspace; rate-limit key
+    recipient VARCHAR(255) NOT NULL,            -- phone or Respond.io contact id
+    payload JSONB NOT NULL,                     -- {"body": ...} or {"template_sid": ..., "variables": ...}
+    issue_id INTEGER REFERENCES issues(id) ON DELETE SET NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',  -- pending, sending, sent, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 6,
+    available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    provider_message_id VARCHAR(255),
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    sent_at TIMESTAMPTZ
+);
+
+-- Claim path
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_pending
+ON outbound_messages(available_at) WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_sending
+ON outbound_messages(locked_until) WHERE status = 'sending';
+
+-- Per-recipient ordering check (an earlier unsent message blocks later ones)
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_recipient_open
+ON outbound_messages(provider, recipient, id) WHERE status IN ('pending', 'sending');
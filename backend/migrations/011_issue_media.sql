@@ -0,0 +1,44 @@
+-- WhatsApp attachments linked to issue messages
+-- Inbound handlers record the provider URL; media workers stream the file
+-- to storage, dedupe by content hash and attach a thumbnail for images
+
+CREATE TABLE IF NOT EXISTS issue_media (
+    id BIGSERIAL PRIMARY KEY,
+    issue_id INTEGER NOT NULL REFERENCES issues(id) ON DELETE CASCADE,
+    message_id INTEGER REFERENCES issue_messages(id) ON DELETE SET NULL,
+    provider VARCHAR(20) NOT NULL,              -- twilio, respondio
+    provider_message_id VARCHAR(255),
+    source_url TEXT NOT NULL,
+    content_type VARCHAR(255),
+    file_name VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',  -- pending, downloading, stored, rejected, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    size_bytes BIGINT,
+    sha256 CHAR(64),                            -- content hash; the storage key
+    storage_key TEXT,
+    thumbnail_key TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    stored_at TIMESTAMPTZ
+);
+
+-- Redelivered webhooks don't queue the same attachment twice
+CREATE UNIQUE INDEX IF NOT EXISTS idx_issue_media_source
+ON issue_media(provider, provider_message_id, source_url) WHERE provider_message_id IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_issue_media_issue
+ON issue_media(issue_id, id);
+
+-- Claim path
+CREATE INDEX IF NOT EXISTS idx_issue_media_pending
+ON issue_media(available_at) WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_issue_media_downloading
+ON issue_media(locked_until) WHERE status = 'downloading';
+
+-- Dedupe: an already-stored blob with the same hash is reused
+CREATE INDEX IF NOT EXISTS idx_issue_media_sha256
+ON issue_media(sha256) WHERE status = 'stored';
@@ -0,0 +1,44 @@
+-- Bulk announcements to tenants (water shutoffs, inspections, ...)
+-- Recipients are resolved once when the broadcast is created; the
+-- broadcast worker releases them into outbound_messages a batch at a time
+-- so interactive replies are never stuck behind a large fan-out
+
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id BIGSERIAL PRIMARY KEY,
+    org_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    property_id INTEGER REFERENCES properties(id) ON DELETE SET NULL,  -- NULL = whole org
+    provider VARCHAR(20) NOT NULL,              -- twilio, respondio
+    payload JSONB NOT NULL,                     -- {"body": ...} or {"template_sid": ..., "variables": ...}
+    status VARCHAR(20) NOT NULL DEFAULT 'running',  -- running, paused, completed, cancelled
+    created_by VARCHAR(255),
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    completed_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_broadcasts_org
+ON broadcasts(org_id, id);
+
+CREATE INDEX IF NOT EXISTS idx_broadcasts_running
+ON broadcasts(id) WHERE status = 'running';
+
+CREATE TABLE IF NOT EXISTS broadcast_recipients (
+    id BIGSERIAL PRIMARY KEY,
+    broadcast_id BIGINT NOT NULL REFERENCES broadcasts(id) ON DELETE CASCADE,
+    tenant_id INTEGER REFERENCES tenants(id) ON DELETE SET NULL,
+    phone VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',  -- pending, queued, cancelled (delivery status lives on the outbox row)
+    outbound_id BIGINT REFERENCES outbound_messages(id) ON DELETE SET NULL,
+    queued_at TIMESTAMPTZ,
+    UNIQUE (broadcast_id, phone)
+);
+
+-- Release path: the next pending recipients of a broadcast
+CREATE INDEX IF NOT EXISTS idx_broadcast_recipients_pending
+ON broadcast_recipients(broadcast_id, id) WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_broadcast_recipients_queued
+ON broadcast_recipients(broadcast_id, outbound_id) WHERE status = 'queued';
+
+-- Recipient resolution: active tenants with a phone, per org
+CREATE INDEX IF NOT EXISTS idx_tenants_org_phone
+ON tenants(org_id, property_id) WHERE phone IS NOT NULL;
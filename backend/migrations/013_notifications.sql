@@ -0,0 +1,47 @@
+-- Notification outbox for would_notify activity
+-- Activity with would_notify targets fans out to one row per recipient.
+-- The notification dispatcher sends everything pending for a recipient as
+-- one digest once the oldest row is due; urgent rows are due at once
+
+-- Who "property_manager" and "landlord" are, per org and channel
+CREATE TABLE IF NOT EXISTS notification_contacts (
+    id SERIAL PRIMARY KEY,
+    org_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    role VARCHAR(50) NOT NULL,                  -- property_manager, landlord
+    channel VARCHAR(20) NOT NULL,               -- email, whatsapp
+    address VARCHAR(255) NOT NULL,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (org_id, role, channel, address)
+);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id BIGSERIAL PRIMARY KEY,
+    activity_id INTEGER REFERENCES agent_activity(id) ON DELETE SET NULL,
+    issue_id INTEGER REFERENCES issues(id) ON DELETE CASCADE,
+    role VARCHAR(50) NOT NULL,
+    channel VARCHAR(20) NOT NULL,
+    address VARCHAR(255) NOT NULL,
+    action VARCHAR(100) NOT NULL,
+    summary JSONB NOT NULL,                     -- issue title and activity details, for the digest
+    urgent BOOLEAN NOT NULL DEFAULT FALSE,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',  -- pending, sending, sent, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- end of the digest window (NOW() if urgent)
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    sent_at TIMESTAMPTZ
+);
+
+-- Claim path: the recipient with the oldest due notification
+CREATE INDEX IF NOT EXISTS idx_notifications_pending
+ON notifications(available_at) WHERE status = 'pending';
+
+-- Digest gather: everything pending for that recipient
+CREATE INDEX IF NOT EXISTS idx_notifications_recipient
+ON notifications(channel, address) WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_notifications_sending
+ON notifications(locked_until) WHERE status = 'sending';
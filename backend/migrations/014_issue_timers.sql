@@ -0,0 +1,47 @@
+-- Follow-up and SLA timers
+-- One pending row per (issue, kind). The scheduler claims due rows from the
+-- due_at index with FOR UPDATE SKIP LOCKED, so several instances can run it
+-- without double-firing and without scanning issues
+
+CREATE TABLE IF NOT EXISTS issue_timers (
+    id BIGSERIAL PRIMARY KEY,
+    issue_id INTEGER NOT NULL REFERENCES issues(id) ON DELETE CASCADE,
+    kind VARCHAR(20) NOT NULL,                  -- follow_up, sla
+    due_at TIMESTAMPTZ NOT NULL,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- when the clock started (escalation time for sla)
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',  -- pending, firing, fired, cancelled, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    fired_at TIMESTAMPTZ
+);
+
+-- Claim path: the earliest due pending timers
+CREATE INDEX IF NOT EXISTS idx_issue_timers_due
+ON issue_timers(due_at) WHERE status = 'pending';
+
+-- Rescheduling replaces the pending timer of a kind rather than adding one
+CREATE UNIQUE INDEX IF NOT EXISTS idx_issue_timers_pending_kind
+ON issue_timers(issue_id, kind) WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_issue_timers_firing
+ON issue_timers(locked_until) WHERE status = 'firing';
+
+-- Backfill: follow-ups already set on open issues, and SLA clocks for
+-- issues already escalated (default SLA_HOURS, from their last update)
+INSERT INTO issue_timers (issue_id, kind, due_at)
+SELECT id, 'follow_up', follow_up_date
+FROM issues
+WHERE follow_up_date IS NOT NULL
+AND status NOT IN ('closed', 'resolved', 'resolved_by_agent')
+ON CONFLICT DO NOTHING;
+
+INSERT INTO issue_timers (issue_id, kind, due_at, started_at)
+SELECT id, 'sla',
+       COALESCE(updated_at, created_at) + make_interval(hours => CASE priority
+           WHEN 'urgent' THEN 4 WHEN 'high' THEN 24 WHEN 'low' THEN 168 ELSE 72 END),
+       COALESCE(updated_at, created_at)
+FROM issues
+WHERE status = 'escalated'
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,117 @@
+-- Precomputed tenant and active issue counts per property
+-- Kept in step by triggers on tenants and issues (so writes from any
+-- service count), checked by the property counter reconciler. The
+-- properties list reads them with one join instead of two correlated
+-- COUNT(*) subqueries per row
+
+CREATE TABLE IF NOT EXISTS property_counters (
+    property_id INTEGER PRIMARY KEY REFERENCES properties(id) ON DELETE CASCADE,
+    tenant_count INTEGER NOT NULL DEFAULT 0,            -- active tenants
+    active_issue_count INTEGER NOT NULL DEFAULT 0,      -- issues not closed or resolved_by_agent
+    reconciled_at TIMESTAMPTZ                           -- last time the reconciler corrected drift
+);
+
+-- Properties list: org's properties by name
+CREATE INDEX IF NOT EXISTS idx_properties_org_name ON properties(org_id, name, id);
+CREATE INDEX IF NOT EXISTS idx_properties_owner_name ON properties(owner_id, name, id);
+
+-- Reconciler counts per property
+CREATE INDEX IF NOT EXISTS idx_tenants_property_id ON tenants(property_id);
+CREATE INDEX IF NOT EXISTS idx_issues_property_status ON issues(property_id, status);
+
+-- Only ever updates an existing row: a property deleted with cascading
+-- tenants/issues has already lost its counters row
+CREATE OR REPLACE FUNCTION bump_property_counters(p_property_id INTEGER, p_tenants INTEGER, p_issues INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF p_property_id IS NULL THEN
+        RETURN;
+    END IF;
+    UPDATE property_counters
+    SET tenant_count = tenant_count + p_tenants,
+        active_issue_count = active_issue_count + p_issues
+    WHERE property_id = p_property_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION property_counters_on_property() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO property_counters (property_id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A tenant counts while is_active is TRUE or NULL
+CREATE OR REPLACE FUNCTION property_counters_on_tenant() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        IF COALESCE(OLD.is_active, TRUE) THEN
+            PERFORM bump_property_counters(OLD.property_id, -1, 0);
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF COALESCE(NEW.is_active, TRUE) THEN
+            PERFORM bump_property_counters(NEW.property_id, 1, 0);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- An issue counts until it is closed or resolved by the agent
+CREATE OR REPLACE FUNCTION property_counters_on_issue() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        IF COALESCE(OLD.status NOT IN ('closed', 'resolved_by_agent'), FALSE) THEN
+            PERFORM bump_property_counters(OLD.property_id, 0, -1);
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF COALESCE(NEW.status NOT IN ('closed', 'resolved_by_agent'), FALSE) THEN
+            PERFORM bump_property_counters(NEW.property_id, 0, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_property_counters_property ON properties;
+CREATE TRIGGER trg_property_counters_property
+AFTER INSERT ON properties
+FOR EACH ROW EXECUTE FUNCTION property_counters_on_property();
+
+DROP TRIGGER IF EXISTS trg_property_counters_tenant_insert_delete ON tenants;
+CREATE TRIGGER trg_property_counters_tenant_insert_delete
+AFTER INSERT OR DELETE ON tenants
+FOR EACH ROW EXECUTE FUNCTION property_counters_on_tenant();
+
+DROP TRIGGER IF EXISTS trg_property_counters_tenant_update ON tenants;
+CREATE TRIGGER trg_property_counters_tenant_update
+AFTER UPDATE OF property_id, is_active ON tenants
+FOR EACH ROW
+WHEN (OLD.property_id IS DISTINCT FROM NEW.property_id OR OLD.is_active IS DISTINCT FROM NEW.is_active)
+EXECUTE FUNCTION property_counters_on_tenant();
+
+DROP TRIGGER IF EXISTS trg_property_counters_issue_insert_delete ON issues;
+CREATE TRIGGER trg_property_counters_issue_insert_delete
+AFTER INSERT OR DELETE ON issues
+FOR EACH ROW EXECUTE FUNCTION property_counters_on_issue();
+
+DROP TRIGGER IF EXISTS trg_property_counters_issue_update ON issues;
+CREATE TRIGGER trg_property_counters_issue_update
+AFTER UPDATE OF property_id, status ON issues
+FOR EACH ROW
+WHEN (OLD.property_id IS DISTINCT FROM NEW.property_id OR OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION property_counters_on_issue();
+
+-- Backfill (the reconciler keeps them right from here on)
+INSERT INTO property_counters (property_id, tenant_count, active_issue_count, reconciled_at)
+SELECT p.id,
+       (SELECT COUNT(*) FROM tenants t WHERE t.property_id = p.id AND COALESCE(t.is_active, TRUE)),
+       (SELECT COUNT(*) FROM issues i WHERE i.property_id = p.id AND i.status NOT IN ('closed', 'resolved_by_agent')),
+       NOW()
+FROM properties p
+ON CONFLICT (property_id) DO UPDATE
+SET tenant_count = EXCLUDED.tenant_count,
+    active_issue_count = EXCLUDED.active_issue_count,
+    reconciled_at = EXCLUDED.reconciled_at;
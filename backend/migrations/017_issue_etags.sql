@@ -0,0 +1,7 @@
+-- Conditional GETs for issue detail, messages and activity
+-- Message and activity ETags come from the newest message and activity
+-- ids (issue detail hashes the issue row); these make each MAX(id) one
+-- index probe
+
+CREATE INDEX IF NOT EXISTS idx_issue_messages_issue_id_id ON issue_messages(issue_id, id);
+CREATE INDEX IF NOT EXISTS idx_agent_activity_issue_id_id ON agent_activity(issue_id, id);
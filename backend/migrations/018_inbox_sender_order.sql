@@ -0,0 +1,13 @@
+-- Per-sender ordering for the webhook inbox
+-- An event is held back while an earlier one from the same sender is
+-- still pending or processing, so two workers never handle one contact's
+-- messages concurrently or out of order
+
+ALTER TABLE webhook_inbox ADD COLUMN IF NOT EXISTS sender VARCHAR(255);  -- Twilio From, Respond.io contact id
+
+UPDATE webhook_inbox
+SET sender = CASE provider WHEN 'twilio' THEN payload->>'from' ELSE payload->>'contact_id' END
+WHERE sender IS NULL AND status IN ('pending', 'processing', 'failed');
+
+CREATE INDEX IF NOT EXISTS idx_webhook_inbox_sender_open
+ON webhook_inbox(provider, sender, id) WHERE status IN ('pending', 'processing');
@@ -0,0 +1,133 @@
+"""Batch backfill through LocalBatchStub against a scratch Postgres schema.
+
+Needs a disposable database: set TEST_DATABASE_URL to run, e.g.
+    TEST_DATABASE_URL=postgresql://localhost/fixmate_test python -m pytest tests
+"""
+import asyncio
+import os
+import uuid
+
+import asyncpg
+import pytest
+
+from app.db import database
+from app.agents.batch_backfill import BatchBackfill, BackfillFilter, LocalBatchStub, select_issues
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+MIGRATION = os.path.join(os.path.dirname(__file__), "..", "migrations", "005_issue_backfill.sql")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+ISSUES = [
+    ("WhatsApp: Boiler", "No hot water and the boiler shows E119"),
+    ("WhatsApp: Sink", "Kitchen sink is blocked and draining slowly"),
+    ("WhatsApp: Socket", "Socket in the bedroom sparks when I plug in"),
+]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Issues, properties and the backfill tables in a throwaway schema."""
+    schema = f"backfill_test_{uuid.uuid4().hex[:8]}"
+
+    async def connect():
+        return await asyncpg.connect(TEST_DATABASE_URL, server_settings={"search_path": schema})
+
+    async def setup():
+        conn = await asyncpg.connect(TEST_DATABASE_URL)
+        try:
+            await conn.execute(f"CREATE SCHEMA {schema}")
+        finally:
+            await conn.close()
+        conn = await connect()
+        try:
+            await conn.execute("""
+                CREATE TABLE properties (id SERIAL PRIMARY KEY, org_id INTEGER);
+                CREATE TABLE tenants (id SERIAL PRIMARY KEY, org_id INTEGER);
+                CREATE TABLE issues (
+                    id SERIAL PRIMARY KEY,
+                    property_id INTEGER REFERENCES properties(id),
+                    tenant_id INTEGER REFERENCES tenants(id),
+                    title TEXT,
+                    description TEXT,
+                    category VARCHAR(50),
+                    created_at TIMESTAMPTZ DEFAULT NOW(),
+                    updated_at TIMESTAMPTZ DEFAULT NOW()
+                );
+            """)
+            with open(MIGRATION) as f:
+                await conn.execute(f.read())
+            await conn.executemany("INSERT INTO issues (title, description) VALUES ($1, $2)", ISSUES)
+        finally:
+            await conn.close()
+
+    async def teardown():
+        conn = await asyncpg.connect(TEST_DATABASE_URL)
+        try:
+            await conn.execute(f"DROP SCHEMA {schema} CASCADE")
+        finally:
+            await conn.close()
+
+    asyncio.run(setup())
+    monkeypatch.setattr(database, "get_connection", connect)
+    yield connect
+    asyncio.run(teardown())
+
+
+def query(connect, sql, *args):
+    async def run():
+        conn = await connect()
+        try:
+            return await conn.fetch(sql, *args)
+        finally:
+            await conn.close()
+    return asyncio.run(run())
+
+
+def test_submit_and_collect(db):
+    backfill = BatchBackfill(LocalBatchStub(), chunk_size=2, poll_seconds=0)
+    totals = asyncio.run(backfill.run(BackfillFilter(missing_summary=True)))
+
+    assert totals == {"batches": 2, "succeeded": 3, "errored": 0, "updated": 3}
+    rows = query(db, "SELECT category, ai_summary FROM issues ORDER BY id")
+    assert [row["category"] for row in rows] == ["heating", "plumbing", "electrical"]
+    assert all(row["ai_summary"] for row in rows)
+    batches = query(db, "SELECT status, succeeded FROM issue_backfill_batches ORDER BY id")
+    assert [(row["status"], row["succeeded"]) for row in batches] == [("applied", 2), ("applied", 1)]
+
+
+def test_resume_with_stub_state(db, tmp_path):
+    state_path = str(tmp_path / "stub.json")
+    issue_filter = BackfillFilter()
+
+    # First run is interrupted straight after submitting
+    first = BatchBackfill(LocalBatchStub(state_path), chunk_size=10, poll_seconds=0)
+    submitted = asyncio.run(first.submit(asyncio.run(select_issues(issue_filter))))
+    assert len(submitted) == 1
+
+    # The rerun resumes that batch rather than resubmitting its issues
+    second = BatchBackfill(LocalBatchStub(state_path), chunk_size=10, poll_seconds=0)
+    totals = asyncio.run(second.run(issue_filter))
+
+    assert totals == {"batches": 1, "succeeded": 3, "errored": 0, "updated": 3}
+    batches = query(db, "SELECT provider_batch_id, status, succeeded FROM issue_backfill_batches")
+    assert [(row["provider_batch_id"], row["status"], row["succeeded"]) for row in batches] == [
+        (submitted[0], "applied", 3)
+    ]
+    assert not query(db, "SELECT id FROM issues WHERE category IS NULL")
+
+
+def test_resume_without_stub_state_fails(db):
+    issue_filter = BackfillFilter()
+    first = BatchBackfill(LocalBatchStub(), chunk_size=10, poll_seconds=0)
+    asyncio.run(first.submit(asyncio.run(select_issues(issue_filter))))
+
+    # A fresh in-memory stub has never seen the batch
+    second = BatchBackfill(LocalBatchStub(), chunk_size=10, poll_seconds=0)
+    with pytest.raises(KeyError):
+        asyncio.run(second.run(issue_filter))
+
+    batches = query(db, "SELECT status FROM issue_backfill_batches")
+    assert [row["status"] for row in batches] == ["submitted"]
+    assert len(query(db, "SELECT id FROM issues WHERE category IS NULL")) == len(ISSUES)
+
@@ -0,0 +1,33 @@
+"""Readdressing reused replies for a new tenant."""
+from app.agents.similar_issues import personalise_reply
+
+REPLY = (
+    "Hi Will, sorry to hear that. I will send someone if this doesn't help. "
+    "Please mark the leak with tape and may the best fix win. Say when done."
+)
+
+
+def test_common_word_names_only_change_the_greeting():
+    match = {"reply": REPLY, "tenant_name": "Will Mark May"}
+    reply = personalise_reply(match, {"tenant_name": "Bob Smith"})
+
+    assert reply == REPLY.replace("Hi Will,", "Hi Bob,", 1)
+
+
+def test_body_words_matching_the_name_are_untouched():
+    match = {"reply": "Hello Grace Say! Turn the valve off. Say when done.", "tenant_name": "Grace Say"}
+    reply = personalise_reply(match, {"tenant_name": None})
+
+    assert reply == "Hello there! Turn the valve off. Say when done."
+
+
+def test_property_details_are_swapped():
+    match = {
+        "reply": "Hi Alex, is 14 Maple Court, Leeds the flat above the shop at Maple Court?",
+        "tenant_name": "Alex Morgan",
+        "property_name": "Maple Court",
+        "property_address": "14 Maple Court, Leeds",
+    }
+    issue = {"tenant_name": "Sam Lee", "property_name": "Oak House", "property_address": "2 Oak Road, York"}
+
+    assert personalise_reply(match, issue) == "Hi Sam, is 2 Oak Road, York the flat above the shop at Oak House?"